@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*
+'''骰子类，成块预先生成点数，减少每次掷骰子的开销
+'''
+import random
+
+
+class DiceStream:
+    '''rolls of one or more dice, drawn in blocks and handed out one by one
+
+    :note: rolls are determined by the seed only, they are drawn from random.Random
+           so the stream is the same on every platform
+    '''
+
+    def __init__(self, seed: int = None, dice: int = 1,
+                 faces: int = 6, block_size: int = 4096):
+        '''init
+
+        :param seed: seed of the stream, None means seeding from system randomness
+        :param dice: number of dice rolled each time, the result is their sum
+        :param faces: faces of each dice, numbered from 1
+        :param block_size: rolls drawn each time the block is used up
+        '''
+        assert dice > 0, '骰子数量必须大于零。'
+        assert faces > 1, '骰子面数必须大于一。'
+        assert block_size > 0, '块大小必须大于零。'
+        self.__dice = dice
+        self.__faces = faces
+        self.__block_size = block_size
+        self.__generator = random.Random(seed)
+        self.__faces_range = range(1, faces + 1)
+        self.__block = []
+        self.__index = 0
+
+    @property
+    def dice(self):
+        return self.__dice
+    @property
+    def faces(self):
+        return self.__faces
+    @property
+    def low(self):
+        return self.__dice
+    @property
+    def high(self):
+        return self.__dice * self.__faces
+
+    def __refill(self):
+        '''draw a new block of rolls
+        '''
+        dice = self.__dice
+        faces = self.__generator.choices(self.__faces_range, k=self.__block_size * dice)
+        if dice == 1:
+            self.__block = faces
+        else:
+            self.__block = [sum(faces[index:index + dice])
+                            for index in range(0, len(faces), dice)]
+        self.__index = 0
+
+    def roll(self)->int:
+        '''
+        :return: sum of the dice of next roll
+        '''
+        if self.__index >= len(self.__block):
+            self.__refill()
+        value = self.__block[self.__index]
+        self.__index += 1
+        return value
+
+    def distribution(self)->dict:
+        '''exact probability of each sum of the dice
+
+        :return: {sum: probability}
+        '''
+        counts = {0: 1}
+        for _ in range(self.__dice):
+            next_counts = {}
+            for total, count in counts.items():
+                for face in range(1, self.__faces + 1):
+                    next_counts[total + face] = next_counts.get(total + face, 0) + count
+            counts = next_counts
+        outcomes = self.__faces ** self.__dice
+        return {total: count / outcomes for total, count in sorted(counts.items())}
@@ -3,11 +3,20 @@
 '''
 import logging
 
+import richman.log as log
+import richman.trace as trc
 import richman.interface as itf
+import richman.event as ev
+from richman.state import GameState, NO_OWNER, placeholder
 
 
 class BaseEstate(itf.IPlayerForEstate, itf.IMapForEstate):
 
+    __slots__ = ('__name', '__fees', '__buy_value', '__pledge_value', '__upgrade_value',
+                 '__block', '__kMaxLevel',
+                 '__state', '__tile', '__owners', '__levels', '__pledged', '__players')
+    kind = itf.KIND_ESTATE
+
     def __init__(self, name: str, fees: list,
                  buy_value: int, pledge_value: int,
                  upgrade_value: int, block):
@@ -28,10 +37,8 @@ class BaseEstate(itf.IPlayerForEstate, itf.IMapForEstate):
         self.__block = block
         block.add_to_block(self)  # 将该地添加到对应 block
         # init others
-        self.__owner = None
-        self.__is_pledged = False
         self.__kMaxLevel = 4
-        self.__current_level = 0
+        self.__bind(placeholder(), 0)  # 加入比赛前使用共享的初始状态
         # check
         assert len(self.__fees) == self.__kMaxLevel
         assert fees == sorted(fees), \
@@ -52,7 +59,7 @@ class BaseEstate(itf.IPlayerForEstate, itf.IMapForEstate):
         return self.__buy_value
     @property
     def is_pledged(self):
-        return self.__is_pledged
+        return self.__pledged[self.__tile] != 0
     @property
     def pledge_value(self):
         return self.__pledge_value
@@ -64,74 +71,168 @@ class BaseEstate(itf.IPlayerForEstate, itf.IMapForEstate):
         return self.current_level >= (self.__kMaxLevel - 1)
     @property
     def current_level(self):
-        return self.__current_level
+        return self.__levels[self.__tile]
     @property
     def name(self):
         return self.__name
     @property
     def owner(self):
-        return self.__owner
+        index = self.__owners[self.__tile]
+        if index == NO_OWNER:
+            return None
+        return self.__players[index]
     @property
     def block(self):
         return self.__block
     @property
+    def fees(self):
+        '''fees accordding to estate level
+        '''
+        return self.__fees
+    @property
     def fee(self):
-        return self.__fees[self.__current_level]
+        return self.__fees[self.__levels[self.__tile]]
+    @property
+    def tile_id(self):
+        '''position of the estate in the map
+        '''
+        return self.__tile
+
+    def __bind(self, state: GameState, tile_id: int):
+        self.__state = state
+        self.__tile = tile_id
+        self.__owners = state.tile_owner
+        self.__levels = state.tile_level
+        self.__pledged = state.tile_pledged
+        self.__players = state.players
+
+    def _bind_state(self, state: GameState, tile_id: int):
+        '''move the state of the estate into the state of a game
+
+        :param state: state of the game
+        :param tile_id: position of the estate in the map
+        '''
+        owner, level, is_pledged = self.owner, self.current_level, self.is_pledged
+        self.__bind(state, tile_id)
+        self.__write_state(owner, level, is_pledged)  # 状态未变，block 缓存无需更新
+
+    def __own_state(self):
+        '''bind to a state of its own before changing, if it is not in a game
+        '''
+        if self.__state is placeholder():
+            self.__bind(GameState(1), 0)
+
+    def __write_state(self, owner: itf.IEstateForPlayer, level: int, is_pledged: bool):
+        self.__own_state()
+        self.__owners[self.__tile] = NO_OWNER if owner is None else self.__state.player_index(owner)
+        self.__levels[self.__tile] = level
+        self.__pledged[self.__tile] = is_pledged
 
     def buy(self, player: itf.IEstateForPlayer):
-        assert self.__owner is None, '该地已经卖出，无法购买！'
+        assert self.owner is None, '该地已经卖出，无法购买！'
+        if player.trace is not None:
+            player.trace.record(trc.BUY, player, self, self.buy_value)
         player.add_money(-self.buy_value)
-        self.__owner = player
-        logging.info('{} 购买地产 {}，花费 {} 元。'.format(player.name, self.name, self.buy_value))
+        self.__own_state()
+        self.__owners[self.__tile] = self.__state.player_index(player)
+        self.__block._update_fee(player, self.fee)
+        player._update_estate_level(None, self.current_level)
+        if log.enabled:
+            logging.info('{} 购买地产 {}，花费 {} 元。'.format(player.name, self.name, self.buy_value))
 
     def upgrade(self):
         assert not self.is_level_max, '已经满级，无法升级！'
-        self.owner.add_money(-self.upgrade_value)
-        self.__current_level += 1
-        self.value = self.__fees[self.__current_level]
-        logging.info('{} 升级地产 {} 到 {} 级，花费 {} 元。'.format(self.owner.name,
-                                                                  self.name,
-                                                                  self.__current_level,
-                                                                  self.upgrade_value))
+        # 先升级再付款，付款时变卖资产可能会卖掉本地产
+        owner = self.owner
+        fee = self.fee
+        self.__levels[self.__tile] += 1
+        self.__block._update_fee(owner, self.fee - fee)
+        owner._update_estate_level(self.current_level - 1, self.current_level)
+        if log.enabled:
+            logging.info('{} 升级地产 {} 到 {} 级，花费 {} 元。'.format(owner.name,
+                                                                      self.name,
+                                                                      self.current_level,
+                                                                      self.upgrade_value))
+        if owner.trace is not None:
+            owner.trace.record(trc.UPGRADE, owner, self, self.upgrade_value, self.current_level)
+        if owner.game is not None and owner.game._wants(ev.EVENT_UPGRADE):
+            owner.game.events.send(ev.UpgradeEvent(owner, self, self.current_level))
+        owner.add_money(-self.upgrade_value)
 
     def degrade(self):
         assert self.current_level > 0, '最低级，无法降级！'
-        self.__current_level -= 1
-        self.value = self.__fees[self.__current_level]
-        logging.info('{} 降低地产 {} 等级到 {} 级。'.format(self.owner.name, self.name, self.__current_level))
+        fee = self.fee
+        self.__levels[self.__tile] -= 1
+        self.__block._update_fee(self.owner, self.fee - fee)
+        self.owner._update_estate_level(self.current_level + 1, self.current_level)
+        if self.owner.trace is not None:
+            self.owner.trace.record(trc.DEGRADE, self.owner, self, 0, self.current_level)
+        if log.enabled:
+            logging.info('{} 降低地产 {} 等级到 {} 级。'.format(self.owner.name, self.name, self.current_level))
 
     def sell(self):
         assert self.owner is not None, '该地无主，不能卖！'
+        if self.owner.trace is not None:
+            self.owner.trace.record(trc.SELL, self.owner, self, self.sell_value)
         self.owner.add_money(self.sell_value)
-        logging.info('{} 变卖地产 {}，获得 {} 元。'.format(self.owner.name, self.name, self.sell_value))
-        self.__owner = None
-        self.__current_level = 0
+        if log.enabled:
+            logging.info('{} 变卖地产 {}，获得 {} 元。'.format(self.owner.name, self.name, self.sell_value))
+        self.__block._update_fee(self.owner, -self.fee)
+        self.owner._update_estate_level(self.current_level, None)
+        self.__owners[self.__tile] = NO_OWNER
+        self.__levels[self.__tile] = 0
 
     def pledge(self):
         assert self.owner is not None, '该地当前无主，无法抵押！'
         assert not self.is_pledged, '该地已经抵押！'
+        if self.owner.trace is not None:
+            self.owner.trace.record(trc.PLEDGE, self.owner, self, self.pledge_value)
         self.owner.add_money(self.pledge_value)
-        self.__is_pledged = True
-        logging.info('{} 抵押地产 {}，获得 {} 元。'.format(self.owner.name, self.name, self.pledge_value))
+        self.__pledged[self.__tile] = 1
+        if log.enabled:
+            logging.info('{} 抵押地产 {}，获得 {} 元。'.format(self.owner.name, self.name, self.pledge_value))
 
     def rebuy(self):
         assert self.owner is not None, '该地当前无主，赎回无效！'
         assert self.is_pledged, '该地当前未被抵押！'
+        if self.owner.trace is not None:
+            self.owner.trace.record(trc.REBUY, self.owner, self, self.buy_value)
         self.owner.add_money(-self.buy_value)
-        self.__is_pledged = False
-        logging.info('{} 赎回地产 {}，获得 {} 元。'.format(self.owner.name, self.name, self.buy_value))
+        self.__pledged[self.__tile] = 0
+        if log.enabled:
+            logging.info('{} 赎回地产 {}，获得 {} 元。'.format(self.owner.name, self.name, self.buy_value))
+
+    def _set_state(self, owner: itf.IEstateForPlayer, level: int, is_pledged: bool):
+        '''set the state directly, without paying, checking or logging, used by replay
+
+        :param owner: the owner, None means no owner
+        :param level: current level
+        :param is_pledged: whether the estate is pledged
+        '''
+        if self.owner is not None:
+            self.__block._update_fee(self.owner, -self.fee)
+            self.owner._update_estate_level(self.current_level, None)
+        self.__write_state(owner, level, is_pledged)
+        if owner is not None:
+            self.__block._update_fee(owner, self.fee)
+            owner._update_estate_level(None, level)
 
     def trigger(self, player: itf.IEstateForPlayer):
         '''if owner is not None, take the fee from player
         else ask player whether to buy the place
         '''
-        logging.info('{} 走到 {}。'.format(player.name, self.name))
+        if log.enabled:
+            logging.info('{} 走到 {}。'.format(player.name, self.name))
         # has owner
         if self.owner:
             # take the fee
             if self.owner != player:
                 block_fee = self.block.block_fee_calc(self.owner)
-                logging.info('{} 交给 {} 地租 {}。'.format(player.name, self.owner.name, block_fee))
+                if log.enabled:
+                    logging.info('{} 交给 {} 地租 {}。'.format(player.name, self.owner.name, block_fee))
+                if player.trace is not None:
+                    player.trace.record(trc.RENT, player, self, block_fee,
+                                        player.trace.player_index(self.owner))
                 self.owner.add_money(block_fee)
                 player.add_money(-block_fee)
             # update
@@ -147,19 +248,22 @@ class BaseEstate(itf.IPlayerForEstate, itf.IMapForEstate):
     def __str__(self):
         '''display place info
         '''
-        lines = '{}: {}, {}'.format(self.name, self.__current_level,
+        lines = '{}: {}, {}'.format(self.name, self.current_level,
                                     'x' if self.is_pledged else 'o')
         return lines
 
 
 class Estate(BaseEstate):
-    pass
+    __slots__ = ()
 
 
 class EstateBlock:
-    '''a block that holds estates with same color
+    '''a block that holds estates with same color,
+    the fee of the block is cached for each owner
     '''
 
+    debug = False  # 为 True 时每次收租都与完整计算的结果核对
+
     def __init__(self, name: str):
         '''init
 
@@ -167,10 +271,14 @@ class EstateBlock:
         '''
         self.__name = name
         self.__estates = []
+        self.__fees = {}  # struct: {id(owner): block fee}
 
     @property
     def name(self):
         return self.__name
+    @property
+    def estates(self):
+        return self.__estates
 
     def add_to_block(self, estate: Estate):
         '''add estate to this block
@@ -180,8 +288,47 @@ class EstateBlock:
         assert isinstance(estate, Estate)
         self.__estates.append(estate)
 
+    def _update_fee(self, owner: itf.IEstateForPlayer, delta: int):
+        '''change the cached block fee of the owner,
+        called by the estates when their owner or level changes
+
+        :param owner: the owner of the estate, nothing to do if None
+        :param delta: change of the fee
+        '''
+        if owner is None or not delta:
+            return None
+        key = id(owner)
+        block_fee = self.__fees.get(key, 0) + delta
+        if block_fee:
+            self.__fees[key] = block_fee
+        else:
+            del self.__fees[key]
+
+    def rebuild(self):
+        '''rebuild the cache from the estates, needed after their state
+        is changed behind them, e.g. by GameState.restore()
+        '''
+        self.__fees = {}
+        for estate in self.__estates:
+            self._update_fee(estate.owner, estate.fee)
+
     def block_fee_calc(self, owner: itf.IEstateForPlayer)->int:
-        '''calculate block fee that belongs to the owner
+        '''block fee that belongs to the owner, read from the cache
+
+        :param owner: the owner of the palces
+        :return: the block fee
+        '''
+        if owner is None:
+            return 0
+        block_fee = self.__fees.get(id(owner), 0)
+        if self.debug:
+            expected = self.block_fee_recalc(owner)
+            assert block_fee == expected, \
+                '{} 的地租缓存错误：{}，应为 {}。'.format(self.name, block_fee, expected)
+        return block_fee
+
+    def block_fee_recalc(self, owner: itf.IEstateForPlayer)->int:
+        '''calculate block fee that belongs to the owner by scanning the estates
 
         :param owner: the owner of the palces
         :return: the block fee
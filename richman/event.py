@@ -1,11 +1,19 @@
 # -*- coding: utf-8 -*
 '''事件类，处理全局事件
 '''
+import itertools
 import logging
+import weakref
+
+
+EVENT_LAND = 'land'  # see LandEvent
+EVENT_UPGRADE = 'upgrade'  # see UpgradeEvent
 
 
 class BaseEvent:
 
+    __slots__ = ('__event_name',)
+
     def __init__(self, event_name: str):
         '''init
         
@@ -16,49 +24,271 @@ class BaseEvent:
     @property
     def event_name(self):
         return self.__event_name
+    @property
+    def key(self):
+        '''
+        :return: events of the same name and key sent in a turn are handled once
+                 in queued mode, None means never coalesced
+        '''
+        return None
+
+
+class LandEvent(BaseEvent):
+    '''a player lands on a tile, sent before the tile is triggered
+    '''
+
+    __slots__ = ('__player', '__pos')
+
+    def __init__(self, player, pos: int):
+        '''init
+
+        :param player: the player
+        :param pos: position of the tile
+        '''
+        super().__init__(EVENT_LAND)
+        self.__player = player
+        self.__pos = pos
+
+    @property
+    def player(self):
+        return self.__player
+    @property
+    def pos(self):
+        return self.__pos
+    @property
+    def key(self):
+        '''
+        :return: landings on a tile in a turn are handled once
+        '''
+        return self.__pos
+
+
+class UpgradeEvent(BaseEvent):
+    '''an estate is upgraded by its owner
+    '''
+
+    __slots__ = ('__player', '__estate', '__level')
+
+    def __init__(self, player, estate, level: int):
+        '''init
+
+        :param player: owner of the estate
+        :param estate: the estate
+        :param level: level after the upgrade
+        '''
+        super().__init__(EVENT_UPGRADE)
+        self.__player = player
+        self.__estate = estate
+        self.__level = level
+
+    @property
+    def player(self):
+        return self.__player
+    @property
+    def estate(self):
+        return self.__estate
+    @property
+    def level(self):
+        return self.__level
+    @property
+    def key(self):
+        '''
+        :return: upgrades of an estate in a turn are handled once, with the last level
+        '''
+        return self.__estate.name
+
+
+class _WeakHandler:
+    '''weak reference to a handler, equal to the handler while it is alive
+
+    :note: bound methods are referenced by weakref.WeakMethod, so that they do
+           not keep their objects alive
+    '''
+
+    __slots__ = ('__ref', '__hash')
+
+    def __init__(self, handler, callback):
+        '''init
+
+        :param handler: handler to process the event
+        :param callback: called with the reference when the handler is gone
+        '''
+        if hasattr(handler, '__self__') and hasattr(handler, '__func__'):
+            self.__ref = weakref.WeakMethod(handler, callback)
+        else:
+            self.__ref = weakref.ref(handler, callback)
+        try:
+            self.__hash = hash(handler)
+        except TypeError:
+            self.__hash = None
+
+    @property
+    def handler(self):
+        '''
+        :return: the handler, None if it is gone
+        '''
+        return self.__ref()
+
+    def __call__(self, event):
+        handler = self.__ref()
+        if handler is not None:
+            handler(event)
+
+    def __eq__(self, obj):
+        if isinstance(obj, _WeakHandler):
+            obj = obj.handler
+        handler = self.__ref()
+        return handler is not None and handler == obj
+
+    def __hash__(self):
+        if self.__hash is None:
+            raise TypeError('unhashable handler')
+        return self.__hash
+
+    def __repr__(self):
+        return 'weak({})'.format(self.__ref())
+
+
+def _hashable(handler)->bool:
+    try:
+        hash(handler)
+    except TypeError:
+        return False
+    return True
 
 
 class EventManager:
 
-    def __init__(self):
-        self.__handlers_dict = {}  # struct: {event_name1: [handler1, handler2, ...],
-                                   #          event_name2: [handler1, handler2, ...], ...}
+    def __init__(self, queued: bool = False):
+        '''init
+
+        :param queued: if True, send() only queues the events, drain() handles them
+        '''
+        self.__handlers = {}  # struct: {event_name: {handler: (-priority, order of adding)}}
+        self.__unhashable = {}  # struct: {event_name: [(handler, (-priority, order))]}
+        self.__sorted = {}  # struct: {event_name: tuple of handlers by priority}，变化后重建
+        self.__counter = itertools.count()
+        self.__queued = queued
+        self.__queue = []
+        self.__dead = 0  # 已失效的弱引用 handler 数量，在下次调用时清理
 
     @property
     def handlers_dict(self):
-        return self.__handlers_dict
+        '''
+        :return: {event_name: [handler1, handler2, ...]} in the order they are called
+        '''
+        return {event_name: list(self.__handlers_of(event_name))
+                for event_name in self.__event_names()}
+    @property
+    def queued(self):
+        return self.__queued
+    @property
+    def pending(self):
+        '''
+        :return: number of events waiting for drain()
+        '''
+        return len(self.__queue)
+
+    def listens(self, event_name: str)->bool:
+        '''
+        :return: True if some handlers are added for the event, senders check it
+                 before building an event
+        '''
+        return event_name in self.__handlers or event_name in self.__unhashable
+
+    def listener_counts(self)->dict:
+        '''
+        :return: {event_name: number of handlers alive}
+        '''
+        self.__purge()
+        return {event_name: len(self.__handlers_of(event_name))
+                for event_name in self.__event_names()}
+
+    def __event_names(self)->list:
+        return list(self.__handlers) + [event_name for event_name in self.__unhashable
+                                        if event_name not in self.__handlers]
+
+    def __handlers_of(self, event_name: str)->tuple:
+        '''
+        :return: handlers of the event by priority, a snapshot that is not changed
+                 by adding or removing handlers while it is used
+        '''
+        handlers = self.__sorted.get(event_name)
+        if handlers is None:
+            entries = list(self.__handlers.get(event_name, {}).items())
+            entries.extend(self.__unhashable.get(event_name, ()))
+            entries.sort(key=lambda entry: entry[1])
+            handlers = self.__sorted[event_name] = tuple(handler for handler, _ in entries)
+        return handlers
+
+    def __weak(self, handler)->_WeakHandler:
+        manager = weakref.ref(self)
+        def on_dead(_):
+            self_ = manager()
+            if self_ is not None:
+                self_.__dead += 1
+        return _WeakHandler(handler, on_dead)
+
+    def __purge(self):
+        '''remove the weak handlers that are gone
+        '''
+        if not self.__dead:
+            return None
+        self.__dead = 0
+        for event_name in self.__event_names():
+            for handler in [handler for handler in self.__handlers_of(event_name)
+                            if isinstance(handler, _WeakHandler) and handler.handler is None]:
+                self._remove_listener(event_name, handler)
 
     def __event_process(self, event: BaseEvent):
         '''process event
-        
+
         :param event: the event to process
         '''
-        if event.event_name in self.__handlers_dict:
-            for handler in self.__handlers_dict[event.event_name]:
-                handler(event)
+        for handler in self.__handlers_of(event.event_name):
+            handler(event)
 
-    def _add_listener(self, event_name: str, handler):
+    def __contains(self, event_name: str, handler)->bool:
+        if _hashable(handler):
+            return handler in self.__handlers.get(event_name, {})
+        return any(known == handler for known, _ in self.__unhashable.get(event_name, ()))
+
+    def _add_listener(self, event_name: str, handler, priority: int = 0, weak: bool = False):
         '''add handler to the event_name list
 
         :param event_name: type of event, str
         :param handler: handler to process the event
+        :param priority: handlers of higher priority are called first,
+                         handlers of the same priority in the order they are added
+        :param weak: if True, the handler is removed when it is gone,
+                     a bound method is gone with its object
         '''
-        if event_name not in self.__handlers_dict:
-            self.__handlers_dict[event_name] = []
-        if handler not in self.__handlers_dict[event_name]:
-            self.__handlers_dict[event_name].append(handler)
-            logging.debug('add {} of {} into event manager.'.format(event_name, handler))
+        self.__purge()
+        if self.__contains(event_name, handler):
+            return None
+        if weak:
+            handler = self.__weak(handler)
+        order = (-priority, next(self.__counter))
+        if _hashable(handler):
+            self.__handlers.setdefault(event_name, {})[handler] = order
+        else:  # 不可哈希的 handler 只能逐个比较
+            self.__unhashable.setdefault(event_name, []).append((handler, order))
+        self.__sorted.pop(event_name, None)
+        logging.debug('add {} of {} into event manager.'.format(event_name, handler))
 
-    def add_listeners(self, event_name: str, handlers: list):
+    def add_listeners(self, event_name: str, handlers: list, priority: int = 0,
+                      weak: bool = False):
         '''add handler to the event_name list
 
         :param event_name: type of event, str
         :param handlers: handlers to process the event
+        :param priority: see _add_listener()
+        :param weak: see _add_listener()
         '''
         if not isinstance(handlers, list):
             handlers = [handlers]
         for handler in handlers:
-            self._add_listener(event_name, handler)
+            self._add_listener(event_name, handler, priority, weak)
 
     def _remove_listener(self, event_name: str, handler):
         '''remove handler from the event_name list
@@ -66,10 +296,27 @@ class EventManager:
         :param event_name: type of event, str
         :param handler: handler to process the event
         '''
-        assert event_name in self.__handlers_dict, '没有类型为 {} 的事件。'.format(event_name)
-        self.__handlers_dict[event_name].remove(handler)
-        if not self.__handlers_dict[event_name]:
-            del self.__handlers_dict[event_name]
+        assert self.listens(event_name), '没有类型为 {} 的事件。'.format(event_name)
+        if not _hashable(handler):
+            self.__remove_unhashable(event_name, handler)
+        else:
+            handlers = self.__handlers.get(event_name, {})
+            if handler not in handlers:
+                raise ValueError('{} 不是事件 {} 的 handler。'.format(handler, event_name))
+            del handlers[handler]
+            if not handlers:
+                del self.__handlers[event_name]
+        self.__sorted.pop(event_name, None)
+
+    def __remove_unhashable(self, event_name: str, handler):
+        entries = self.__unhashable.get(event_name, [])
+        index = next((index for index, (known, _) in enumerate(entries) if known == handler),
+                     None)
+        if index is None:
+            raise ValueError('{} 不是事件 {} 的 handler。'.format(handler, event_name))
+        del entries[index]
+        if not entries:
+            del self.__unhashable[event_name]
 
     def remove_listeners(self, event_name: str, handlers: list):
         '''remove handler from the event_name list
@@ -83,9 +330,50 @@ class EventManager:
             self._remove_listener(event_name, handler)
 
     def send(self, event: BaseEvent):
-        '''send the event to handlers
+        '''send the event to handlers, or queue it in queued mode
 
         :param event: the event to send
         '''
-        self.__event_process(event)
+        self.__purge()
+        if self.__queued:
+            self.__queue.append(event)
+        else:
+            self.__event_process(event)
+
+    def drain(self)->int:
+        '''handle the queued events, e.g. at the end of a turn
+
+        :note: events are handled by name, in the order each name is first sent,
+               events of a name in the order they are sent; events sent by the
+               handlers are handled in the next batch of the same drain();
+               if a handler raises, the exception goes to the caller and the events
+               after the failed one are kept for the next drain()
+        :return: number of events handled
+        '''
+        handled = 0
+        while self.__queue:
+            self.__purge()
+            batch, self.__queue = self.__queue, []
+            handled += self.__process_batch(batch)
+        return handled
 
+    def __process_batch(self, batch: list)->int:
+        groups = {}  # struct: {event_name: {coalescing key: event}}
+        for event in batch:
+            key = event.key
+            if key is None:
+                key = id(event)
+            events = groups.setdefault(event.event_name, {})
+            events.pop(key, None)  # 重复的事件只保留最后一个，位置也移到最后
+            events[key] = event
+        events = [event for events in groups.values() for event in events.values()]
+        handled = 0
+        try:
+            for event in events:
+                handled += 1
+                for handler in self.__handlers_of(event.event_name):
+                    handler(event)
+        finally:
+            if handled < len(events):  # 处理出错，未处理的事件放回队列最前面
+                self.__queue[:0] = events[handled:]
+        return handled
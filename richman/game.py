@@ -1,43 +1,133 @@
 # -*- coding: utf-8 -*
 '''hold the whole game
 '''
+import asyncio
+import collections
+import contextlib
 import logging
+import random
 
+import richman.log as log
 import richman.interface as itf 
+import richman.trace as trc
+from richman.event import EventManager
+from richman.dice import DiceStream
+from richman.state import GameState
+
+
+# state of a game between rounds, places and players are saved as indexes,
+# so a snapshot can be restored into any game with the same map and players
+GameSnapshot = collections.namedtuple(
+    'GameSnapshot', 'step state players_in_game banckrupted estates projects')
 
 
 class BaseGame:
 
-    def __init__(self, map, players: list):
+    def __init__(self, map, players: list, seed: int = None,
+                 dice: DiceStream = None, trace: trc.TraceRecorder = None,
+                 events: EventManager = None):
         '''init
 
         :param map: 
         :param player_names: list of BasePlayer
+        :param seed: seed of the game, the same seed and map give the same game,
+                     None means seeding from system randomness
+        :param dice: dice shared by all players, default is a single dice seeded with seed
+        :param trace: recorder of the game, None means not recording
+        :param events: manager of the land and upgrade events of the game, see richman.event,
+                       default is a queued one created when it is first used
         '''
+        log.refresh()
         self.__map = map
+        self.__seed = seed
+        self.__rng = random.Random(seed)
+        self.__dice = dice if dice is not None else DiceStream(seed)
+        self.__trace = trace
+        self.__events = events
+        self.__is_rollout = False
         self.__player_index = 0
         self.__players_in_game = players.copy()
         self.__players_all = players.copy()
+        self.__state = GameState(len(map), players)
         self._add_players_into_map(map, players)
+        map._bind_state(self.__state)
+        if trace is not None:
+            trace.start(self)
 
     @property
     def map(self):
         return self.__map
     @property
+    def seed(self):
+        return self.__seed
+    @property
+    def rng(self):
+        return self.__rng
+    @property
+    def dice(self):
+        return self.__dice
+    @property
+    def state(self):
+        return self.__state
+    @property
+    def trace(self):
+        return self.__trace
+    @property
+    def events(self):
+        '''
+        :return: EventManager of the game, queued events are handled at the end of each turn
+        '''
+        if self.__events is None:
+            self.__events = EventManager(queued=True)
+        return self.__events
+    @property
+    def is_rollout(self):
+        '''
+        :return: True while players are playing ahead for a decision, see _rollout()
+        '''
+        return self.__is_rollout
+    @property
     def players_all(self):
         return self.__players_all
     @property
     def players_in_game(self):
         return self.__players_in_game
+    @property
+    def step(self):
+        return self.__step
+    @property
+    def winner(self):
+        '''
+        :return: the last player in game, None if the game is not over or ends in a draw
+        '''
+        if len(self.__players_in_game) == 1:
+            return self.__players_in_game[0]
+        return None
 
     def _add_players_into_map(self, map, players: itf.IGameForPlayer):
-        '''add players into map
+        '''add players into map, players share the random generator, dice and trace of the game,
+        a random generator or dice given to a player are kept
 
         :param map: map
         :param players: players
         '''
-        for player in players:
+        for index, player in enumerate(players):
+            player._bind_state(self.__state, index)
             player.add_to_map(map)
+            if not player.has_own_rng:
+                player.rng = self.__rng
+            if not player.has_own_dice:
+                player.dice = self.__dice
+            player.trace = self.__trace
+            player.game = self
+
+    def _wants(self, event_name: str)->bool:
+        '''
+        :return: True if the event should be sent, no event is sent in rollouts
+                 or when nobody listens to it
+        '''
+        return (not self.__is_rollout and self.__events is not None
+                and self.__events.listens(event_name))
 
     def _remove_players_banckrupted(self, players_banckrupted: list):
         '''remove current player from __players_in_game list
@@ -47,7 +137,101 @@ class BaseGame:
         for player in players_banckrupted:
             self.__players_in_game.remove(player)
 
+    def _set_step(self, step: int):
+        '''set the round counter directly, used by replay
+
+        :param step: rounds played
+        '''
+        self.__step = step
+
+    def snapshot(self)->GameSnapshot:
+        '''save the mutable state of the game, should be called between rounds
+
+        :note: the random generator and the dice are not saved
+        :return: GameSnapshot
+        '''
+        index_of = {id(player): index for index, player in enumerate(self.__players_all)}
+        return GameSnapshot(
+            self.__step,
+            self.__state.freeze(),
+            tuple(index_of[id(player)] for player in self.__players_in_game),
+            tuple(player.is_banckrupted for player in self.__players_all),
+            tuple(tuple(place.tile_id for place in player.estates)
+                  for player in self.__players_all),
+            tuple(tuple(place.tile_id for place in player.projects)
+                  for player in self.__players_all))
+
+    def restore(self, snapshot: GameSnapshot):
+        '''bring the game back to a snapshot
+
+        :param snapshot: GameSnapshot of this game, or of a game with the same map and players
+        '''
+        self.__state.thaw(snapshot.state)
+        items = self.__map.items
+        for player, banckrupted, estates, projects in zip(self.__players_all,
+                                                          snapshot.banckrupted,
+                                                          snapshot.estates,
+                                                          snapshot.projects):
+            player._set_banckrupted(banckrupted)
+            player.estates.reset(items[tile_id] for tile_id in estates)
+            player.projects.reset(items[tile_id] for tile_id in projects)
+            player._rebuild_estate_levels()
+        for block in self.__map.blocks:
+            block.rebuild()
+        self.__players_in_game[:] = [self.__players_all[index]
+                                     for index in snapshot.players_in_game]
+        self.__step = snapshot.step
+
+    @contextlib.contextmanager
+    def _rollout(self, dice: DiceStream):
+        '''play ahead inside the block and come back: the game is restored at the end,
+        nothing is logged or recorded, and the players roll the given dice
+
+        :param dice: dice used while playing ahead
+        '''
+        assert not self.__is_rollout, '不能嵌套推演。'
+        snapshot = self.snapshot()
+        making_money = [player.is_making_money for player in self.__players_all]
+        dices = [player.dice for player in self.__players_all]
+        trace, self.__trace = self.__trace, None
+        self.__is_rollout = True
+        for player in self.__players_all:
+            player.trace = None
+            player.dice = dice
+            player._set_making_money(False)
+        try:
+            with log.quiet():
+                yield self
+        finally:
+            self.restore(snapshot)
+            self.__trace = trace
+            self.__is_rollout = False
+            for player, flag, player_dice in zip(self.__players_all, making_money, dices):
+                player.trace = trace
+                player.dice = player_dice
+                player._set_making_money(flag)
+
+    def _play_ahead(self, player, rounds: int):
+        '''finish the round after the player, then play some more rounds, used by rollouts
+
+        :param player: the player whose turn is going on
+        :param rounds: rounds to play after the current one
+        '''
+        players = self.__players_in_game
+        index = next((index for index, other in enumerate(players) if other is player),
+                     len(players))
+        for other in players[index + 1:]:
+            other.play()
+        self._remove_players_banckrupted([other for other in players if other.is_banckrupted])
+        self.__step += 1
+        for _ in range(rounds):
+            if len(players) <= 1:
+                break
+            self._run_one_step()
+
     def _display_players_info(self):
+        if not log.enabled:
+            return None
         for player in self.players_all:
             logging.info('参赛者信息：{}'.format(player))
 
@@ -57,23 +241,86 @@ class BaseGame:
 
         :note: banckrupted players is remove from players list
         '''
-        logging.info('\n第 {} 回合开始：'.format(self.__step))
+        self.__start_round()
+        players_banckrupted = []
+        for player in self.players_in_game:
+            player.play()
+            self.__end_turn(player, players_banckrupted)
+        self.__end_round(players_banckrupted)
+
+    async def _run_one_step_async(self):
+        '''run one step of the game as a coroutine, see _run_one_step()
+
+        :note: every player prepares its turn before playing it, see BasePlayer.prepare_turn()
+        '''
+        self.__start_round()
         players_banckrupted = []
         for player in self.players_in_game:
+            await player.prepare_turn()
             player.play()
-            if player.is_banckrupted:
+            self.__end_turn(player, players_banckrupted)
+        self.__end_round(players_banckrupted)
+
+    def __start_round(self):
+        if log.enabled:
+            logging.info('\n第 {} 回合开始：'.format(self.__step))
+        if self.__trace is not None:
+            self.__trace.record(trc.ROUND, value=self.__step)
+
+    def __end_turn(self, player, players_banckrupted: list):
+        if self.__events is not None and self.__events.pending:
+            self.__events.drain()
+        if player.is_banckrupted:
+            if log.enabled:
                 logging.info('{} 破产。'.format(player.name))
-                players_banckrupted.append(player)
+            if self.__trace is not None:
+                self.__trace.record(trc.BANKRUPT, player)
+            players_banckrupted.append(player)
+
+    def __end_round(self, players_banckrupted: list):
         self._remove_players_banckrupted(players_banckrupted)
         self._display_players_info()
         self.__step += 1
 
-    def run(self):
+    def __is_over(self, max_step: int)->bool:
+        if len(self.players_in_game) <= 1:
+            return True
+        if max_step is not None and self.__step >= max_step:
+            if log.enabled:
+                logging.info('达到最大回合数 {}，比赛结束。'.format(max_step))
+            return True
+        return False
+
+    def run(self, max_step: int = None):
         '''run the game and show results of each step
+
+        :param max_step: stop after max_step rounds, None means no limit
         '''
-        while len(self.players_in_game) > 1:
+        while not self.__is_over(max_step):
             self._run_one_step()
-        logging.info('{} 获得比赛胜利！'.format(self.players_in_game[0].name))
+        self.__show_result()
+
+    async def run_async(self, max_step: int = None):
+        '''run the game as a coroutine, see run()
+
+        :note: the event loop is given back after each round, so that many games
+               can be run together in one event loop, see richman.host
+        :param max_step: stop after max_step rounds, None means no limit
+        '''
+        while not self.__is_over(max_step):
+            await self._run_one_step_async()
+            await asyncio.sleep(0)
+        self.__show_result()
+
+    def __show_result(self):
+        if len(self.players_in_game) > 1:
+            return None
+        if self.winner:
+            if log.enabled:
+                logging.info('{} 获得比赛胜利！'.format(self.winner.name))
+        else:
+            if log.enabled:
+                logging.info('所有参赛者均已破产，比赛没有胜者。')
 
 class Game(BaseGame):
     pass
\ No newline at end of file
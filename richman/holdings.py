@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*
+'''玩家持有的地产或项目，按购买顺序保存，增删和查找均为 O(1)
+'''
+
+
+class Holdings:
+    '''places held by a player, kept in the order they were added
+
+    :note: places are indexed by identity, not by __eq__ which compares names
+    '''
+
+    def __init__(self, places=()):
+        '''init
+
+        :param places: places to add, in order
+        '''
+        self.__places = {}  # struct: {id(place): place}
+        for place in places:
+            self.add(place)
+
+    def add(self, place):
+        '''add the place at the end, nothing changes if it is held already
+
+        :param place: estate or project
+        '''
+        self.__places.setdefault(id(place), place)
+
+    def remove(self, place):
+        '''remove the place
+
+        :param place: estate or project
+        '''
+        try:
+            del self.__places[id(place)]
+        except KeyError:
+            raise ValueError('未持有 {}。'.format(place.name)) from None
+
+    def discard(self, place):
+        '''remove the place if it is held
+        '''
+        self.__places.pop(id(place), None)
+
+    def clear(self):
+        self.__places.clear()
+
+    def reset(self, places):
+        '''hold the places only, in the given order
+
+        :param places: estates or projects
+        '''
+        self.__places = {id(place): place for place in places}
+
+    def __contains__(self, place):
+        return id(place) in self.__places
+
+    def __iter__(self):
+        return iter(self.__places.values())
+
+    def __len__(self):
+        return len(self.__places)
+
+    def __eq__(self, obj):
+        if not isinstance(obj, (Holdings, list, tuple)):
+            return NotImplemented
+        return list(self) == list(obj)
+
+    def __repr__(self):
+        return 'Holdings({})'.format(list(self))
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*
+'''比赛主机，在一个事件循环中同时进行多场比赛，等待真人玩家作决定时其他比赛照常进行
+'''
+import asyncio
+import logging
+
+import richman.log as log
+
+
+class GameHost:
+    '''run many games together in one event loop, see Game.run_async()
+    '''
+
+    def __init__(self, max_games: int = None, max_step: int = None):
+        '''init
+
+        :param max_games: max games running at the same time, None means no limit
+        :param max_step: max rounds of each game, None means no limit
+        '''
+        assert max_games is None or max_games > 0, '同时进行的比赛数量必须大于零。'
+        self.__max_games = max_games
+        self.__max_step = max_step
+        self.__slots = None  # 第一次使用时在事件循环中创建
+        self.__running = 0
+        self.__finished = 0
+        self.__failed = 0
+
+    @property
+    def running(self):
+        '''
+        :return: number of games running now
+        '''
+        return self.__running
+    @property
+    def finished(self):
+        return self.__finished
+    @property
+    def failed(self):
+        return self.__failed
+
+    async def play(self, game):
+        '''run the game when there is a free slot
+
+        :param game: Game
+        :return: the game when it is over
+        '''
+        if self.__max_games is not None and self.__slots is None:
+            self.__slots = asyncio.Semaphore(self.__max_games)
+        if self.__slots is not None:
+            async with self.__slots:
+                return await self.__play(game)
+        return await self.__play(game)
+
+    async def __play(self, game):
+        self.__running += 1
+        try:
+            await game.run_async(self.__max_step)
+        except Exception:
+            self.__failed += 1
+            if log.enabled:
+                logging.exception('比赛出错：{}。'.format(game.seed))
+            raise
+        finally:
+            self.__running -= 1
+        self.__finished += 1
+        return game
+
+    async def play_all(self, games: list)->list:
+        '''run the games together
+
+        :param games: list of Game
+        :return: results of the games in order, the exception raised if a game fails
+        '''
+        return await asyncio.gather(*(self.play(game) for game in games),
+                                    return_exceptions=True)
+
+
+class ScriptedClient:
+    '''client of PlayerPerson answering by a script, for tests and benchmarks
+
+    :note: answers are given after the delay, like a remote or human player
+    '''
+
+    def __init__(self, delay: float = 0.0, script=None):
+        '''init
+
+        :param delay: seconds to wait before each answer
+        :param script: script(player, kind, key, default) returns the answer,
+                       None means answering the default
+        '''
+        self.__delay = delay
+        self.__script = script
+        self.__decisions = 0
+
+    @property
+    def decisions(self):
+        '''
+        :return: number of decisions answered
+        '''
+        return self.__decisions
+
+    async def decide(self, player, kind: str, key, default):
+        '''
+        :param player: PlayerPerson asking
+        :param kind: kind of the decision, see DecisionNeeded
+        :param key: name of the place of the decision, None for jump and upgrade any
+        :param default: answer of PlayerSimple
+        :return: the answer
+        '''
+        await asyncio.sleep(self.__delay)
+        self.__decisions += 1
+        if self.__script is None:
+            return default
+        return self.__script(player, kind, key, default)
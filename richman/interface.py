@@ -4,10 +4,20 @@
 import abc
 
 
+# kinds of places, estates, projects and publics tag their classes with one of them
+KIND_PUBLIC = 0
+KIND_ESTATE = 1
+KIND_PROJECT = 2
+
+validation = False  # 为 True 时用接口类核对地块的类型标记
+
+
 # game interface
 
 class IGameForPlayer(abc.ABC):
 
+    __slots__ = ()
+
     @property
     @abc.abstractmethod
     def name(self):
@@ -23,6 +33,50 @@ class IGameForPlayer(abc.ABC):
         '''
         pass
 
+    @property
+    @abc.abstractmethod
+    def rng(self):
+        '''
+        :return: random generator used by the player
+        '''
+        pass
+    @property
+    @abc.abstractmethod
+    def has_own_rng(self)->bool:
+        '''
+        :return: True if the random generator was given to the player, the game keeps it
+        '''
+        pass
+    @property
+    @abc.abstractmethod
+    def has_own_dice(self)->bool:
+        '''
+        :return: True if the dice, or the random generator seeding them, were given
+                 to the player, the game keeps them
+        '''
+        pass
+    @property
+    @abc.abstractmethod
+    def dice(self):
+        '''
+        :return: dice used by the player
+        '''
+        pass
+    @property
+    @abc.abstractmethod
+    def trace(self):
+        '''
+        :return: TraceRecorder of the game, None if the game is not recorded
+        '''
+        pass
+    @property
+    @abc.abstractmethod
+    def game(self):
+        '''
+        :return: the game the player is in, None if not in a game
+        '''
+        pass
+
     @abc.abstractmethod
     def add_to_map(self, map):
         '''add player to map
@@ -37,6 +91,13 @@ class IGameForPlayer(abc.ABC):
         '''
         pass
 
+    @abc.abstractmethod
+    async def prepare_turn(self):
+        '''called by the game before play() when the game runs as a coroutine,
+        the decisions of the turn can be waited for here
+        '''
+        pass
+
     @abc.abstractmethod
     def __str__(self):
         '''display player info
@@ -48,6 +109,8 @@ class IGameForPlayer(abc.ABC):
 
 class IPlayerBase(abc.ABC):
 
+    __slots__ = ()
+
     @property
     @abc.abstractmethod
     def name(self):
@@ -62,6 +125,8 @@ class IPlayerBase(abc.ABC):
 
 class IPlayerForMap(IPlayerBase):
 
+    __slots__ = ()
+
     @abc.abstractmethod
     def __len__(self):
         '''
@@ -69,9 +134,45 @@ class IPlayerForMap(IPlayerBase):
         '''
         pass
 
+    @abc.abstractmethod
+    def positions_of_kind(self, kind: int)->tuple:
+        '''
+        :param kind: KIND_ESTATE, KIND_PROJECT or KIND_PUBLIC
+        :return: positions of the items of the kind, in order
+        '''
+        pass
+
+    @abc.abstractmethod
+    def position_of(self, name: str)->int:
+        '''
+        :param name: name of the item
+        :return: position of the item, None if not in the map
+        '''
+        pass
+
+    @abc.abstractmethod
+    def next_position_of_kind(self, kind: int, pos: int)->int:
+        '''
+        :param kind: KIND_ESTATE, KIND_PROJECT or KIND_PUBLIC
+        :param pos: position to search from, the item at pos is not included
+        :return: position of the next item of the kind going forward, None if no such item
+        '''
+        pass
+
+    @abc.abstractmethod
+    def cached(self, key: str, build):
+        '''
+        :param key: name of the data
+        :param build: build(map) computes the data from the items
+        :return: the data, built once and kept until the items change
+        '''
+        pass
+
 
 class IPlayerForPlace(IPlayerBase):
 
+    __slots__ = ()
+
     @property
     @abc.abstractmethod
     def buy_value(self):
@@ -104,6 +205,8 @@ class IPlayerForPlace(IPlayerBase):
 
 class IPlayerForEstate(IPlayerForPlace):
 
+    __slots__ = ()
+
     @property
     @abc.abstractmethod
     def upgrade_value(self):
@@ -150,17 +253,23 @@ class IPlayerForEstate(IPlayerForPlace):
 
 class IPlayerForProject(IPlayerForPlace):
 
+    __slots__ = ()
+
     pass
 
 
 class IPlayerForEvent(IPlayerBase):
 
+    __slots__ = ()
+
     pass
 
 
 # map interface
 
 class IMapForPlayer(abc.ABC):
+
+    __slots__ = ()
     
     @property
     @abc.abstractmethod
@@ -170,6 +279,20 @@ class IMapForPlayer(abc.ABC):
 
 class IMapForEstate(abc.ABC):
 
+    __slots__ = ()
+
+    @property
+    @abc.abstractmethod
+    def name(self):
+        pass
+    @property
+    @abc.abstractmethod
+    def block(self):
+        '''
+        :return: EstateBlock that holds the estate
+        '''
+        pass
+
     @abc.abstractmethod
     def __eq__(self, obj):
         pass
@@ -179,6 +302,8 @@ class IMapForEstate(abc.ABC):
 
 class IEstateForPlayer(abc.ABC):
 
+    __slots__ = ()
+
     @property
     @abc.abstractmethod
     def name(self):
@@ -186,6 +311,20 @@ class IEstateForPlayer(abc.ABC):
         :return: name of the player
         '''
         pass
+    @property
+    @abc.abstractmethod
+    def trace(self):
+        '''
+        :return: TraceRecorder of the game, None if the game is not recorded
+        '''
+        pass
+    @property
+    @abc.abstractmethod
+    def game(self):
+        '''
+        :return: the game the player is in, None if not in a game
+        '''
+        pass
 
     @abc.abstractmethod
     def add_money(self, delta: int):
@@ -211,6 +350,15 @@ class IEstateForPlayer(abc.ABC):
         '''
         pass
 
+    @abc.abstractmethod
+    def _update_estate_level(self, old_level: int, new_level: int):
+        '''an estate of the player is bought, sold, upgraded or degraded
+
+        :param old_level: level before, None if the estate was not the player's
+        :param new_level: level after, None if the estate is not the player's any more
+        '''
+        pass
+
     @abc.abstractmethod
     def __eq__(self, obj):
         pass
@@ -220,12 +368,27 @@ class IEstateForPlayer(abc.ABC):
 
 class IProjectForPlayer(abc.ABC):
 
+    __slots__ = ()
+
     @property
     @abc.abstractmethod
     def estate_max_level(self):
         '''return the max level of all the estate the player has
         '''
         pass
+    @property
+    @abc.abstractmethod
+    def estate_count(self):
+        '''return the number of the estates the player has
+        '''
+        pass
+    @property
+    @abc.abstractmethod
+    def trace(self):
+        '''
+        :return: TraceRecorder of the game, None if the game is not recorded
+        '''
+        pass
 
     @abc.abstractmethod
     def add_money(self, delta: int):
@@ -264,6 +427,8 @@ class IProjectForPlayer(abc.ABC):
 
 class IProjectForEstate(abc.ABC):
 
+    __slots__ = ()
+
     @staticmethod
     @abc.abstractmethod
     def add_to_static_callbacks_upgrade(callback):
@@ -280,4 +445,38 @@ class IProjectForEstate(abc.ABC):
 
         :param callback: callback(estate, player)
         '''
-        pass
\ No newline at end of file
+        pass
+
+
+# kind tags
+
+def _kind_by_interface(place)->int:
+    if isinstance(place, (IPlayerForEstate, IMapForEstate)):
+        return KIND_ESTATE
+    if isinstance(place, IPlayerForProject):
+        return KIND_PROJECT
+    return KIND_PUBLIC
+
+
+def kind_of(place)->int:
+    '''kind of the place, read from the kind tag of its class,
+    objects without a tag (e.g. mocks) fall back to isinstance checks
+
+    :param place: item of a map
+    :return: KIND_ESTATE, KIND_PROJECT or KIND_PUBLIC
+    '''
+    kind = getattr(type(place), 'kind', None)
+    if kind is None:
+        return _kind_by_interface(place)
+    if validation and kind != _kind_by_interface(place):
+        raise RuntimeError('{} 的类型标记与接口不符。'.format(place.name))
+    return kind
+
+
+def set_validation(value: bool):
+    '''turn the isinstance checks of the kind tags on or off
+
+    :param value: True to check
+    '''
+    global validation
+    validation = bool(value)
\ No newline at end of file
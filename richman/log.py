@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*
+'''日志开关，关闭后引擎不再构造任何日志信息
+
+默认只在根日志器会输出 info 信息时构造日志信息，没有接收者时日志是免费的
+'''
+import contextlib
+import contextvars
+import logging
+import threading
+
+
+# engine modules check log.enabled before building any log message, always read it
+# as log.enabled: when the messages are off it is a plain False of the module, when
+# they are on it is read through __getattr__(), which is False inside quiet()
+enabled = False
+
+_setting = None  # value given to set_enabled(), None means following the sink
+_logger = None  # logger checked when following the sink, None means the root logger
+_lock = threading.Lock()
+# number of quiet() blocks entered and not left yet, in the current thread or task
+_quiet_depth = contextvars.ContextVar('richman_log_quiet_depth', default=0)
+
+
+def __getattr__(name: str):
+    if name == 'enabled':
+        return _quiet_depth.get() == 0
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def _update():
+    if _setting is not None:
+        is_on = _setting
+    else:
+        logger = _logger if _logger is not None else logging.getLogger()
+        is_on = logger.isEnabledFor(logging.INFO) and logger.hasHandlers()
+    if is_on:
+        globals().pop('enabled', None)  # 由 __getattr__() 按 quiet() 决定
+    else:
+        globals()['enabled'] = False
+
+
+def refresh():
+    '''compute the flag again, called by Game.__init__() so that the handlers
+    attached after the import are seen
+    '''
+    with _lock:
+        _update()
+
+
+def set_enabled(value: bool):
+    '''turn the log messages of the engine on or off
+
+    :param value: False means the quiet mode, no message is formatted;
+                  None means following the sink, see enable_if_sink_attached()
+    '''
+    global _setting
+    with _lock:
+        _setting = None if value is None else bool(value)
+        _update()
+
+
+def enable_if_sink_attached(logger: logging.Logger = None):
+    '''turn the log messages on only if the logger would emit info messages to a handler,
+    this is the default with the root logger
+
+    :param logger: default is the root logger
+    '''
+    global _setting, _logger
+    with _lock:
+        _setting = None
+        _logger = logger
+        _update()
+
+
+@contextlib.contextmanager
+def quiet():
+    '''run the engine in quiet mode within the context
+
+    :note: the quiet mode is local to the thread or the asyncio task, e.g. the
+           rollouts of a game do not silence the other games of a GameHost;
+           blocks are counted, so overlapping blocks turn the messages back on
+           only when the last one is left
+    '''
+    _quiet_depth.set(_quiet_depth.get() + 1)
+    try:
+        yield
+    finally:
+        _quiet_depth.set(_quiet_depth.get() - 1)
+
+
+_update()
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*
+'''期望最大化搜索，按骰子的精确分布向前推算玩家的现金和地产，用于快速做决定
+'''
+import time
+
+import richman.interface as itf
+
+
+NOT_OWNED = -1  # level of the tiles that the player does not own
+BANKRUPT = -1e12  # value of the positions that the player can not pay for
+
+
+class Timeout(Exception):
+    '''the deadline of the search has passed
+    '''
+    pass
+
+
+class Lookahead:
+    '''depth-limited expectimax over the rolls of a player
+
+    the player's own turns are searched: each roll is a chance node, buying
+    and upgrading are max nodes; the other players are not searched, they pay
+    the expected rent of the tiles they land on, computed from their positions
+
+    :note: the state of a node is (position, money, levels of the player's estates),
+           values are memoized by state and remaining turns
+    '''
+
+    def __init__(self, player, deadline: float = None, tail: int = 20):
+        '''init, read the map and the state of the game
+
+        :param player: the player to search for
+        :param deadline: time.perf_counter() value to stop at, None means no limit
+        :param tail: turns of rent counted in the value of the holdings at the leaves
+        '''
+        self.__deadline = deadline
+        self.__tail = tail
+        self.__memo = {}
+        map = player.map
+        items = map.items
+        tiles = len(items)
+        self.__tiles = tiles
+        self.__outcomes = tuple(player.dice.distribution().items())
+        self.__is_estate = tuple(itf.kind_of(item) == itf.KIND_ESTATE for item in items)
+        self.__fees = tuple(tuple(item.fees) if is_estate else None
+                            for item, is_estate in zip(items, self.__is_estate))
+        self.__buy_value = tuple(item.buy_value if is_estate else 0
+                                 for item, is_estate in zip(items, self.__is_estate))
+        self.__upgrade_value = tuple(item.upgrade_value if is_estate else 0
+                                     for item, is_estate in zip(items, self.__is_estate))
+        self.__max_level = tuple(len(fees) - 1 if fees else 0 for fees in self.__fees)
+        self.__block = tuple(map.positions_in_block(item.block) if is_estate else ()
+                             for item, is_estate in zip(items, self.__is_estate))
+        # state of the game
+        levels = []
+        buyable = []
+        rent = []
+        for item, is_estate in zip(items, self.__is_estate):
+            owner = item.owner if is_estate else None
+            levels.append(item.current_level if owner is player else NOT_OWNED)
+            buyable.append(is_estate and owner is None)
+            rent.append(item.block.block_fee_calc(owner)
+                        if owner is not None and owner is not player else 0)
+        self.__levels = tuple(levels)
+        self.__buyable = tuple(buyable)
+        self.__rent = tuple(rent)
+        self.__expected_rent = sum(rent) / tiles
+        others = [other.pos for other in player.game.players_in_game
+                  if other is not player] if player.game is not None else []
+        self.__others = len(others)
+        self.__landings = [self.__next_landings(others)]
+
+    @property
+    def deadline(self):
+        '''
+        :return: time.perf_counter() value to stop at, None means no limit
+        '''
+        return self.__deadline
+    @deadline.setter
+    def deadline(self, value: float):
+        self.__deadline = value
+    @property
+    def levels(self):
+        '''
+        :return: level of each tile owned by the player, NOT_OWNED for others
+        '''
+        return self.__levels
+
+    def __next_landings(self, positions)->list:
+        '''
+        :param positions: positions of the other players, or their expected landings
+                          of the last turn as a list of probabilities per tile
+        :return: expected landings of the other players on each tile in the next turn
+        '''
+        tiles = self.__tiles
+        landings = [0.0] * tiles
+        if positions and isinstance(positions[0], float):
+            starts = [(pos, chance) for pos, chance in enumerate(positions) if chance]
+        else:
+            starts = [(pos, 1.0) for pos in positions]
+        for pos, chance in starts:
+            for step, probability in self.__outcomes:
+                landings[(pos + step) % tiles] += chance * probability
+        return landings
+
+    def __landings_of_turn(self, turn: int)->list:
+        while len(self.__landings) <= turn:
+            self.__landings.append(self.__next_landings(self.__landings[-1]))
+        return self.__landings[turn]
+
+    def block_fee(self, levels: tuple, tile: int)->int:
+        '''
+        :return: rent of the tile when it is owned by the player, see EstateBlock.block_fee_calc()
+        '''
+        if levels[tile] == NOT_OWNED:
+            return 0
+        return sum(self.__fees[pos][levels[pos]] for pos in self.__block[tile]
+                   if levels[pos] != NOT_OWNED)
+
+    def __income(self, levels: tuple, landings: list)->float:
+        return sum(chance * self.block_fee(levels, tile)
+                   for tile, chance in enumerate(landings)
+                   if chance and levels[tile] != NOT_OWNED)
+
+    def buy(self, money: float, levels: tuple, tile: int)->tuple:
+        '''
+        :return: (money, levels) after buying the estate
+        '''
+        return (money - self.__buy_value[tile],
+                levels[:tile] + (0,) + levels[tile + 1:])
+
+    def upgrade(self, money: float, levels: tuple, tile: int)->tuple:
+        '''
+        :return: (money, levels) after upgrading the estate
+        '''
+        return (money - self.__upgrade_value[tile],
+                levels[:tile] + (levels[tile] + 1,) + levels[tile + 1:])
+
+    def can_upgrade(self, levels: tuple, tile: int)->bool:
+        return NOT_OWNED != levels[tile] < self.__max_level[tile]
+
+    def leaf(self, money: float, levels: tuple)->float:
+        '''value of a position: money, the buy value of the estates and the rent
+        expected in the next tail turns
+
+        :return: value, BANKRUPT if the player can not pay
+        '''
+        assets = sum(self.__buy_value[tile] for tile, level in enumerate(levels)
+                     if level != NOT_OWNED)
+        if money + assets < 0:
+            return BANKRUPT
+        uniform = [self.__others / self.__tiles] * self.__tiles
+        flow = self.__income(levels, uniform) - self.__expected_rent
+        return money + assets + self.__tail * flow
+
+    def value(self, turns: int, pos: int, money: float, levels: tuple, turn: int = 0)->float:
+        '''expected value after the other players move and the player rolls the dice turns times
+
+        :param turns: turns of the player to search
+        :param pos: position of the player
+        :param money: money of the player
+        :param levels: level of each tile owned by the player
+        :param turn: number of turns already searched, selects the landings of the other players
+        :return: expected value, see leaf()
+        '''
+        if turns == 0:
+            return self.leaf(money, levels)
+        key = (turns, turn, pos, round(money), levels)
+        if key in self.__memo:
+            return self.__memo[key]
+        if self.__deadline is not None and time.perf_counter() > self.__deadline:
+            raise Timeout()
+        money += self.__income(levels, self.__landings_of_turn(turn))
+        total = 0.0
+        for step, probability in self.__outcomes:
+            total += probability * self.__land(turns, (pos + step) % self.__tiles,
+                                               money, levels, turn)
+        self.__memo[key] = total
+        return total
+
+    def __land(self, turns: int, tile: int, money: float, levels: tuple, turn: int)->float:
+        turns -= 1
+        turn += 1
+        money -= self.__rent[tile]
+        best = self.value(turns, tile, money, levels, turn)
+        if self.__buyable[tile] and levels[tile] == NOT_OWNED:
+            if money > self.__buy_value[tile]:
+                best = max(best, self.value(turns, tile, *self.buy(money, levels, tile), turn))
+        elif self.can_upgrade(levels, tile) and money > self.__upgrade_value[tile]:
+            best = max(best, self.value(turns, tile, *self.upgrade(money, levels, tile), turn))
+        return best
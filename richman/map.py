@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*
 '''map
 '''
-import pickle
+import bisect
 import os
+import types
 
 import richman.interface as itf
+import richman.mapfile as mf
 
 
 class BaseMap(itf.IPlayerForMap):
@@ -18,6 +20,8 @@ class BaseMap(itf.IPlayerForMap):
         self.__name = name
         self.__items = []
         self._blocks = []
+        self.__indexes = None  # 第一次查询时建立，items 改变后失效
+        self.__cache = {}  # 由 items 计算出的数据，items 改变后清空
         if items:
             self._add_items(items)
 
@@ -36,34 +40,117 @@ class BaseMap(itf.IPlayerForMap):
             items = [items]
         # check duplicated estate names
         estate_names = [estate.name for estate in items
-                            if isinstance(estate, itf.IMapForEstate)]
+                            if itf.kind_of(estate) == itf.KIND_ESTATE]
         if len(estate_names) != len(set(estate_names)):
             raise ValueError('estate names should not be duplicated.')
         self.__items.extend(items)
+        self.__indexes = None
+        self.__cache = {}
+
+    def __build_indexes(self):
+        '''build the indexes of the items, they are not changed until items change
+
+        :return: (kind to positions, name to position, block to positions)
+        '''
+        kind_positions = {}
+        name_position = {}
+        block_positions = {}
+        for pos, item in enumerate(self.__items):
+            kind = itf.kind_of(item)
+            kind_positions.setdefault(kind, []).append(pos)
+            name_position.setdefault(item.name, pos)
+            if kind == itf.KIND_ESTATE:
+                block_positions.setdefault(id(item.block), []).append(pos)
+        self.__indexes = (
+            types.MappingProxyType({kind: tuple(positions)
+                                    for kind, positions in kind_positions.items()}),
+            types.MappingProxyType(name_position),
+            types.MappingProxyType({block: tuple(positions)
+                                    for block, positions in block_positions.items()}),
+        )
+        return self.__indexes
+
+    def __get_indexes(self):
+        return self.__indexes if self.__indexes is not None else self.__build_indexes()
+
+    def positions_of_kind(self, kind: int)->tuple:
+        '''
+        :param kind: KIND_ESTATE, KIND_PROJECT or KIND_PUBLIC
+        :return: positions of the items of the kind, in order
+        '''
+        return self.__get_indexes()[0].get(kind, ())
+
+    def position_of(self, name: str)->int:
+        '''
+        :param name: name of the item
+        :return: position of the item, None if not in the map
+        '''
+        return self.__get_indexes()[1].get(name)
+
+    def positions_in_block(self, block)->tuple:
+        '''
+        :param block: EstateBlock
+        :return: positions of the estates of the block, in order
+        '''
+        return self.__get_indexes()[2].get(id(block), ())
+
+    def next_position_of_kind(self, kind: int, pos: int)->int:
+        '''
+        :param kind: KIND_ESTATE, KIND_PROJECT or KIND_PUBLIC
+        :param pos: position to search from, the item at pos is not included
+        :return: position of the next item of the kind going forward, None if no such item
+        '''
+        positions = self.positions_of_kind(kind)
+        if not positions:
+            return None
+        index = bisect.bisect_right(positions, pos % len(self.__items))
+        return positions[index % len(positions)]
+
+    def cached(self, key: str, build):
+        '''
+        :param key: name of the data
+        :param build: build(map) computes the data from the items
+        :return: the data, built once and kept until the items change
+        '''
+        if key not in self.__cache:
+            self.__cache[key] = build(self)
+        return self.__cache[key]
+
+    def _bind_state(self, state):
+        '''bind items to the state of a game, the position of an item is its tile id
+
+        :param state: GameState of the game
+        '''
+        for tile_id, item in enumerate(self.__items):
+            item._bind_state(state, tile_id)
 
     def load(self, file_path: str):
-        '''load map from pickle
+        '''load map from a map file, the items and blocks are built again
 
         :param file_path: file_path to load
+        :return: GameState saved with the map without the player objects, None if no state
         '''
         assert os.path.exists(file_path),\
             '用于读取 map 的文件不存在：{}。'.format(file_path)
-        with open(file_path, 'rb') as f:
-            map = pickle.load(f)
-        assert map, '读取或解析失败：{}。'
-        self.__items = map['items']
-        self.__name = map['name']
+        with mf.MapFileReader(file_path) as reader:
+            definition = reader.definition()
+            state = reader.state()
+        self._blocks, self.__items = mf.build_items(definition)
+        self.__name = definition.name
+        self.__indexes = None
+        self.__cache = {}
+        return state
 
-    def save(self, file_path: str):
-        '''save map into pickle
+    def save(self, file_path: str, state=None):
+        '''save map into a map file, only the definitions of the items are saved,
+        the state of a game is saved in its own section if given
 
         :param file_path: file_path to save
+        :param state: GameState of a game on the map, default is None
         '''
-        map = {}
-        map['items'] = self.items
-        map['name'] = self.name
+        data = mf.pack_definition(mf.definition_of(self), state)
         with open(file_path, 'wb') as f:
-            pickle.dump(map, f)
+            f.write(data)
 
     def trigger(self, player: itf.IMapForPlayer):
         '''trigger player to 
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*
+'''地图文件，以定长二进制记录保存地图中各地块的定义，可选地附带比赛状态
+'''
+from array import array
+import collections
+import mmap
+import struct
+import sys
+
+import richman.interface as itf
+from richman.estate import Estate, EstateBlock
+from richman.state import GameState
+from richman.project import (
+    BaseProject,
+    ProjectNuclear,
+    ProjectBuilder,
+    ProjectTransportation,
+    ProjectTvStation,
+    ProjectSewerage
+)
+from richman.public import (
+    PublicStart,
+    PublicNews,
+    PublicPrison,
+    PublicLuck,
+    PublicStock,
+    PublicGotoPrison,
+    PublicPark,
+    PublicTax
+)
+
+
+# classes of the tiles, the index is the code saved in files, only append to it
+TILE_CLASSES = (Estate,
+                ProjectNuclear, ProjectBuilder, ProjectTransportation,
+                ProjectTvStation, ProjectSewerage,
+                PublicStart, PublicNews, PublicPrison, PublicLuck,
+                PublicStock, PublicGotoPrison, PublicPark, PublicTax)
+_CLASS_CODES = {cls: code for code, cls in enumerate(TILE_CLASSES)}
+
+NO_BLOCK = -1
+
+MAGIC = b'RMMP'
+VERSION = 2
+HAS_STATE = 0x1  # flag: the state section follows the strings
+# magic, version, flags, blocks, tiles, bytes of the strings, players of the state
+HEADER = struct.Struct('<4sHHIIII')
+# class code, block, fee0-3, buy value, sell value, pledge value, upgrade value
+TILE = struct.Struct('<Bxh8i')
+# layout: header, tiles, string end offsets (map name, blocks, tiles),
+#         utf-8 strings, state (tile owner, level, pledged, player money, pos)
+OFFSET = struct.Struct('<I')
+STATE_ARRAYS = (('tile_owner', 'h'), ('tile_level', 'b'), ('tile_pledged', 'b'),
+                ('player_money', 'q'), ('player_pos', 'h'))
+
+TileDefinition = collections.namedtuple(
+    'TileDefinition', 'cls name block fees buy_value sell_value pledge_value upgrade_value')
+MapDefinition = collections.namedtuple('MapDefinition', 'name blocks tiles')
+
+
+def pack_definition(definition: MapDefinition, state: GameState = None)->bytes:
+    '''
+    :param definition: definition of the map
+    :param state: state of a game on the map, saved after the definition if not None
+    :return: content of a map file
+    '''
+    tiles = definition.tiles
+    strings = [definition.name]
+    strings.extend(definition.blocks)
+    strings.extend(tile.name for tile in tiles)
+    encoded = [string.encode('utf-8') for string in strings]
+    ends = array('I')
+    total = 0
+    for string in encoded:
+        total += len(string)
+        ends.append(total)
+    if state is not None:
+        assert state.tiles == len(tiles), '状态与地图的地块数量不一致。'
+    data = bytearray(HEADER.pack(MAGIC, VERSION, HAS_STATE if state is not None else 0,
+                                 len(definition.blocks), len(tiles), total,
+                                 len(state.players) if state is not None else 0))
+    for tile in tiles:
+        fees = tuple(tile.fees) if tile.fees else (0, 0, 0, 0)
+        data += TILE.pack(_CLASS_CODES[tile.cls], tile.block, *fees,
+                          tile.buy_value, tile.sell_value, tile.pledge_value,
+                          tile.upgrade_value)
+    data += _little_endian(ends).tobytes()
+    data += b''.join(encoded)
+    if state is not None:
+        for name, _ in STATE_ARRAYS:
+            data += _little_endian(getattr(state, name)).tobytes()
+    return bytes(data)
+
+
+def unpack_definition(data)->MapDefinition:
+    '''
+    :param data: content of a map file, bytes or any buffer
+    :return: definition of the map
+    '''
+    return _MapFileView(data).definition()
+
+
+def unpack_state(data)->GameState:
+    '''
+    :param data: content of a map file, bytes or any buffer
+    :return: GameState saved in the file without the player objects, None if no state
+    '''
+    return _MapFileView(data).state()
+
+
+def definition_of(map)->MapDefinition:
+    '''describe the items of a map, the map can be saved and built again from it
+
+    :param map: BaseMap
+    :return: definition of the map
+    '''
+    blocks = {id(block): index for index, block in enumerate(map.blocks)}
+    tiles = []
+    for item in map.items:
+        cls = type(item)
+        if cls not in _CLASS_CODES:
+            raise ValueError('无法保存的地块类型：{}。'.format(cls.__name__))
+        if itf.kind_of(item) == itf.KIND_ESTATE:
+            if id(item.block) not in blocks:
+                raise ValueError('地产 {} 的地段不在地图中。'.format(item.name))
+            tiles.append(TileDefinition(cls, item.name, blocks[id(item.block)],
+                                        tuple(item.fees), item.buy_value, item.buy_value,
+                                        item.pledge_value, item.upgrade_value))
+        elif itf.kind_of(item) == itf.KIND_PROJECT:
+            tiles.append(TileDefinition(cls, item.name, NO_BLOCK, None,
+                                        item.buy_value, item.sell_value, 0, 0))
+        else:
+            tiles.append(TileDefinition(cls, item.name, NO_BLOCK, None, 0, 0, 0, 0))
+    return MapDefinition(map.name, tuple(block.name for block in map.blocks), tuple(tiles))
+
+
+def _little_endian(values: array)->array:
+    if sys.byteorder == 'little':
+        return values
+    values = array(values.typecode, values)
+    values.byteswap()
+    return values
+
+
+class _MapFileView:
+    '''random access to the sections of a map file held in a buffer
+    '''
+
+    def __init__(self, data):
+        if len(data) < HEADER.size:
+            raise ValueError('不是地图文件。')
+        magic, version, flags, blocks, tiles, strings_size, players = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError('不是地图文件。')
+        if version != VERSION:
+            raise ValueError('不支持的地图文件版本：{}。'.format(version))
+        self.data = data
+        self.blocks = blocks
+        self.tiles = tiles
+        self.players = players
+        self.has_state = bool(flags & HAS_STATE)
+        self.ends_offset = HEADER.size + tiles * TILE.size
+        self.strings_offset = self.ends_offset + (1 + blocks + tiles) * OFFSET.size
+        self.state_offset = self.strings_offset + strings_size
+        size = self.state_offset
+        if self.has_state:
+            size += tiles * (2 + 1 + 1) + players * (8 + 2)
+        if len(data) != size:
+            raise ValueError('地图文件不完整。')
+
+    def string(self, index: int)->str:
+        start = OFFSET.unpack_from(self.data, self.ends_offset + (index - 1) * OFFSET.size)[0] \
+            if index else 0
+        end, = OFFSET.unpack_from(self.data, self.ends_offset + index * OFFSET.size)
+        if not start <= end <= self.state_offset - self.strings_offset:
+            raise ValueError('地图文件已损坏。')
+        return bytes(self.data[self.strings_offset + start:self.strings_offset + end]).decode('utf-8')
+
+    def tile(self, index: int)->TileDefinition:
+        code, block, *fees, buy_value, sell_value, pledge_value, upgrade_value = \
+            TILE.unpack_from(self.data, HEADER.size + index * TILE.size)
+        if code >= len(TILE_CLASSES):
+            raise ValueError('未知的地块类型：{}。'.format(code))
+        cls = TILE_CLASSES[code]
+        return TileDefinition(cls, self.string(1 + self.blocks + index), block,
+                              tuple(fees) if cls is Estate else None,
+                              buy_value, sell_value, pledge_value, upgrade_value)
+
+    def strings(self)->list:
+        ends = array('I')
+        ends.frombytes(self.data[self.ends_offset:self.strings_offset])
+        ends = _little_endian(ends)
+        blob = bytes(self.data[self.strings_offset:self.state_offset])
+        if ends and ends[-1] != len(blob):
+            raise ValueError('地图文件已损坏。')
+        strings = []
+        start = 0
+        for end in ends:
+            strings.append(blob[start:end].decode('utf-8'))
+            start = end
+        return strings
+
+    def definition(self)->MapDefinition:
+        strings = self.strings()
+        names = strings[1 + self.blocks:]
+        tiles = []
+        records = self.data[HEADER.size:self.ends_offset]
+        for index, fields in enumerate(TILE.iter_unpack(records)):
+            code, block, *fees, buy_value, sell_value, pledge_value, upgrade_value = fields
+            if code >= len(TILE_CLASSES):
+                raise ValueError('未知的地块类型：{}。'.format(code))
+            cls = TILE_CLASSES[code]
+            tiles.append(TileDefinition(cls, names[index], block,
+                                        tuple(fees) if cls is Estate else None,
+                                        buy_value, sell_value, pledge_value, upgrade_value))
+        return MapDefinition(strings[0], tuple(strings[1:1 + self.blocks]), tuple(tiles))
+
+    def state(self)->GameState:
+        if not self.has_state:
+            return None
+        state = GameState(self.tiles, [None] * self.players)
+        offset = self.state_offset
+        for name, typecode in STATE_ARRAYS:
+            values = getattr(state, name)
+            size = len(values) * values.itemsize
+            loaded = array(typecode)
+            loaded.frombytes(self.data[offset:offset + size])
+            values[:] = _little_endian(loaded)
+            offset += size
+        return state
+
+
+class MapFileReader:
+    '''memory-map a map file, tiles are read only when asked for
+    '''
+
+    def __init__(self, file_path: str):
+        '''init
+
+        :param file_path: map file written by pack_definition() or BaseMap.save()
+        '''
+        self.__file = open(file_path, 'rb')
+        try:
+            self.__mmap = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self.__file.close()
+            raise ValueError('不是地图文件：{}。'.format(file_path))
+        try:
+            self.__view = _MapFileView(self.__mmap)
+        except ValueError:
+            self.close()
+            raise
+
+    @property
+    def name(self):
+        return self.__view.string(0)
+    @property
+    def blocks(self):
+        return tuple(self.__view.string(1 + index) for index in range(self.__view.blocks))
+    @property
+    def has_state(self):
+        return self.__view.has_state
+
+    def __len__(self):
+        return self.__view.tiles
+
+    def __getitem__(self, index: int)->TileDefinition:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('地块序号越界：{}。'.format(index))
+        return self.__view.tile(index)
+
+    def definition(self)->MapDefinition:
+        return self.__view.definition()
+
+    def state(self)->GameState:
+        '''
+        :return: GameState saved in the file without the player objects, None if no state
+        '''
+        return self.__view.state()
+
+    def close(self):
+        self.__mmap.close()
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def build_items(definition: MapDefinition)->tuple:
+    '''create the blocks and items of the map
+
+    :param definition: definition of the map
+    :return: (list of EstateBlock, list of items)
+    '''
+    blocks = [EstateBlock(name) for name in definition.blocks]
+    items = [_build_item(tile, blocks) for tile in definition.tiles]
+    return blocks, items
+
+
+def _build_item(tile: TileDefinition, blocks: list):
+    cls = tile.cls
+    if cls is Estate:
+        if not 0 <= tile.block < len(blocks):
+            raise ValueError('地产 {} 的地段不存在：{}。'.format(tile.name, tile.block))
+        return Estate(tile.name, list(tile.fees), tile.buy_value, tile.pledge_value,
+                      tile.upgrade_value, blocks[tile.block])
+    if issubclass(cls, BaseProject) and cls.__init__ is BaseProject.__init__:
+        return cls(tile.name, tile.buy_value, tile.sell_value)
+    item = cls()  # 名称和价格固定的项目和公共地块
+    if item.name != tile.name:
+        raise ValueError('{} 的名称应为 {}。'.format(tile.name, item.name))
+    if (issubclass(cls, BaseProject)
+            and (item.buy_value, item.sell_value) != (tile.buy_value, tile.sell_value)):
+        raise ValueError('{} 的价格应为 {}/{}。'.format(tile.name, item.buy_value, item.sell_value))
+    return item
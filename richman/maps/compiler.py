@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*
+'''地图编译器，读取 xlsx 表格中的地图，校验后编译为地图文件并缓存
+'''
+import hashlib
+import os
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+import richman.mapfile as mf
+from richman.map import BaseMap
+from richman.estate import Estate
+from richman.project import (
+    ProjectNuclear,
+    ProjectBuilder,
+    ProjectTransportation,
+    ProjectTvStation,
+    ProjectSewerage
+)
+from richman.public import (
+    PublicStart,
+    PublicNews,
+    PublicPrison,
+    PublicLuck,
+    PublicStock,
+    PublicGotoPrison,
+    PublicPark,
+    PublicTax
+)
+
+
+_NS = {'m': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+       'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
+       'rel': 'http://schemas.openxmlformats.org/package/2006/relationships'}
+
+# tiles that are not estates are found by the names in the sheet
+PROJECTS = {
+    '核能发电站': ProjectNuclear,
+    '建筑公司': ProjectBuilder,
+    '大陆运输': ProjectTransportation,
+    '航空运输': ProjectTransportation,
+    '大洋运输': ProjectTransportation,
+    '电视台': ProjectTvStation,
+    '污水处理厂': ProjectSewerage,
+}
+PUBLICS = {
+    '起点': PublicStart,
+    '新闻': PublicNews,
+    '监狱': PublicPrison,
+    '运气': PublicLuck,
+    '证券中心': PublicStock,
+    '入狱': PublicGotoPrison,
+    '公园': PublicPark,
+    '公元': PublicPark,  # 表格中的笔误
+    '税务中心': PublicTax,
+}
+
+COLUMNS = ('no', 'item', 'block', 'fee0', 'fee1', 'fee2', 'fee3',
+           'buy_value', 'sell_value', 'pledge_value', 'upgrade_value')
+
+CACHE_DIR_NAME = '__mapcache__'
+CACHE_SUFFIX = '.rmmap'
+
+
+def read_sheet(file_path: str, sheet: str = 'map')->list:
+    '''read a sheet of a xlsx file, only the values of the cells are read
+
+    :param file_path: xlsx file
+    :param sheet: name of the sheet
+    :return: rows, each row is a {column name in the first row: cell text} dict
+    '''
+    with zipfile.ZipFile(file_path) as book:
+        strings = _read_shared_strings(book)
+        root = ET.fromstring(book.read(_sheet_path(book, sheet)))
+    table = []
+    for row in root.iter('{%s}row' % _NS['m']):
+        cells = {}
+        for cell in row.findall('m:c', _NS):
+            column = re.match(r'[A-Z]+', cell.get('r')).group()
+            cells[column] = _cell_text(cell, strings)
+        table.append(cells)
+    if not table:
+        return []
+    header = {column: name for column, name in table[0].items() if name}
+    return [{header[column]: text for column, text in cells.items()
+             if column in header and text not in (None, '')}
+            for cells in table[1:]]
+
+
+def _sheet_path(book: zipfile.ZipFile, sheet: str)->str:
+    workbook = ET.fromstring(book.read('xl/workbook.xml'))
+    relations = ET.fromstring(book.read('xl/_rels/workbook.xml.rels'))
+    targets = {relation.get('Id'): relation.get('Target')
+               for relation in relations.findall('rel:Relationship', _NS)}
+    for item in workbook.iter('{%s}sheet' % _NS['m']):
+        if item.get('name') == sheet:
+            target = targets[item.get('{%s}id' % _NS['r'])]
+            if target.startswith('/'):
+                return target.lstrip('/')
+            return posixpath.normpath(posixpath.join('xl', target))
+    raise ValueError('表格中没有工作表：{}。'.format(sheet))
+
+
+def _read_shared_strings(book: zipfile.ZipFile)->list:
+    try:
+        root = ET.fromstring(book.read('xl/sharedStrings.xml'))
+    except KeyError:
+        return []
+    return [''.join(text.text or '' for text in item.iter('{%s}t' % _NS['m']))
+            for item in root.findall('m:si', _NS)]
+
+
+def _cell_text(cell, strings: list)->str:
+    kind = cell.get('t')
+    if kind == 'inlineStr':
+        return ''.join(text.text or '' for text in cell.iter('{%s}t' % _NS['m']))
+    value = cell.find('m:v', _NS)
+    if value is None:
+        return None
+    if kind == 's':
+        return strings[int(value.text)]
+    return value.text
+
+
+def parse_map(rows: list, name: str)->mf.MapDefinition:
+    '''check the rows of a map sheet and turn them into a map definition
+
+    :param rows: rows returned by read_sheet()
+    :param name: name of the map
+    :return: MapDefinition
+    '''
+    blocks = {}  # struct: {block number in the sheet: block index}
+    tiles = []
+    estate_names = set()
+    for expected_no, row in enumerate(rows, 1):
+        line = expected_no + 1  # 表格中的行号
+        if _int(row, 'no', line) != expected_no:
+            raise ValueError('第 {} 行的编号应为 {}。'.format(line, expected_no))
+        item = row.get('item')
+        if not item:
+            raise ValueError('第 {} 行没有名称。'.format(line))
+        if 'block' in row:
+            if item in estate_names:
+                raise ValueError('第 {} 行的地产重名：{}。'.format(line, item))
+            estate_names.add(item)
+            tiles.append(_parse_estate(row, line, blocks))
+        elif item in PROJECTS:
+            tiles.append(mf.TileDefinition(PROJECTS[item], item, mf.NO_BLOCK, None,
+                                           _int(row, 'buy_value', line),
+                                           _int(row, 'sell_value', line), 0, 0))
+        elif item in PUBLICS:
+            cls = PUBLICS[item]
+            tiles.append(mf.TileDefinition(cls, cls().name, mf.NO_BLOCK, None, 0, 0, 0, 0))
+        else:
+            raise ValueError('第 {} 行的地块未知：{}。'.format(line, item))
+    block_names = tuple('block{}'.format(number) for number in blocks)
+    definition = mf.MapDefinition(name, block_names, tuple(tiles))
+    mf.build_items(definition)  # 构造一次，由各类自身的检查校验数值
+    return definition
+
+
+def _parse_estate(row: dict, line: int, blocks: dict)->mf.TileDefinition:
+    fees = tuple(_int(row, 'fee{}'.format(level), line) for level in range(4))
+    buy_value = _int(row, 'buy_value', line)
+    sell_value = _int(row, 'sell_value', line)
+    pledge_value = _int(row, 'pledge_value', line)
+    upgrade_value = _int(row, 'upgrade_value', line)
+    if list(fees) != sorted(fees):
+        raise ValueError('第 {} 行的地租应随等级增加。'.format(line))
+    if sell_value != buy_value:
+        raise ValueError('第 {} 行的地产售价应等于买价。'.format(line))
+    if not 0 < pledge_value < sell_value:
+        raise ValueError('第 {} 行的抵押价应小于售价。'.format(line))
+    number = _int(row, 'block', line)
+    block = blocks.setdefault(number, len(blocks))
+    return mf.TileDefinition(Estate, row['item'], block, fees,
+                             buy_value, sell_value, pledge_value, upgrade_value)
+
+
+def _int(row: dict, column: str, line: int)->int:
+    if column not in row:
+        raise ValueError('第 {} 行缺少 {}。'.format(line, column))
+    try:
+        value = float(row[column])
+    except ValueError:
+        raise ValueError('第 {} 行的 {} 不是数字：{}。'.format(line, column, row[column])) from None
+    if value != int(value):
+        raise ValueError('第 {} 行的 {} 不是整数：{}。'.format(line, column, row[column]))
+    return int(value)
+
+
+def content_key(data: bytes, name: str)->str:
+    '''cache key of a xlsx file, changes with the file, the name of the map
+    and the map file version
+
+    :param data: content of the xlsx file
+    :param name: name of the map
+    :return: hex digest
+    '''
+    digest = hashlib.sha256(data)
+    digest.update(b'\0' + name.encode('utf-8'))
+    digest.update(mf.MAGIC + mf.VERSION.to_bytes(2, 'little'))
+    return digest.hexdigest()
+
+
+def compile_map(file_path: str, cache_dir: str = None, name: str = None)->mf.MapDefinition:
+    '''compile the map in a xlsx file, the result is cached by the content of the file
+    and the name of the map
+
+    :param file_path: xlsx file
+    :param cache_dir: directory of the compiled maps, default is __mapcache__ next to
+                      the xlsx file, False means no cache
+    :param name: name of the map, default is the name of the file
+    :return: MapDefinition
+    '''
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    if name is None:
+        name = os.path.splitext(os.path.basename(file_path))[0]
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(file_path)), CACHE_DIR_NAME)
+    cache_path = None
+    if cache_dir is not False:
+        cache_path = os.path.join(cache_dir, content_key(data, name) + CACHE_SUFFIX)
+        try:
+            with open(cache_path, 'rb') as f:
+                definition = mf.unpack_definition(f.read())
+        except (OSError, ValueError):  # 没有缓存或缓存已损坏
+            pass
+        else:
+            if definition.name == name:
+                return definition
+    definition = parse_map(read_sheet(file_path), name)
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_path = '{}.{}.tmp'.format(cache_path, os.getpid())
+        with open(temp_path, 'wb') as f:
+            f.write(mf.pack_definition(definition))
+        os.replace(temp_path, cache_path)
+    return definition
+
+
+class MapCompiled(BaseMap):
+    '''map compiled from a xlsx file
+    '''
+
+    def __init__(self, file_path: str, cache_dir: str = None, name: str = None):
+        '''init
+
+        :param file_path: xlsx file
+        :param cache_dir: see compile_map()
+        :param name: name of the map, default is the name of the file
+        '''
+        definition = compile_map(file_path, cache_dir, name)
+        super().__init__(name=definition.name, items=[])
+        blocks, items = mf.build_items(definition)
+        self._blocks.extend(blocks)
+        self._add_items(items)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*
+'''落点概率，把掷骰移动看作马尔可夫链，用 numpy 解出各地块被走到的概率
+'''
+import numpy as np
+
+from richman.dice import DiceStream
+
+
+class LandingChain:
+    '''the moves of a player on a map as a Markov chain, one step per turn
+
+    a turn rolls the dice, moves forward (or backward, see BasePlayer.play()) with
+    wrap-around and lands on a tile; landing on a jump tile then moves the player
+    to a target without landing on it, as BasePlayer.trigger_jump_to_estate()
+
+    :note: landing probabilities count the tiles that are triggered, the jump tiles
+           included; positions are where the turns end
+    '''
+
+    def __init__(self, map, distribution: dict = None, reverse: float = 0.0,
+                 jumps: dict = None):
+        '''init
+
+        :param map: BaseMap, only the number of items is used
+        :param distribution: {steps: probability} of a roll, default is DiceStream().distribution()
+        :param reverse: probability that a turn moves backward
+        :param jumps: {tile: target} or {tile: {target: probability}}, where a player
+                      landing on the tile goes at the end of the turn
+        '''
+        assert 0.0 <= reverse <= 1.0, '后退概率必须在 0 到 1 之间。'
+        tiles = len(map.items)
+        assert tiles > 0, '地图中没有地块。'
+        if distribution is None:
+            distribution = DiceStream().distribution()
+        self.__tiles = tiles
+        self.__roll = np.zeros((tiles, tiles))
+        identity = np.eye(tiles)
+        for steps, probability in distribution.items():
+            if reverse < 1.0:
+                self.__roll += probability * (1.0 - reverse) * np.roll(identity, steps, axis=1)
+            if reverse > 0.0:
+                self.__roll += probability * reverse * np.roll(identity, -steps, axis=1)
+        self.__jump = identity.copy()
+        for tile, targets in (jumps or {}).items():
+            if not isinstance(targets, dict):
+                targets = {targets: 1.0}
+            assert abs(sum(targets.values()) - 1.0) < 1e-9, \
+                '地块 {} 的跳转概率之和必须为 1。'.format(tile)
+            self.__jump[tile] = 0.0
+            for target, probability in targets.items():
+                self.__jump[tile, target % tiles] += probability
+        self.__transition = self.__roll @ self.__jump
+
+    @property
+    def tiles(self):
+        return self.__tiles
+    @property
+    def roll(self):
+        '''roll[i, j]: probability of landing on tile j from tile i in a turn
+        '''
+        return self.__roll
+    @property
+    def transition(self):
+        '''transition[i, j]: probability of ending a turn at tile j from tile i
+        '''
+        return self.__transition
+
+    def __start(self, start)->np.ndarray:
+        if isinstance(start, (int, np.integer)):
+            distribution = np.zeros(self.__tiles)
+            distribution[start % self.__tiles] = 1.0
+            return distribution
+        distribution = np.asarray(start, dtype=float)
+        assert distribution.shape == (self.__tiles,), '起点分布的长度必须等于地块数量。'
+        return distribution
+
+    def stationary_positions(self)->np.ndarray:
+        '''
+        :return: long-run probability of ending a turn at each tile
+        '''
+        tiles = self.__tiles
+        # pi (P - I) = 0 and sum(pi) = 1, least squares also covers reducible chains
+        system = np.vstack([self.__transition.T - np.eye(tiles), np.ones((1, tiles))])
+        target = np.zeros(tiles + 1)
+        target[-1] = 1.0
+        positions = np.linalg.lstsq(system, target, rcond=None)[0]
+        positions = np.clip(positions, 0.0, None)
+        return positions / positions.sum()
+
+    def stationary(self)->np.ndarray:
+        '''
+        :return: long-run probability of landing on each tile in a turn
+        '''
+        return self.stationary_positions() @ self.__roll
+
+    def landings(self, turns: int, start=0)->np.ndarray:
+        '''
+        :param turns: number of turns
+        :param start: tile where the player is, or a probability of each tile
+        :return: probability of landing on each tile in each turn, shape (turns, tiles)
+        '''
+        positions = self.__start(start)
+        result = np.empty((turns, self.__tiles))
+        for turn in range(turns):
+            result[turn] = positions @ self.__roll
+            positions = positions @ self.__transition
+        return result
+
+    def expected_landings(self, turns: int, start=0)->np.ndarray:
+        '''
+        :param turns: number of turns
+        :param start: see landings()
+        :return: expected number of landings on each tile in the turns
+        '''
+        return self.landings(turns, start).sum(axis=0)
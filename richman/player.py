@@ -1,33 +1,63 @@
 # -*- coding: utf-8 -*
 '''player
 '''
+import asyncio
+import math
 import random
-import datetime
 import logging
+import time
 
+import richman.log as log
+import richman.trace as trc
 import richman.interface as itf
+import richman.event as ev
+from richman.dice import DiceStream
+from richman.holdings import Holdings
+from richman.lookahead import Lookahead, Timeout
+from richman.state import GameState
 
 
 class BasePlayer(itf.IGameForPlayer, itf.IMapForPlayer,
                  itf.IEstateForPlayer, itf.IProjectForPlayer):
 
+    __slots__ = ('__name', '__map', '__rng', '__has_own_rng', '__dice', '__has_own_dice', '__trace', '__game', '__is_making_money',
+                 '__state', '__index', '__moneys', '__positions',
+                 '_estates', '_projects',
+                 '__estate_levels', '__estate_count', '__estate_upgrades',
+                 '__weakref__')  # 可被 EventManager 弱引用
+    __kHoldings = {itf.KIND_ESTATE: '_estates', itf.KIND_PROJECT: '_projects'}
+
     def __init__(self, name: str, money: int,
-                 map:itf.IPlayerForMap = None):
+                 map:itf.IPlayerForMap = None, rng: random.Random = None,
+                 dice: DiceStream = None):
         '''init
 
         :param name: player name
         :param money: player's init money
         :param map: default is None
+        :param rng: random generator of the player, kept by the game, default is a new
+                    unseeded one that the game replaces with its own
+        :param dice: dice of the player, kept by the game, default is a single dice
+                     seeded from rng, kept by the game if rng is given and replaced
+                     with the dice of the game otherwise
         '''
         self.__name = name
         assert money > 0, '初始资金必须大于零。'
-        self.__money = money
+        self.__bind(GameState(0, [self]), 0)  # 加入比赛前使用自己的状态
+        self.__moneys[0] = money
         self.__map = map
         # init others
-        self._estates = []
-        self._projects = []
-        self.__pos = 0
-        random.seed(datetime.datetime.now())
+        self._estates = Holdings()
+        self._projects = Holdings()
+        self.__estate_levels = []  # struct: [estates of level 0, level 1, ...]
+        self.__estate_count = 0
+        self.__estate_upgrades = 0
+        self.__has_own_rng = rng is not None
+        self.__rng = rng if rng is not None else random.Random()
+        self.__has_own_dice = dice is not None or rng is not None
+        self.__dice = dice if dice is not None else DiceStream(self.__rng.getrandbits(64))
+        self.__trace = None
+        self.__game = None
         self.__is_making_money = False  # 防止一个 make_money() 过程中多次调用该函数
                                         # add_money() 中使用
 
@@ -39,7 +69,7 @@ class BasePlayer(itf.IGameForPlayer, itf.IMapForPlayer,
         raise NotImplementedError('need override.')
     @property
     def money(self):
-        return self.__money
+        return self.__moneys[self.__index]
     @property
     def map(self):
         return self.__map
@@ -47,11 +77,50 @@ class BasePlayer(itf.IGameForPlayer, itf.IMapForPlayer,
     def map(self, value: itf.IPlayerForMap):
         self.__map = value
     @property
+    def rng(self):
+        return self.__rng
+    @rng.setter
+    def rng(self, value: random.Random):
+        self.__rng = value
+    @property
+    def has_own_rng(self):
+        return self.__has_own_rng
+    @property
+    def dice(self):
+        return self.__dice
+    @dice.setter
+    def dice(self, value: DiceStream):
+        self.__dice = value
+    @property
+    def has_own_dice(self):
+        return self.__has_own_dice
+    @property
+    def trace(self):
+        '''
+        :return: TraceRecorder of the game, None if the game is not recorded
+        '''
+        return self.__trace
+    @trace.setter
+    def trace(self, value: trc.TraceRecorder):
+        self.__trace = value
+    @property
+    def game(self):
+        return self.__game
+    @game.setter
+    def game(self, value):
+        self.__game = value
+    @property
+    def is_making_money(self):
+        return self.__is_making_money
+    @property
     def pos(self):
-        return self.__pos
+        return self.__positions[self.__index]
     @pos.setter
     def pos(self, value: int):
-        self.__pos = value % len(self.__map)
+        self.__positions[self.__index] = value % len(self.__map)
+    @property
+    def state(self):
+        return self.__state
     @property
     def estates(self):
         return self._estates
@@ -59,29 +128,98 @@ class BasePlayer(itf.IGameForPlayer, itf.IMapForPlayer,
     def projects(self):
         return self._projects
     @property
+    def net_worth(self):
+        '''money plus the sell value of all the places the player has
+        '''
+        places_value = sum(place.sell_value for place in self.estates)
+        places_value += sum(place.sell_value for place in self.projects)
+        return self.money + places_value
+    @property
     def estate_max_level(self):
         '''return the max level of all the estate the player has
         '''
-        if not self.estates:
-            return 0
-        levels = (estate.current_level for estate in self.estates
-                    if isinstance(estate, itf.IPlayerForEstate))
-        return max(levels)
+        for level in range(len(self.__estate_levels) - 1, 0, -1):
+            if self.__estate_levels[level]:
+                return level
+        return 0
+    @property
+    def estate_count(self):
+        return self.__estate_count
+    @property
+    def estate_upgrades(self):
+        '''return the sum of the levels of all the estate the player has
+        '''
+        return self.__estate_upgrades
+    @property
+    def estate_level_counts(self):
+        '''return the number of estates of each level, indexed by level
+        '''
+        return tuple(self.__estate_levels)
+
+    def __bind(self, state: GameState, index: int):
+        self.__state = state
+        self.__index = index
+        self.__moneys = state.player_money
+        self.__positions = state.player_pos
+
+    def _bind_state(self, state: GameState, index: int):
+        '''move money and position of the player into the state of a game
+
+        :param state: state of the game
+        :param index: index of the player in the game
+        '''
+        money, pos = self.money, self.pos
+        self.__bind(state, index)
+        self.__moneys[index] = money
+        self.__positions[index] = pos
 
     def _dice(self)->int:
-        return random.randrange(1,7)
+        return self.__dice.roll()
+
+    def _rebuild_estate_levels(self):
+        '''count the levels of self.estates again, needed after the state is
+        changed behind the estates, e.g. by Game.restore()
+        '''
+        self.__estate_levels = []
+        self.__estate_count = 0
+        self.__estate_upgrades = 0
+        for estate in self._estates:
+            self._update_estate_level(None, estate.current_level)
+
+    def _update_estate_level(self, old_level: int, new_level: int):
+        '''keep the histogram of estate levels, called by the estates
+
+        :param old_level: level before, None if the estate was not the player's
+        :param new_level: level after, None if the estate is not the player's any more
+        '''
+        levels = self.__estate_levels
+        if old_level is not None:
+            levels[old_level] -= 1
+            self.__estate_count -= 1
+            self.__estate_upgrades -= old_level
+        if new_level is not None:
+            if new_level >= len(levels):
+                levels.extend([0] * (new_level + 1 - len(levels)))
+            levels[new_level] += 1
+            self.__estate_count += 1
+            self.__estate_upgrades += new_level
     
+    def _holdings_of(self, place: itf.IPlayerForPlace)->Holdings:
+        '''
+        :param place: estate or project
+        :return: self._estates or self._projects, chosen by the kind of the place
+        '''
+        try:
+            return getattr(self, self.__kHoldings[itf.kind_of(place)])
+        except KeyError:
+            raise RuntimeError('参数 place 必须是 Estate 或者 Project 类型') from None
+
     def _remove_place(self, place: itf.IPlayerForPlace):
-        '''remove the place from self._estates or self._projects
+        '''remove the place from self._estates or self._projects, O(1)
 
         :param place: estate or project
         '''
-        if isinstance(place, itf.IPlayerForEstate):
-            self._estates.remove(place)
-        elif isinstance(place, itf.IPlayerForProject):
-            self._projects.remove(place)
-        else:
-            raise RuntimeError('参数类型不正确。')
+        self._holdings_of(place).remove(place)
 
     def add_to_map(self, map: itf.IPlayerForMap):
         '''add player to map
@@ -90,13 +228,34 @@ class BasePlayer(itf.IGameForPlayer, itf.IMapForPlayer,
         '''
         self.__map = map
 
+    def _set_money(self, money: int):
+        '''set money directly, without making money when it is below zero, used by replay
+
+        :param money: money of the player
+        '''
+        self.__moneys[self.__index] = money
+
+    def _set_banckrupted(self, value: bool):
+        '''set the banckrupted flag directly, used by replay
+
+        :param value: True if is banckrupted
+        '''
+        raise NotImplementedError('need override.')
+
+    def _set_making_money(self, value: bool):
+        '''set the flag of make_money() directly, used by rollouts
+
+        :param value: True if the player is making money
+        '''
+        self.__is_making_money = value
+
     def add_money(self, delta: int):
         '''change the player's money
 
         :param delta: amount of change, minus means subtraction
         '''
-        self.__money += delta
-        if self.__money < 0 and not self.__is_making_money:
+        self.__moneys[self.__index] += delta
+        if self.__moneys[self.__index] < 0 and not self.__is_making_money:
             self.__is_making_money = True
             self._make_money()
             self.__is_making_money = False
@@ -107,6 +266,8 @@ class BasePlayer(itf.IGameForPlayer, itf.IMapForPlayer,
         :param pos: position to move to
         '''
         self.pos = pos
+        if self.__trace is not None:
+            self.__trace.record_move(self, self.pos)
 
     def play(self, reverse=False):
         '''进行下一步游戏
@@ -114,24 +275,30 @@ class BasePlayer(itf.IGameForPlayer, itf.IMapForPlayer,
         :param reverse: 是否后退标志
         '''
         step = self._dice()
-        logging.info('{} 掷出 {} 点。'.format(self.name, step))
+        if log.enabled:
+            logging.info('{} 掷出 {} 点。'.format(self.name, step))
         if reverse:
             step = 0 - step
         self.pos += step
+        if self.__trace is not None:
+            self.__trace.record(trc.ROLL, self, None, step)
+            self.__trace.record_move(self, self.pos)
+        if self.__game is not None and self.__game._wants(ev.EVENT_LAND):
+            self.__game.events.send(ev.LandEvent(self, self.pos))
         self.map.trigger(self)
 
+    async def prepare_turn(self):
+        '''called by Game.run_async() before play(), nothing to prepare by default
+        '''
+        pass
+
     def trigger_buy(self, place: itf.IPlayerForPlace):
         '''decide whether to buy the place
 
         :param place: IPlayerForPlace
         '''
         if self._make_decision_buy(place):
-            if isinstance(place, itf.IPlayerForProject):
-                self._projects.append(place)
-            elif isinstance(place, itf.IPlayerForEstate):
-                self._estates.append(place)
-            else:
-                raise RuntimeError('参数 place 必须是 Estate 或者 Project 类型')
+            self._holdings_of(place).add(place)
             place.buy(self)
 
     def trigger_upgrade(self, place: itf.IPlayerForEstate):
@@ -146,6 +313,8 @@ class BasePlayer(itf.IGameForPlayer, itf.IMapForPlayer,
         '''select which estate to go when jump is needed
         '''
         self.pos = self._make_decision_jump_to_estate()
+        if self.__trace is not None:
+            self.__trace.record_move(self, self.pos)
 
     def trigger_upgrade_any_estate(self):
         '''upgrade and estate that belongs to the player
@@ -205,11 +374,21 @@ class BasePlayer(itf.IGameForPlayer, itf.IMapForPlayer,
 
 class PlayerSimple(BasePlayer):
 
-    __is_banckrupted = False
+    __slots__ = ('__is_banckrupted',)
+
+    def __init__(self, name: str, money: int,
+                 map: itf.IPlayerForMap = None, rng: random.Random = None,
+                 dice: DiceStream = None):
+        super().__init__(name, money, map, rng, dice)
+        self.__is_banckrupted = False
+
     @property
     def is_banckrupted(self):
         return self.__is_banckrupted
 
+    def _set_banckrupted(self, value: bool):
+        self.__is_banckrupted = value
+
     def __pledge_for_money(self)->bool:
         '''pledge for money
         
@@ -226,10 +405,11 @@ class PlayerSimple(BasePlayer):
     def __sell_place(self, places: list)->int:
         ''' self the places with generator
 
-        :param places: list of IPlayerForPlace
+        :param places: Holdings of IPlayerForPlace
         :return: the player's money after sold out
         '''
-        for place in places:
+        # places 会在循环中被删除，需遍历其副本
+        for place in list(places):
             place.sell()
             self._remove_place(place)
             yield self.money
@@ -291,9 +471,9 @@ class PlayerSimple(BasePlayer):
 
         :return: position of estate to jump
         '''
-        for index, item in enumerate(self.map.items):
-            if (isinstance(item, itf.IPlayerForEstate)
-                    and item.pledge_value is not None):
+        items = self.map.items
+        for index in self.map.positions_of_kind(itf.KIND_ESTATE):
+            if items[index].pledge_value is not None:
                 return index
         else:
             raise RuntimeError('map {} 中没有设置地产！'.format(self.map.name))
@@ -311,9 +491,441 @@ class PlayerSimple(BasePlayer):
             return None
 
 
-class PlayerPerson(BasePlayer):
-    pass
+class DecisionNeeded(Exception):
+    '''raised by PlayerPerson while its turn is played ahead, when a decision is not answered yet
+    '''
+
+    def __init__(self, kind: str, key, default):
+        '''init
+
+        :param kind: DECISION_BUY, DECISION_UPGRADE, DECISION_JUMP, DECISION_UPGRADE_ANY
+                     or DECISION_PLEDGE
+        :param key: name of the place of the decision, None for jump and upgrade any,
+                    number of the estates pledged before in the turn for pledge
+        :param default: answer of PlayerSimple
+        '''
+        super().__init__(kind, key, default)
+        self.kind = kind
+        self.key = key
+        self.default = default
+
+
+# kinds of decisions asked by PlayerPerson, answers:
+DECISION_BUY = 'buy'  # bool
+DECISION_UPGRADE = 'upgrade'  # bool
+DECISION_JUMP = 'jump'  # position of an estate
+DECISION_UPGRADE_ANY = 'upgrade_any'  # name of an estate of the player, or None
+DECISION_PLEDGE = 'pledge'  # name of an estate of the player to pledge, or None to sell
+
+
+class PlayerPerson(PlayerSimple):
+    '''human player, the decisions are answered by a client
+
+    before each turn, the turn is played ahead until a decision has no answer,
+    the client is asked and the turn is played ahead again; the turn is played
+    with the answers when all of them are known, so the game never waits inside
+    the synchronous triggers of the places
+
+    :note: the answers of PlayerSimple are used when the client is late or wrong,
+           or when the game is not run as a coroutine; when no estate is chosen to
+           pledge, money is made as PlayerSimple
+    '''
+
+    __slots__ = ('__client', '__timeout', '__answers', '__step', '__is_preparing', '__pledges')
+
+    def __init__(self, name: str, money: int,
+                 map: itf.IPlayerForMap = None, rng: random.Random = None,
+                 dice: DiceStream = None, client=None, timeout: float = 30.0):
+        '''init
+
+        :param client: object with a coroutine decide(player, kind, key, default)
+                       returning the answer, see DecisionNeeded
+        :param timeout: max seconds to wait for each answer, None means no limit
+        '''
+        super().__init__(name, money, map, rng, dice)
+        self.__client = client
+        self.__timeout = timeout
+        self.__answers = {}  # struct: {(kind, key): answer}
+        self.__step = None  # 提前掷出的点数，预演和正式进行本回合时使用
+        self.__is_preparing = False
+        self.__pledges = 0  # 本回合已抵押的地产数，作为抵押决定的 key
+
+    @property
+    def client(self):
+        return self.__client
+    @client.setter
+    def client(self, value):
+        self.__client = value
+    @property
+    def timeout(self):
+        return self.__timeout
+
+    async def prepare_turn(self):
+        '''roll the dice, then get the answers of the decisions of the turn from the client
+        '''
+        self.__answers.clear()
+        self.__step = None
+        if self.__client is None or self.game is None:
+            return None
+        self.__step = self.dice.roll()
+        while True:
+            needed = self.__play_ahead()
+            if needed is None:
+                break
+            self.__answers[(needed.kind, needed.key)] = await self.__ask(needed)
+        self.__pledges = 0
+
+    def __play_ahead(self)->DecisionNeeded:
+        '''
+        :return: the first decision not answered, None if the turn can be played
+        '''
+        with self.game._rollout(self.dice):
+            self.__is_preparing = True
+            self.__pledges = 0
+            try:
+                self.play()
+            except DecisionNeeded as needed:
+                return needed
+            finally:
+                self.__is_preparing = False
+        return None
+
+    async def __ask(self, needed: DecisionNeeded):
+        try:
+            return await asyncio.wait_for(
+                self.__client.decide(self, needed.kind, needed.key, needed.default),
+                self.__timeout)
+        except asyncio.TimeoutError:
+            if log.enabled:
+                logging.info('{} 超时未作决定，按默认处理。'.format(self.name))
+            return needed.default
+        except Exception:  # 客户端出错时不影响比赛
+            if log.enabled:
+                logging.exception('{} 的客户端出错，按默认处理。'.format(self.name))
+            return needed.default
+
+    def play(self, reverse=False):
+        '''play the turn prepared, the answers are forgotten after it, so that the
+        decisions outside the turn, e.g. in the rollouts of other players, are the defaults
+        '''
+        try:
+            super().play(reverse)
+        finally:
+            if not self.__is_preparing:
+                self.__answers.clear()
+                self.__step = None
+                self.__pledges = 0
+
+    def _dice(self)->int:
+        if self.__step is None:
+            return super()._dice()
+        step = self.__step
+        if not self.__is_preparing:
+            self.__step = None
+        return step
+
+    def __answer(self, kind: str, key, default):
+        if (kind, key) in self.__answers:
+            return self.__answers[(kind, key)]
+        if self.__is_preparing:
+            raise DecisionNeeded(kind, key, default)
+        return default
+
+    def _make_money(self):
+        '''pledge the estates chosen by the client one by one, then make money as PlayerSimple
+        '''
+        while self.money <= 0:
+            estates = [estate for estate in self.estates if not estate.is_pledged]
+            if not estates:
+                break
+            answer = self.__answer(DECISION_PLEDGE, self.__pledges, estates[0].name)
+            estate = next((estate for estate in estates if estate.name == answer), None)
+            if estate is None:
+                break
+            estate.pledge()
+            self.__pledges += 1
+        if self.money > 0:
+            return None
+        super()._make_money()
+
+    def _make_decision_buy(self, place: itf.IPlayerForPlace)->bool:
+        default = super()._make_decision_buy(place)
+        answer = self.__answer(DECISION_BUY, place.name, default)
+        return bool(answer) and self.money > place.buy_value
+
+    def _make_decision_upgrade(self, estate: itf.IPlayerForEstate)->bool:
+        default = super()._make_decision_upgrade(estate)
+        answer = self.__answer(DECISION_UPGRADE, estate.name, default)
+        return bool(answer) and not estate.is_level_max
+
+    def _make_decision_jump_to_estate(self)->int:
+        default = super()._make_decision_jump_to_estate()
+        answer = self.__answer(DECISION_JUMP, None, default)
+        if answer in self.map.positions_of_kind(itf.KIND_ESTATE):
+            return answer
+        return default
+
+    def _make_decision_upgrade_any_estate(self)->itf.IPlayerForEstate:
+        default = super()._make_decision_upgrade_any_estate()
+        answer = self.__answer(DECISION_UPGRADE_ANY, None,
+                               default.name if default is not None else None)
+        for estate in self.estates:
+            if estate.name == answer and not estate.is_level_max:
+                return estate
+        return None
+
+
+class PlayerCpu(PlayerSimple):
+    '''computer player, every decision is made by Monte Carlo rollouts from the
+    current position, the options are chosen to roll out by UCB1
+
+    :note: while rolling out, all the players follow the rules of PlayerSimple
+    '''
+
+    __slots__ = ('__rollouts', '__time_limit', '__horizon', '__exploration')
+
+    def __init__(self, name: str, money: int,
+                 map: itf.IPlayerForMap = None, rng: random.Random = None,
+                 dice: DiceStream = None, rollouts: int = 64,
+                 time_limit: float = None, horizon: int = 20,
+                 exploration: float = math.sqrt(2)):
+        '''init
+
+        :param rollouts: max rollouts of each decision
+        :param time_limit: max seconds of each decision, None means no limit,
+                           every option is rolled out at least once
+        :param horizon: rounds played after the current one in each rollout
+        :param exploration: exploration constant of UCB1
+        '''
+        super().__init__(name, money, map, rng, dice)
+        assert rollouts > 0, '推演次数必须大于零。'
+        self.__rollouts = rollouts
+        self.__time_limit = time_limit
+        self.__horizon = horizon
+        self.__exploration = exploration
+
+    @property
+    def rollouts(self):
+        return self.__rollouts
+    @property
+    def time_limit(self):
+        return self.__time_limit
+    @property
+    def horizon(self):
+        return self.__horizon
+
+    def __can_search(self)->bool:
+        return self.game is not None and not self.game.is_rollout
+
+    def __search(self, options: list, apply):
+        '''choose the option with the most rollouts, the rollouts go to the options by UCB1
+
+        :param options: options of the decision, the first one wins ties
+        :param apply: apply(option) takes the option in a rollout
+        :return: the chosen option
+        '''
+        if len(options) == 1:
+            return options[0]
+        # 每个选项的第 k 次推演使用相同的骰子，比较选项时排除骰子带来的差异
+        seed = self.rng.getrandbits(64)
+        visits = [0] * len(options)
+        rewards = [0.0] * len(options)
+        deadline = None
+        if self.__time_limit is not None:
+            deadline = time.perf_counter() + self.__time_limit
+        for rollout in range(self.__rollouts):
+            if rollout < len(options):
+                index = rollout
+            elif deadline is not None and time.perf_counter() > deadline:
+                break
+            else:
+                log_total = math.log(rollout)
+                index = max(range(len(options)),
+                            key=lambda i: rewards[i] / visits[i]
+                            + self.__exploration * math.sqrt(log_total / visits[i]))
+            dice = DiceStream((seed + visits[index]) % 2**64, block_size=256)
+            rewards[index] += self._rollout(apply, options[index], dice)
+            visits[index] += 1
+        best = max(range(len(options)),
+                   key=lambda i: (visits[i], rewards[i] / visits[i] if visits[i] else 0.0))
+        return options[best]
+
+    def _rollout(self, apply, option, dice: DiceStream)->float:
+        '''play one rollout of the option
+
+        :param apply: see __search()
+        :param option: option to take
+        :param dice: dice of the rollout
+        :return: reward of the rollout, see __evaluate()
+        '''
+        with self.game._rollout(dice) as game:
+            apply(option)
+            game._play_ahead(self, self.__horizon)
+            return self.__evaluate()
+
+    def __evaluate(self)->float:
+        '''
+        :return: share of the net worth of the players in game, 0 if banckrupted
+        '''
+        if self.is_banckrupted:
+            return 0.0
+        players = self.game.players_in_game
+        if len(players) == 1:
+            return 1.0
+        total = sum(max(player.net_worth, 0) for player in players)
+        return self.net_worth / total if total > 0 else 0.0
 
+    # decisions
 
-class PlayerCpu(BasePlayer):
-    pass
\ No newline at end of file
+    def _make_money(self):
+        '''pledge the estates chosen by rollouts one by one, then sell as PlayerSimple
+        '''
+        if self.__can_search():
+            while self.money <= 0:
+                estates = [estate for estate in self.estates if not estate.is_pledged]
+                if not estates:
+                    break
+                self.__search(estates, self.__apply_pledge).pledge()
+            if self.money > 0:
+                return None
+        super()._make_money()
+
+    def __apply_pledge(self, estate: itf.IPlayerForEstate):
+        estate.pledge()
+        if self.money <= 0:
+            self._make_money()
+
+    def _make_decision_buy(self, place: itf.IPlayerForPlace)->bool:
+        if not super()._make_decision_buy(place) or not self.__can_search():
+            return super()._make_decision_buy(place)
+        return self.__search([True, False],
+                             lambda buy: buy and self.__apply_buy(place))
+
+    def __apply_buy(self, place: itf.IPlayerForPlace):
+        self._holdings_of(place).add(place)
+        place.buy(self)
+
+    def _make_decision_upgrade(self, estate: itf.IPlayerForEstate)->bool:
+        if not super()._make_decision_upgrade(estate) or not self.__can_search():
+            return super()._make_decision_upgrade(estate)
+        return self.__search([True, False],
+                             lambda upgrade: upgrade and estate.upgrade())
+
+    def _make_decision_jump_to_estate(self)->int:
+        if not self.__can_search():
+            return super()._make_decision_jump_to_estate()
+        items = self.map.items
+        positions = [pos for pos in self.map.positions_of_kind(itf.KIND_ESTATE)
+                     if items[pos].pledge_value is not None]
+        if not positions:
+            return super()._make_decision_jump_to_estate()
+        return self.__search(positions, self.__apply_jump)
+
+    def __apply_jump(self, pos: int):
+        self.pos = pos
+
+    def _make_decision_upgrade_any_estate(self)->itf.IPlayerForEstate:
+        if not self.__can_search():
+            return super()._make_decision_upgrade_any_estate()
+        options = [estate for estate in self.estates if not estate.is_level_max]
+        options.append(None)
+        return self.__search(options, lambda estate: estate and estate.upgrade())
+
+
+class PlayerExpectimax(PlayerSimple):
+    '''computer player, every decision is made by depth-limited expectimax over the
+    rolls of the player, see Lookahead
+
+    :note: the search goes one turn deeper at a time until max_depth or the time limit,
+           the option found by the deepest finished search is chosen; without a time
+           limit the decisions depend on the seed only, a time limit caps the latency
+           but makes the game depend on the speed of the machine
+    '''
+
+    __slots__ = ('__max_depth', '__time_limit', '__tail')
+
+    def __init__(self, name: str, money: int,
+                 map: itf.IPlayerForMap = None, rng: random.Random = None,
+                 dice: DiceStream = None, max_depth: int = 2,
+                 time_limit: float = None, tail: int = 20):
+        '''init
+
+        :param max_depth: max turns of the player searched after the decision
+        :param time_limit: max seconds of each decision, None means no limit,
+                           the choice of PlayerSimple is kept if no search is finished
+        :param tail: turns of rent counted in the value of the estates, see Lookahead.leaf()
+        '''
+        super().__init__(name, money, map, rng, dice)
+        assert max_depth > 0, '搜索深度必须大于零。'
+        self.__max_depth = max_depth
+        self.__time_limit = time_limit
+        self.__tail = tail
+
+    @property
+    def max_depth(self):
+        return self.__max_depth
+    @property
+    def time_limit(self):
+        return self.__time_limit
+
+    def __search(self, options: list, apply):
+        '''choose the option with the highest expected value
+
+        :param options: options of the decision, the choice of PlayerSimple goes first
+        :param apply: apply(lookahead, option) returns (pos, money, levels) after the option
+        :return: the chosen option
+        '''
+        if len(options) == 1:
+            return options[0]
+        deadline = None
+        if self.__time_limit is not None:
+            deadline = time.perf_counter() + self.__time_limit
+        lookahead = Lookahead(self, deadline, self.__tail)
+        starts = [apply(lookahead, option) for option in options]
+        best = options[0]
+        for depth in range(1, self.__max_depth + 1):
+            try:
+                values = [lookahead.value(depth, *start) for start in starts]
+            except Timeout:
+                break
+            best = options[max(range(len(options)), key=values.__getitem__)]
+        return best
+
+    def __apply_buy(self, lookahead: Lookahead, place: itf.IPlayerForPlace)->tuple:
+        if place is None:
+            return self.pos, self.money, lookahead.levels
+        return (self.pos, *lookahead.buy(self.money, lookahead.levels, place.tile_id))
+
+    def __apply_upgrade(self, lookahead: Lookahead, estate: itf.IPlayerForEstate)->tuple:
+        if estate is None:
+            return self.pos, self.money, lookahead.levels
+        return (self.pos, *lookahead.upgrade(self.money, lookahead.levels, estate.tile_id))
+
+    def __apply_jump(self, lookahead: Lookahead, pos: int)->tuple:
+        return pos, self.money, lookahead.levels
+
+    # decisions
+
+    def _make_decision_buy(self, place: itf.IPlayerForPlace)->bool:
+        if (not super()._make_decision_buy(place)
+                or itf.kind_of(place) != itf.KIND_ESTATE):
+            return super()._make_decision_buy(place)
+        return self.__search([place, None], self.__apply_buy) is not None
+
+    def _make_decision_upgrade(self, estate: itf.IPlayerForEstate)->bool:
+        if not super()._make_decision_upgrade(estate):
+            return False
+        return self.__search([estate, None], self.__apply_upgrade) is not None
+
+    def _make_decision_jump_to_estate(self)->int:
+        items = self.map.items
+        positions = [pos for pos in self.map.positions_of_kind(itf.KIND_ESTATE)
+                     if items[pos].pledge_value is not None]
+        if not positions:
+            return super()._make_decision_jump_to_estate()
+        return self.__search(positions, self.__apply_jump)
+
+    def _make_decision_upgrade_any_estate(self)->itf.IPlayerForEstate:
+        options = [estate for estate in self.estates if not estate.is_level_max]
+        options.append(None)
+        return self.__search(options, self.__apply_upgrade)
@@ -3,11 +3,18 @@
 '''
 import logging
 
+import richman.log as log
+import richman.trace as trc
 import richman.interface as itf
+from richman.state import GameState, NO_OWNER, placeholder
 
 
 class BaseProject(itf.IPlayerForProject):
 
+    __slots__ = ('__name', '__buy_value', '__sell_value',
+                 '__state', '__tile', '__owners', '__players')
+    kind = itf.KIND_PROJECT
+
     def __init__(self, name: str, buy_value: int, sell_value: int):
         '''init
 
@@ -19,14 +26,22 @@ class BaseProject(itf.IPlayerForProject):
         self.__buy_value = buy_value
         self.__sell_value = sell_value
         # init others
-        self.__owner = None
+        self.__bind(placeholder(), 0)  # 加入比赛前使用共享的初始状态
 
     @property
     def name(self):
         return self.__name
     @property
     def owner(self):
-        return self.__owner
+        index = self.__owners[self.__tile]
+        if index == NO_OWNER:
+            return None
+        return self.__players[index]
+    @property
+    def tile_id(self):
+        '''position of the project in the map
+        '''
+        return self.__tile
     @property
     def buy_value(self):
         return self.__buy_value
@@ -34,17 +49,54 @@ class BaseProject(itf.IPlayerForProject):
     def sell_value(self):
         return self.__sell_value
 
+    def __bind(self, state: GameState, tile_id: int):
+        self.__state = state
+        self.__tile = tile_id
+        self.__owners = state.tile_owner
+        self.__players = state.players
+
+    def __own_state(self):
+        '''bind to a state of its own before changing, if it is not in a game
+        '''
+        if self.__state is placeholder():
+            self.__bind(GameState(1), 0)
+
+    def _bind_state(self, state: GameState, tile_id: int):
+        '''move the state of the project into the state of a game
+
+        :param state: state of the game
+        :param tile_id: position of the project in the map
+        '''
+        owner = self.owner
+        self.__bind(state, tile_id)
+        self._set_owner(owner)
+
     def buy(self, player: itf.IProjectForPlayer):
         assert not self.owner, '该项目已经卖出，无法购买！'
+        if player.trace is not None:
+            player.trace.record(trc.BUY, player, self, self.buy_value)
         player.add_money(-self.buy_value)
-        self.__owner = player
-        logging.info('{} 购买项目 {}，花费 {} 元。'.format(player.name, self.name, self.buy_value))
+        self.__own_state()
+        self.__owners[self.__tile] = self.__state.player_index(player)
+        if log.enabled:
+            logging.info('{} 购买项目 {}，花费 {} 元。'.format(player.name, self.name, self.buy_value))
 
     def sell(self):
         assert self.owner, '该项目无主，不能卖！'
+        if self.owner.trace is not None:
+            self.owner.trace.record(trc.SELL, self.owner, self, self.sell_value)
         self.owner.add_money(self.sell_value)
-        logging.info('{} 变卖项目 {}，获得 {} 元。'.format(self.owner.name, self.name, self.sell_value))
-        self.__owner = None
+        if log.enabled:
+            logging.info('{} 变卖项目 {}，获得 {} 元。'.format(self.owner.name, self.name, self.sell_value))
+        self.__owners[self.__tile] = NO_OWNER
+
+    def _set_owner(self, owner: itf.IProjectForPlayer):
+        '''set the owner directly, without paying or logging, used by replay
+
+        :param owner: the owner, None means no owner
+        '''
+        self.__own_state()
+        self.__owners[self.__tile] = NO_OWNER if owner is None else self.__state.player_index(owner)
 
     def trigger(self, player: itf.IProjectForPlayer):
         '''take the effect of the place, triggered by the player
@@ -74,6 +126,8 @@ class BaseProject(itf.IPlayerForProject):
 
 class ProjectNuclear(BaseProject):
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(name='核能发电站',
                          buy_value=3500,
@@ -85,12 +139,17 @@ class ProjectNuclear(BaseProject):
         :param player: IProjectForPlayer
         '''
         fine = 500 + 500 * player.estate_max_level
-        logging.info('{} 走到 {}，缴付 {} 元。'.format(player.name, self.name, fine))
+        if log.enabled:
+            logging.info('{} 走到 {}，缴付 {} 元。'.format(player.name, self.name, fine))
+        if player.trace is not None:
+            player.trace.record(trc.FEE, player, self, fine)
         player.add_money(fine)
 
 
 class ProjectBuilder(BaseProject):
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(name='建筑公司',
                          buy_value=4000,
@@ -135,12 +194,15 @@ class ProjectBuilder(BaseProject):
         :param player: IProjectForPlayer
         '''
         # add upgrade_callback to estate staticlly
-        logging.info('{} 走到 {}，可选择升级地产一处。'.format(player.name, self.name))
+        if log.enabled:
+            logging.info('{} 走到 {}，可选择升级地产一处。'.format(player.name, self.name))
         player.trigger_upgrade_any_estate()
 
 
 class ProjectTransportation(BaseProject):
 
+    __slots__ = ()
+
     def _take_effect(self, player: itf.IProjectForPlayer):
         '''当你拥有1/2/3项运输项目时，收取500/1000/2000元。
         下回合开始时，你可以放弃投骰子，改为给本项目拥有着500元（无人拥有则给银行），
@@ -153,6 +215,8 @@ class ProjectTransportation(BaseProject):
 
 class ProjectTvStation(BaseProject):
 
+    __slots__ = ()
+
     def _take_effect(self, player: itf.IProjectForPlayer):
         '''当任何人走到运气和新闻时，你获得500元奖励。
 
@@ -163,6 +227,8 @@ class ProjectTvStation(BaseProject):
 
 class ProjectSewerage(BaseProject):
 
+    __slots__ = ()
+
     def _take_effect(self, player: itf.IProjectForPlayer):
         '''收取500元，若对方每拥有3块地产，额外收取500元。
 
@@ -7,43 +7,68 @@ import richman.interface as itf
 
 
 class BasePublic:
-    
+
+    __slots__ = ('__name', '__tile')
+    kind = itf.KIND_PUBLIC
+
     def __init__(self, name):
         self.__name = name
+        self.__tile = 0
 
     @property
     def name(self):
         return self.__name
+    @property
+    def tile_id(self):
+        '''position of the place in the map
+        '''
+        return self.__tile
+
+    def _bind_state(self, state, tile_id: int):
+        '''public places have no state, only the position is kept
+
+        :param state: state of the game
+        :param tile_id: position of the place in the map
+        '''
+        self.__tile = tile_id
 
 
 class PublicStart(BasePublic):
+    __slots__ = ()
     def __init__(self):
         super().__init__('起点')
 
 class PublicNews(BasePublic):
+    __slots__ = ()
     def __init__(self):
         super().__init__('新闻')
 
 class PublicPrison(BasePublic):
+    __slots__ = ()
     def __init__(self):
         super().__init__('监狱')
 
 class PublicLuck(BasePublic):
+    __slots__ = ()
     def __init__(self):
         super().__init__('运气')
 
 class PublicStock(BasePublic):
+    __slots__ = ()
     def __init__(self):
         super().__init__('证券中心')
 
 class PublicGotoPrison(BasePublic):
+    __slots__ = ()
     def __init__(self):
         super().__init__('入狱')
 
 class PublicPark(BasePublic):
+    __slots__ = ()
     def __init__(self):
         super().__init__('公园')
 
 class PublicTax(BasePublic):
+    __slots__ = ()
     def __init__(self):
         super().__init__('税务中心')
\ No newline at end of file
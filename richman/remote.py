@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*
+'''远程玩家协议，客户端通过 TCP 或 Unix 套接字扮演 PlayerPerson
+
+每帧为 4 字节大端长度加一行 UTF-8 JSON，服务器推送状态增量和决定请求，客户端回答
+'''
+import asyncio
+import json
+import logging
+import struct
+
+import richman.log as log
+import richman.mapfile as mf
+
+
+LENGTH = struct.Struct('>I')
+MAX_FRAME = 64 * 1024
+MAX_QUEUE = 64  # frames waiting to be sent to a client
+JOIN_TIMEOUT = 10.0
+
+STATE_FIELDS = tuple(name for name, _ in mf.STATE_ARRAYS)
+_NO_ANSWER = object()  # the connection is closed before the answer comes
+
+# types of messages
+MSG_JOIN = 'join'  # client: {name}
+MSG_JOINED = 'joined'  # server: {name, players}
+MSG_ERROR = 'error'  # server: {reason}, the connection is closed after it
+MSG_STATE = 'state'  # server: {step, changes: {field: [[index, value], ...]}}
+MSG_DECIDE = 'decide'  # server: {id, kind, key, default}, see DecisionNeeded
+MSG_ANSWER = 'answer'  # client: {id, answer}
+MSG_END = 'end'  # server: {winner}, the game is over
+
+
+class ProtocolError(Exception):
+    '''a frame is too long or is not a message
+    '''
+    pass
+
+
+def encode_frame(message: dict)->bytes:
+    '''
+    :param message: message with a 'type'
+    :return: the frame of the message
+    '''
+    payload = json.dumps(message, ensure_ascii=False, separators=(',', ':'))
+    payload = payload.encode('utf-8') + b'\n'
+    if len(payload) > MAX_FRAME:
+        raise ProtocolError('消息过长：{} 字节。'.format(len(payload)))
+    return LENGTH.pack(len(payload)) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader, max_frame: int = MAX_FRAME)->dict:
+    '''
+    :param reader: stream to read from
+    :param max_frame: max length of the payload
+    :return: the message, None at the end of the stream
+    '''
+    try:
+        header = await reader.readexactly(LENGTH.size)
+    except asyncio.IncompleteReadError as error:
+        if error.partial:
+            raise ProtocolError('帧不完整。') from None
+        return None
+    length, = LENGTH.unpack(header)
+    if length > max_frame:
+        raise ProtocolError('帧过长：{} 字节。'.format(length))
+    try:
+        payload = await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        raise ProtocolError('帧不完整。') from None
+    try:
+        message = json.loads(payload.decode('utf-8'))
+    except ValueError:
+        raise ProtocolError('不是 JSON 消息。') from None
+    if not isinstance(message, dict) or 'type' not in message:
+        raise ProtocolError('消息没有类型。')
+    return message
+
+
+def state_delta(state, last: dict)->tuple:
+    '''
+    :param state: GameState
+    :param last: values sent last time, {field: list}, empty if nothing was sent
+    :return: ({field: [[index, value], ...]} of the values changed, values of now)
+    '''
+    values = {field: getattr(state, field).tolist() for field in STATE_FIELDS}
+    changes = {}
+    for field, now in values.items():
+        before = last.get(field)
+        if before is None or len(before) != len(now):
+            before = [None] * len(now)
+        changed = [[index, value] for index, (value, old) in enumerate(zip(now, before))
+                   if value != old]
+        if changed:
+            changes[field] = changed
+    return changes, values
+
+
+class Connection:
+    '''server side of a remote player, the client of a PlayerPerson
+
+    :note: frames are sent from a bounded queue; when a client reads too slowly
+           the queue fills up and the state is sent later as one delta; while frames
+           sent before are still waiting, decisions are answered by default at once,
+           so a slow client makes the game wait for one timeout at most
+    '''
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 max_queue: int = MAX_QUEUE, max_frame: int = MAX_FRAME):
+        '''init
+
+        :param reader: stream of the client
+        :param writer: stream of the client
+        :param max_queue: max frames waiting to be sent
+        :param max_frame: max length of the frames from the client
+        '''
+        self.__reader = reader
+        self.__writer = writer
+        self.__max_frame = max_frame
+        self.__outbox = asyncio.Queue(maxsize=max_queue)
+        self.__sender = None
+        self.__pending = {}  # struct: {decision id: future of the answer}
+        self.__next_id = 0
+        self.__asked = 0
+        self.__last_state = {}
+        self.__dropped = 0
+        self.__closed = False
+
+    @property
+    def is_closed(self):
+        return self.__closed
+    @property
+    def asked(self):
+        '''
+        :return: number of decisions sent to the client
+        '''
+        return self.__asked
+    @property
+    def dropped(self):
+        '''
+        :return: number of messages not sent because the client is too slow
+        '''
+        return self.__dropped
+
+    def send(self, message: dict)->bool:
+        '''queue the message without waiting
+
+        :return: False if the connection is closed or the queue is full
+        '''
+        if self.__closed:
+            return False
+        try:
+            self.__outbox.put_nowait(encode_frame(message))
+        except asyncio.QueueFull:
+            self.__dropped += 1
+            return False
+        return True
+
+    def push_state(self, game)->bool:
+        '''send the changes of the state of the game since the last state sent
+
+        :return: False if it can not be sent now, the changes are sent next time
+        '''
+        changes, values = state_delta(game.state, self.__last_state)
+        if not changes:
+            return True
+        if not self.send({'type': MSG_STATE, 'step': game.step, 'changes': changes}):
+            return False
+        self.__last_state = values
+        return True
+
+    def push_end(self, game):
+        winner = game.winner
+        self.push_state(game)
+        self.send({'type': MSG_END, 'winner': winner.name if winner is not None else None})
+
+    async def decide(self, player, kind: str, key, default):
+        '''ask the client, see PlayerPerson
+
+        :return: the answer, default if the client can not be asked
+        '''
+        is_behind = not self.__outbox.empty()
+        if not self.push_state(player.game) or is_behind:
+            return default
+        self.__next_id += 1
+        decision_id = self.__next_id
+        if not self.send({'type': MSG_DECIDE, 'id': decision_id,
+                          'kind': kind, 'key': key, 'default': default}):
+            return default
+        self.__asked += 1
+        future = asyncio.get_running_loop().create_future()
+        self.__pending[decision_id] = future
+        try:
+            answer = await future
+        finally:
+            self.__pending.pop(decision_id, None)
+        return default if answer is _NO_ANSWER else answer
+
+    async def serve(self):
+        '''send and receive until the client goes away
+        '''
+        self.__sender = asyncio.ensure_future(self.__send_frames())
+        try:
+            while True:
+                message = await read_frame(self.__reader, self.__max_frame)
+                if message is None:
+                    break
+                if message['type'] == MSG_ANSWER:
+                    future = self.__pending.get(message.get('id'))
+                    if future is not None and not future.done():  # 超时后的回答被忽略
+                        future.set_result(message.get('answer'))
+        finally:
+            await self.close()
+
+    async def __send_frames(self):
+        try:
+            while True:
+                frame = await self.__outbox.get()
+                self.__writer.write(frame)
+                await self.__writer.drain()
+        except (ConnectionError, OSError) as error:  # 客户端已断开
+            if log.enabled:
+                logging.info('发送失败，关闭连接：{}'.format(error))
+            await self.close()
+
+    async def close(self):
+        if self.__closed:
+            return None
+        self.__closed = True
+        for future in self.__pending.values():
+            if not future.done():
+                future.set_result(_NO_ANSWER)
+        if self.__sender is not None and self.__sender is not asyncio.current_task():
+            self.__sender.cancel()
+        self.__writer.close()
+        try:
+            await self.__writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+class RemoteServer:
+    '''accept remote players for PlayerPerson seats, the seats are found by name
+    '''
+
+    def __init__(self, max_queue: int = MAX_QUEUE, max_frame: int = MAX_FRAME,
+                 join_timeout: float = JOIN_TIMEOUT):
+        '''init
+
+        :param max_queue: see Connection
+        :param max_frame: see Connection
+        :param join_timeout: seconds for a client to join after connecting
+        '''
+        self.__max_queue = max_queue
+        self.__max_frame = max_frame
+        self.__join_timeout = join_timeout
+        self.__seats = {}  # struct: {name: PlayerPerson}
+        self.__connections = {}  # struct: {name: Connection}
+        self.__server = None
+
+    @property
+    def connections(self):
+        return self.__connections
+
+    def expect(self, player):
+        '''let a client play as the player, the player answers by default until it joins
+
+        :param player: PlayerPerson
+        '''
+        assert player.name not in self.__seats, '座位重名：{}。'.format(player.name)
+        self.__seats[player.name] = player
+
+    def connection_of(self, player)->Connection:
+        return self.__connections.get(player.name)
+
+    async def start_tcp(self, host: str = '127.0.0.1', port: int = 0)->tuple:
+        '''
+        :return: (host, port) listened on
+        '''
+        self.__server = await asyncio.start_server(self.__handle, host, port)
+        return self.__server.sockets[0].getsockname()[:2]
+
+    async def start_unix(self, path: str):
+        self.__server = await asyncio.start_unix_server(self.__handle, path)
+
+    async def close(self):
+        if self.__server is not None:
+            self.__server.close()
+            await self.__server.wait_closed()
+        for connection in list(self.__connections.values()):
+            await connection.close()
+
+    def push_end(self, game):
+        '''tell the remote players of the game that it is over
+        '''
+        for player in game.players_all:
+            connection = self.__connections.get(player.name)
+            if connection is not None and self.__seats.get(player.name) is player:
+                connection.push_end(game)
+
+    async def __handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connection = Connection(reader, writer, self.__max_queue, self.__max_frame)
+        try:
+            message = await asyncio.wait_for(read_frame(reader, self.__max_frame),
+                                             self.__join_timeout)
+        except (asyncio.TimeoutError, ProtocolError, ConnectionError):
+            await connection.close()
+            return None
+        name = message.get('name') if message and message['type'] == MSG_JOIN else None
+        player = self.__seats.get(name)
+        if player is None or name in self.__connections:
+            writer.write(encode_frame({'type': MSG_ERROR, 'reason': '没有空座位：{}。'.format(name)}))
+            await connection.close()
+            return None
+        self.__connections[name] = connection
+        player.client = connection
+        players = player.game.players_all if player.game is not None else [player]
+        connection.send({'type': MSG_JOINED, 'name': name,
+                         'players': [other.name for other in players]})
+        if log.enabled:
+            logging.info('{} 已连接。'.format(name))
+        try:
+            await connection.serve()
+        except (ProtocolError, ConnectionError) as error:
+            if log.enabled:
+                logging.info('{} 的连接出错：{}'.format(name, error))
+        finally:
+            player.client = None
+            del self.__connections[name]
+
+
+class ScriptedRemoteClient:
+    '''remote player answering by a script, for tests and benchmarks
+
+    :note: the state of the game is rebuilt from the deltas in self.state
+    '''
+
+    def __init__(self, name: str, delay: float = 0.0, script=None):
+        '''init
+
+        :param name: name of the seat
+        :param delay: seconds to wait before each answer
+        :param script: script(client, kind, key, default) returns the answer,
+                       None means answering the default
+        '''
+        self.__name = name
+        self.__delay = delay
+        self.__script = script
+        self.__reader = None
+        self.__writer = None
+        self.state = {}  # struct: {field: list of values}
+        self.players = []
+        self.decisions = 0
+        self.winner = None
+        self.error = None
+
+    async def connect_tcp(self, host: str, port: int):
+        self.__reader, self.__writer = await asyncio.open_connection(host, port)
+
+    async def connect_unix(self, path: str):
+        self.__reader, self.__writer = await asyncio.open_unix_connection(path)
+
+    async def run(self):
+        '''join, then answer until the game is over or the connection is closed
+        '''
+        self.__writer.write(encode_frame({'type': MSG_JOIN, 'name': self.__name}))
+        try:
+            while True:
+                message = await read_frame(self.__reader)
+                if message is None:
+                    break
+                kind = message['type']
+                if kind == MSG_JOINED:
+                    self.players = message['players']
+                elif kind == MSG_STATE:
+                    for field, changes in message['changes'].items():
+                        values = self.state.setdefault(field, [])
+                        for index, value in changes:
+                            values.extend([None] * (index + 1 - len(values)))
+                            values[index] = value
+                elif kind == MSG_DECIDE:
+                    await asyncio.sleep(self.__delay)
+                    answer = message['default']
+                    if self.__script is not None:
+                        answer = self.__script(self, message['kind'], message['key'], answer)
+                    self.decisions += 1
+                    self.__writer.write(encode_frame({'type': MSG_ANSWER, 'id': message['id'],
+                                                      'answer': answer}))
+                    await self.__writer.drain()
+                elif kind == MSG_END:
+                    self.winner = message['winner']
+                    break
+                elif kind == MSG_ERROR:
+                    self.error = message['reason']
+                    break
+        finally:
+            self.__writer.close()
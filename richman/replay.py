@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*
+'''比赛回放，按比赛记录直接修改地产、项目和玩家的状态，不再掷骰子和做决定
+'''
+import io
+
+import richman.log as log
+import richman.trace as trc
+import richman.interface as itf
+from richman.game import Game
+from richman.maps.map_test import MapTest
+from richman.simulation import default_players
+
+
+class Replay:
+    '''apply recorded effects to a fresh game, record by record
+    '''
+
+    def __init__(self, records, game_factory):
+        '''init
+
+        :param records: records of the game, TraceReader or list of TraceRecord
+        :param game_factory: callable that returns a fresh Game with the same map and players
+        '''
+        self.__records = records
+        self.__game_factory = game_factory
+        self.__appliers = {
+            trc.ROUND: self.__apply_round,
+            trc.ROLL: self.__apply_nothing,
+            trc.MOVE: self.__apply_move,
+            trc.BUY: self.__apply_buy,
+            trc.RENT: self.__apply_rent,
+            trc.UPGRADE: self.__apply_upgrade,
+            trc.DEGRADE: self.__apply_degrade,
+            trc.SELL: self.__apply_sell,
+            trc.PLEDGE: self.__apply_pledge,
+            trc.REBUY: self.__apply_rebuy,
+            trc.FEE: self.__apply_fee,
+            trc.BANKRUPT: self.__apply_bankrupt,
+        }
+        self.__reset()
+
+    @classmethod
+    def from_seed(cls, seed: int, map_factory=MapTest,
+                  players_factory=default_players, max_step: int = 1000):
+        '''play the game once with the seed, recording into memory
+
+        :param seed: seed of the game
+        :param map_factory: callable that returns a new map
+        :param players_factory: callable that returns a list of new players
+        :param max_step: max rounds of the game, None means no limit
+        :return: Replay of the game
+        '''
+        buffer = io.BytesIO()
+        recorder = trc.TraceRecorder(buffer)
+        game = Game(map_factory(), players_factory(), seed=seed, trace=recorder)
+        with log.quiet():
+            game.run(max_step=max_step)
+        recorder.flush()
+        records = trc.unpack_records(buffer.getvalue())
+        return cls(records, lambda: Game(map_factory(), players_factory(), seed=seed))
+
+    @property
+    def game(self):
+        return self.__game
+    @property
+    def index(self):
+        '''index of the next record to apply
+        '''
+        return self.__index
+    @property
+    def round(self):
+        '''the round being replayed
+        '''
+        return self.__game.step
+    @property
+    def is_finished(self):
+        return self.__index >= len(self.__records)
+
+    def __reset(self):
+        self.__game = self.__game_factory()
+        self.__players = self.__game.players_all
+        self.__items = self.__game.map.items
+        self.__index = 0
+
+    def __apply(self, record: trc.TraceRecord):
+        self.__appliers[record.kind](record)
+        self.__index += 1
+
+    def step(self)->bool:
+        '''replay one turn, i.e. a ROUND record, or a ROLL record with all the
+        records until the next ROLL or ROUND record
+
+        :return: False if there is nothing to replay
+        '''
+        if self.is_finished:
+            return False
+        self.__apply(self.__records[self.__index])
+        while not self.is_finished:
+            record = self.__records[self.__index]
+            if record.kind in (trc.ROUND, trc.ROLL):
+                break
+            self.__apply(record)
+        self.__finish_if_needed()
+        return True
+
+    def seek(self, round: int):
+        '''replay to the beginning of the round, i.e. the state after round - 1 rounds
+
+        :param round: round to jump to, the game is replayed from start if it is behind
+        '''
+        at_round_start = self.is_finished or self.__records[self.__index].kind == trc.ROUND
+        if round < self.__game.step or (round == self.__game.step and not at_round_start):
+            self.__reset()
+        while not self.is_finished:
+            record = self.__records[self.__index]
+            if record.kind == trc.ROUND and record.value >= round:
+                self.__game._set_step(record.value)
+                return None
+            self.__apply(record)
+        self.__finish_if_needed()
+
+    def run(self):
+        '''replay all the records
+        '''
+        while not self.is_finished:
+            self.__apply(self.__records[self.__index])
+        self.__finish_if_needed()
+
+    def __finish_if_needed(self):
+        '''the round counter goes up when the last round is over
+        '''
+        if self.is_finished and self.__records:
+            self.__game._set_step(self.__records[-1].round + 1)
+
+    # appliers
+
+    def __apply_nothing(self, record: trc.TraceRecord):
+        pass
+
+    def __apply_round(self, record: trc.TraceRecord):
+        self.__game._set_step(record.value)
+
+    def __apply_move(self, record: trc.TraceRecord):
+        self.__players[record.player].pos = record.tile
+
+    def __add_money(self, index: int, delta: int):
+        player = self.__players[index]
+        player._set_money(player.money + delta)
+
+    def __apply_buy(self, record: trc.TraceRecord):
+        player = self.__players[record.player]
+        place = self.__items[record.tile]
+        self.__add_money(record.player, -record.value)
+        if itf.kind_of(place) == itf.KIND_ESTATE:
+            place._set_state(player, 0, place.is_pledged)
+        else:
+            place._set_owner(player)
+        player._holdings_of(place).add(place)
+
+    def __apply_rent(self, record: trc.TraceRecord):
+        self.__add_money(record.aux, record.value)
+        self.__add_money(record.player, -record.value)
+
+    def __apply_upgrade(self, record: trc.TraceRecord):
+        estate = self.__items[record.tile]
+        estate._set_state(estate.owner, record.aux, estate.is_pledged)
+        self.__add_money(record.player, -record.value)
+
+    def __apply_degrade(self, record: trc.TraceRecord):
+        estate = self.__items[record.tile]
+        estate._set_state(estate.owner, record.aux, estate.is_pledged)
+
+    def __apply_sell(self, record: trc.TraceRecord):
+        player = self.__players[record.player]
+        place = self.__items[record.tile]
+        self.__add_money(record.player, record.value)
+        if itf.kind_of(place) == itf.KIND_ESTATE:
+            place._set_state(None, 0, place.is_pledged)
+        else:
+            place._set_owner(None)
+        player._remove_place(place)
+
+    def __apply_pledge(self, record: trc.TraceRecord):
+        estate = self.__items[record.tile]
+        estate._set_state(estate.owner, estate.current_level, True)
+        self.__add_money(record.player, record.value)
+
+    def __apply_rebuy(self, record: trc.TraceRecord):
+        estate = self.__items[record.tile]
+        estate._set_state(estate.owner, estate.current_level, False)
+        self.__add_money(record.player, -record.value)
+
+    def __apply_fee(self, record: trc.TraceRecord):
+        self.__add_money(record.player, record.value)
+
+    def __apply_bankrupt(self, record: trc.TraceRecord):
+        player = self.__players[record.player]
+        player._set_banckrupted(True)
+        self.__game._remove_players_banckrupted([player])
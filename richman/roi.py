@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*
+'''地产回报表，由落点概率预先算出每块地产的期望地租和回本回合数，每张地图只算一次
+'''
+import random
+
+import numpy as np
+
+import richman.interface as itf
+from richman.dice import DiceStream
+from richman.markov import LandingChain
+from richman.player import PlayerSimple
+
+
+class EstateTables:
+    '''tables of the estates of a map, one row per estate in the order of the map,
+    one column per level
+
+    :note: rents are expected per turn of one other player, landing on the tiles
+           by the stationary probabilities of LandingChain;
+           paybacks are in those turns, inf if the rent is zero
+    '''
+
+    def __init__(self, map, landing: np.ndarray = None):
+        '''init
+
+        :param map: BaseMap
+        :param landing: probability of landing on each tile in a turn,
+                        default is LandingChain(map).stationary()
+        '''
+        items = map.items
+        if landing is None:
+            landing = LandingChain(map).stationary()
+        self.__positions = np.array(map.positions_of_kind(itf.KIND_ESTATE), dtype=np.int64)
+        estates = [items[pos] for pos in self.__positions]
+        self.__rows = np.full(len(items), -1, dtype=np.int64)
+        self.__rows[self.__positions] = np.arange(len(estates))
+        self.__fees = np.array([estate.fees for estate in estates],
+                               dtype=float).reshape(len(estates), -1)
+        self.__buy_value = np.array([estate.buy_value for estate in estates], dtype=float)
+        self.__upgrade_value = np.array([estate.upgrade_value for estate in estates], dtype=float)
+        self.__landing = np.asarray(landing, dtype=float)[self.__positions]
+        rows_of_block = {}
+        for row, estate in enumerate(estates):
+            rows_of_block.setdefault(id(estate.block), []).append(row)
+        self.__block_landing = np.empty(len(estates))
+        for rows in rows_of_block.values():
+            self.__block_landing[rows] = self.__landing[rows].sum()
+        # 只拥有这一块地产时，只有走到它才收租；拥有整个地段时，走到地段中任何一块都收它的地租
+        self.__expected_rent = self.__landing[:, None] * self.__fees
+        self.__block_rent = self.__block_landing[:, None] * self.__fees
+        self.__block_completion = self.__block_rent - self.__expected_rent
+        self.__payback = _divide(self.__buy_value, self.__expected_rent[:, 0])
+        self.__block_payback = _divide(self.__buy_value, self.__block_rent[:, 0])
+        self.__upgrade_payback = _divide(self.__upgrade_value[:, None],
+                                         np.diff(self.__expected_rent, axis=1))
+        self.__block_upgrade_payback = _divide(self.__upgrade_value[:, None],
+                                               np.diff(self.__block_rent, axis=1))
+        for table in (self.__fees, self.__expected_rent, self.__block_rent,
+                      self.__block_completion, self.__payback, self.__block_payback,
+                      self.__upgrade_payback, self.__block_upgrade_payback):
+            table.setflags(write=False)
+
+    @property
+    def positions(self):
+        '''position of the estate of each row
+        '''
+        return self.__positions
+    @property
+    def fees(self):
+        return self.__fees
+    @property
+    def landing(self):
+        '''probability of landing on the estate in a turn
+        '''
+        return self.__landing
+    @property
+    def expected_rent(self):
+        '''rent of the estate by level, when the owner has no other estate of the block
+        '''
+        return self.__expected_rent
+    @property
+    def block_rent(self):
+        '''rent of the estate by level, when the owner has the whole block
+        '''
+        return self.__block_rent
+    @property
+    def block_completion(self):
+        '''rent of the estate added by owning the rest of the block
+        '''
+        return self.__block_completion
+    @property
+    def payback(self):
+        '''turns to earn the buy value back, see expected_rent
+        '''
+        return self.__payback
+    @property
+    def block_payback(self):
+        '''turns to earn the buy value back, see block_rent
+        '''
+        return self.__block_payback
+    @property
+    def upgrade_payback(self):
+        '''turns to earn the upgrade value back by level before the upgrade, see expected_rent
+        '''
+        return self.__upgrade_payback
+    @property
+    def block_upgrade_payback(self):
+        '''turns to earn the upgrade value back by level before the upgrade, see block_rent
+        '''
+        return self.__block_upgrade_payback
+
+    def row_of(self, pos: int)->int:
+        '''
+        :param pos: position in the map
+        :return: row of the estate at the position, -1 if it is not an estate
+        '''
+        return int(self.__rows[pos])
+
+
+def _divide(values: np.ndarray, rents: np.ndarray)->np.ndarray:
+    values, rents = np.broadcast_arrays(values, rents)
+    return np.divide(values, rents, out=np.full(rents.shape, np.inf), where=rents > 0)
+
+
+def tables_of(map)->EstateTables:
+    '''
+    :param map: BaseMap
+    :return: EstateTables of the map, computed once and kept by the map
+    '''
+    return map.cached('estate_tables', EstateTables)
+
+
+class PlayerTable(PlayerSimple):
+    '''computer player, upgrades the estates that pay back in time and keeps a reserve
+    of money, every decision is a lookup in the EstateTables of the map
+    '''
+
+    __slots__ = ('__horizon', '__reserve')
+
+    def __init__(self, name: str, money: int,
+                 map: itf.IPlayerForMap = None, rng: random.Random = None,
+                 dice: DiceStream = None, horizon: float = 30, reserve: int = 2000):
+        '''init
+
+        :param horizon: rounds in which an estate or an upgrade should pay back
+        :param reserve: money kept after buying or upgrading, see _make_decision_buy()
+        '''
+        super().__init__(name, money, map, rng, dice)
+        self.__horizon = horizon
+        self.__reserve = reserve
+
+    @property
+    def horizon(self):
+        return self.__horizon
+    @property
+    def reserve(self):
+        return self.__reserve
+
+    def __turns(self)->float:
+        '''
+        :return: turns of the other players in the horizon
+        '''
+        others = len(self.game.players_in_game) - 1 if self.game is not None else 1
+        return self.__horizon * max(others, 1)
+
+    def __has_block(self, estate: itf.IPlayerForEstate)->bool:
+        '''
+        :return: True if the player has other estates of the block
+        '''
+        own_fee = estate.fee if estate.owner is self else 0
+        return estate.block.block_fee_calc(self) > own_fee
+
+    def __upgrade_payback(self, tables: EstateTables, estate: itf.IPlayerForEstate)->float:
+        row = tables.row_of(estate.tile_id)
+        payback = (tables.block_upgrade_payback if self.__has_block(estate)
+                   else tables.upgrade_payback)
+        return payback[row, estate.current_level]
+
+    def _make_decision_buy(self, place: itf.IPlayerForPlace)->bool:
+        '''buy the estate if the reserve is kept, an estate is sold back at its buy value;
+        below the reserve, only buy the estates of the blocks held by the player
+        that pay back in time
+        '''
+        if itf.kind_of(place) != itf.KIND_ESTATE or self.money <= place.buy_value:
+            return super()._make_decision_buy(place)
+        if self.money - place.buy_value > self.__reserve:
+            return True
+        if not self.__has_block(place):
+            return False
+        tables = tables_of(self.map)
+        return tables.block_payback[tables.row_of(place.tile_id)] <= self.__turns()
+
+    def _make_decision_upgrade(self, estate: itf.IPlayerForEstate)->bool:
+        if (estate.is_level_max
+                or self.money - estate.upgrade_value <= self.__reserve):
+            return False
+        return self.__upgrade_payback(tables_of(self.map), estate) <= self.__turns()
+
+    def _make_decision_upgrade_any_estate(self)->itf.IPlayerForEstate:
+        tables = tables_of(self.map)
+        paybacks = [(self.__upgrade_payback(tables, estate), index, estate)
+                    for index, estate in enumerate(self.estates)
+                    if not estate.is_level_max
+                    and self.money - estate.upgrade_value > self.__reserve]
+        if not paybacks:
+            return None
+        payback, _, estate = min(paybacks)
+        return estate if payback <= self.__turns() else None
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*
+'''批量模拟，多进程并行运行大量独立的比赛并汇总结果
+'''
+import multiprocessing
+
+import richman.log as log
+from richman.game import Game
+from richman.maps.map_test import MapTest
+from richman.player import PlayerSimple
+
+
+def default_players()->list:
+    '''players used by test/run_the_game.py
+
+    :return: list of BasePlayer
+    '''
+    init_money = 50000
+    return [PlayerSimple(name='邓彦修', money=init_money),
+            PlayerSimple(name='邓哲', money=init_money),
+            PlayerSimple(name='戎萍', money=init_money)]
+
+
+def run_one_game(seed: int, map_factory=MapTest,
+                 players_factory=default_players, max_step: int = None)->tuple:
+    '''run one game with the seed
+
+    :param seed: seed of the game
+    :param map_factory: callable that returns a new map
+    :param players_factory: callable that returns a list of new players
+    :param max_step: max rounds of the game, None means no limit
+    :return: (seed, rounds, index of the winner or -1, net worth of each player)
+    '''
+    players = players_factory()
+    game = Game(map_factory(), players, seed=seed)
+    with log.quiet():
+        game.run(max_step=max_step)
+    winner = game.winner
+    winner_index = players.index(winner) if winner else -1
+    net_worths = tuple(player.net_worth for player in players)
+    return seed, game.step, winner_index, net_worths
+
+
+class _GameRunner:
+    '''picklable callable that runs one game in a worker process
+    '''
+
+    def __init__(self, map_factory, players_factory, max_step: int):
+        self.map_factory = map_factory
+        self.players_factory = players_factory
+        self.max_step = max_step
+
+    def __call__(self, seed: int)->tuple:
+        return run_one_game(seed, self.map_factory,
+                            self.players_factory, self.max_step)
+
+
+class SimulationResult:
+    '''aggregated results of a batch of games
+    '''
+
+    def __init__(self, player_names: list):
+        '''init
+
+        :param player_names: names of the players, in seat order
+        '''
+        self.__player_names = list(player_names)
+        self.__seeds = []
+        self.__steps = []
+        self.__winners = []
+        self.__net_worths = []
+
+    @property
+    def player_names(self):
+        return self.__player_names
+    @property
+    def games(self):
+        return len(self.__steps)
+    @property
+    def seeds(self):
+        return self.__seeds
+    @property
+    def steps(self):
+        '''rounds of each game
+        '''
+        return self.__steps
+    @property
+    def winners(self):
+        '''index of the winner of each game, -1 means no winner
+        '''
+        return self.__winners
+    @property
+    def net_worths(self):
+        '''final net worth of each player of each game
+        '''
+        return self.__net_worths
+    @property
+    def draws(self):
+        return self.__winners.count(-1)
+
+    def add(self, game_result: tuple):
+        '''add the result of one game
+
+        :param game_result: result returned by run_one_game()
+        '''
+        seed, step, winner_index, net_worths = game_result
+        assert len(net_worths) == len(self.__player_names), '参赛者数量不一致。'
+        self.__seeds.append(seed)
+        self.__steps.append(step)
+        self.__winners.append(winner_index)
+        self.__net_worths.append(net_worths)
+
+    def wins(self, index: int)->int:
+        return self.__winners.count(index)
+
+    def win_rate(self, index: int)->float:
+        if not self.games:
+            return 0.0
+        return self.wins(index) / self.games
+
+    def mean_net_worth(self, index: int)->float:
+        if not self.games:
+            return 0.0
+        return sum(worths[index] for worths in self.__net_worths) / self.games
+
+    def mean_step(self)->float:
+        if not self.games:
+            return 0.0
+        return sum(self.__steps) / self.games
+
+    def table(self)->list:
+        '''
+        :return: rows of (name, wins, win rate, mean net worth), one row per player
+        '''
+        return [(name, self.wins(index), self.win_rate(index),
+                 self.mean_net_worth(index))
+                for index, name in enumerate(self.__player_names)]
+
+    def __str__(self):
+        '''display results as a table
+        '''
+        lines = ['{:<8}{:>8}{:>10}{:>14}'.format('player', 'wins', 'win rate', 'net worth')]
+        for name, wins, win_rate, net_worth in self.table():
+            lines.append('{:<8}{:>8}{:>10.2%}{:>14.1f}'.format(name, wins, win_rate, net_worth))
+        lines.append('games: {}, draws: {}, rounds: mean {:.1f}, min {}, max {}'.format(
+            self.games, self.draws, self.mean_step(),
+            min(self.__steps, default=0), max(self.__steps, default=0)))
+        return '\n'.join(lines)
+
+
+def simulate(games: int, seed: int = 0, processes: int = None,
+             map_factory=MapTest, players_factory=default_players,
+             max_step: int = 1000, chunksize: int = None)->SimulationResult:
+    '''run games in a process pool, game i is played with seed + i
+
+    :param games: number of games
+    :param seed: seed of the first game
+    :param processes: number of worker processes, None means cpu count,
+                      1 means running in the current process
+    :param map_factory: picklable callable that returns a new map
+    :param players_factory: picklable callable that returns a list of new players
+    :param max_step: max rounds of each game, None means no limit
+    :param chunksize: games sent to a worker at a time
+    :return: SimulationResult
+    '''
+    assert games > 0, '比赛数量必须大于零。'
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    runner = _GameRunner(map_factory, players_factory, max_step)
+    seeds = range(seed, seed + games)
+    result = SimulationResult(player.name for player in players_factory())
+    if processes == 1:
+        for game_seed in seeds:
+            result.add(runner(game_seed))
+        return result
+    if chunksize is None:
+        chunksize = max(1, games // (processes * 4))
+    with multiprocessing.Pool(processes) as pool:
+        for game_result in pool.imap(runner, seeds, chunksize):
+            result.add(game_result)
+    return result
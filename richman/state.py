@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*
+'''比赛状态，以数组保存所有地块和玩家的可变状态
+'''
+import threading
+from array import array
+
+
+NO_OWNER = -1
+
+_placeholder = None
+_placeholder_lock = threading.Lock()
+
+
+class GameState:
+    '''mutable state of a game kept as struct of arrays,
+    estates, projects and players are views over it
+
+    :note: views keep references to the arrays, so the arrays are never
+           replaced, restore() copies into them
+    '''
+
+    def __init__(self, tiles: int, players: list = None):
+        '''init
+
+        :param tiles: number of tiles of the map
+        :param players: players of the game, their indexes are the indexes in the arrays
+        '''
+        self.__players = list(players) if players else []
+        self.__tile_owner = array('h', [NO_OWNER]) * tiles
+        self.__tile_level = array('b', bytes(tiles))
+        self.__tile_pledged = array('b', bytes(tiles))
+        self.__player_money = array('q', bytes(8 * len(self.__players)))
+        self.__player_pos = array('h', bytes(2 * len(self.__players)))
+
+    @property
+    def players(self):
+        '''player objects, indexed by the values in tile_owner
+        '''
+        return self.__players
+    @property
+    def tiles(self):
+        return len(self.__tile_owner)
+    @property
+    def tile_owner(self):
+        '''index of the owner of each tile, NO_OWNER if no owner
+        '''
+        return self.__tile_owner
+    @property
+    def tile_level(self):
+        return self.__tile_level
+    @property
+    def tile_pledged(self):
+        return self.__tile_pledged
+    @property
+    def player_money(self):
+        return self.__player_money
+    @property
+    def player_pos(self):
+        return self.__player_pos
+    @property
+    def nbytes(self):
+        '''bytes used by the arrays
+        '''
+        return sum(len(values) * values.itemsize for values in self.__arrays())
+
+    def __arrays(self)->tuple:
+        return (self.__tile_owner, self.__tile_level, self.__tile_pledged,
+                self.__player_money, self.__player_pos)
+
+    def player_index(self, player)->int:
+        '''index of the player, unknown players are appended
+
+        :param player: the player
+        :return: index in the player arrays
+        '''
+        for index, known in enumerate(self.__players):
+            if known is player:
+                return index
+        self.__players.append(player)
+        self.__player_money.append(0)
+        self.__player_pos.append(0)
+        return len(self.__players) - 1
+
+    def copy(self):
+        '''
+        :return: a new GameState with copies of the arrays, sharing the player objects
+        '''
+        state = GameState(0)
+        state.__players = self.__players
+        state.__tile_owner = array('h', self.__tile_owner)
+        state.__tile_level = array('b', self.__tile_level)
+        state.__tile_pledged = array('b', self.__tile_pledged)
+        state.__player_money = array('q', self.__player_money)
+        state.__player_pos = array('h', self.__player_pos)
+        return state
+
+    def freeze(self)->tuple:
+        '''
+        :return: immutable copy of the arrays, a tuple of bytes for thaw()
+        '''
+        return tuple(values.tobytes() for values in self.__arrays())
+
+    def thaw(self, frozen: tuple):
+        '''copy the arrays saved by freeze() back, in place
+
+        :param frozen: result of freeze() of a state with the same tiles and players
+        '''
+        for values, data in zip(self.__arrays(), frozen):
+            view = memoryview(values).cast('B')
+            assert len(view) == len(data), '地块或玩家数量不一致。'
+            view[:] = data
+
+    def restore(self, state):
+        '''copy the arrays of another state into this one, in place
+
+        :note: only the arrays are copied, the holdings of the players, the fee caches
+               of the blocks and the level histograms of the players are not rebuilt;
+               a game should be restored by Game.restore(), which rebuilds them
+        :param state: GameState of the same game
+        '''
+        assert state.tiles == self.tiles, '地块数量不一致。'
+        self.__tile_owner[:] = state.tile_owner
+        self.__tile_level[:] = state.tile_level
+        self.__tile_pledged[:] = state.tile_pledged
+        self.__player_money[:] = state.player_money
+        self.__player_pos[:] = state.player_pos
+
+    def __eq__(self, obj):
+        return (self.__tile_owner == obj.tile_owner
+                and self.__tile_level == obj.tile_level
+                and self.__tile_pledged == obj.tile_pledged
+                and self.__player_money == obj.player_money
+                and self.__player_pos == obj.player_pos)
+
+
+def placeholder()->GameState:
+    '''state shared by the places that are not in a game yet, created at the first call
+
+    :note: its only tile is never changed: a place bound to it has no owner, level 0
+           and is not pledged, and binds itself to a state of its own before changing
+    '''
+    global _placeholder
+    if _placeholder is None:
+        with _placeholder_lock:
+            if _placeholder is None:
+                _placeholder = GameState(1)
+    return _placeholder
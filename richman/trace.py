@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*
+'''比赛记录，以定长二进制记录保存比赛过程，代替文本日志
+'''
+import collections
+import mmap
+import struct
+
+
+# record kinds
+ROUND = 0     # round: number of the round starts
+ROLL = 1      # player, value: step, minus means moving back
+MOVE = 2      # player, tile: position moved to
+BUY = 3       # player, tile, value: money paid
+RENT = 4      # player: payer, tile, value: money paid, aux: index of the owner
+UPGRADE = 5   # player: owner, tile, value: money paid, aux: level after upgrade
+DEGRADE = 6   # player: owner, tile, aux: level after degrade
+SELL = 7      # player: owner, tile, value: money got
+PLEDGE = 8    # player: owner, tile, value: money got
+REBUY = 9     # player: owner, tile, value: money paid
+FEE = 10      # player, tile, value: money added to the player by the tile
+BANKRUPT = 11 # player
+
+KIND_NAMES = ('round', 'roll', 'move', 'buy', 'rent', 'upgrade', 'degrade',
+              'sell', 'pledge', 'rebuy', 'fee', 'bankrupt')
+
+NO_PLAYER = 0xFF
+NO_TILE = 0xFFFF
+
+MAGIC = b'RMTR'
+VERSION = 1
+# magic, version, players, tiles, has seed, seed
+HEADER = struct.Struct('<4sHHIB3xq')
+# kind, player, tile, round, value, aux
+RECORD = struct.Struct('<BBHIii')
+
+TraceHeader = collections.namedtuple('TraceHeader', 'version players tiles seed')
+TraceRecord = collections.namedtuple('TraceRecord', 'kind player tile round value aux')
+
+
+class TraceRecorder:
+    '''write records of a game into a binary file, records are buffered
+    and written in bulk
+    '''
+
+    def __init__(self, file, buffer_records: int = 4096):
+        '''init
+
+        :param file: file path, or a binary file object opened for writing
+        :param buffer_records: records kept in memory before writing
+        '''
+        if isinstance(file, str):
+            self.__file = open(file, 'wb')
+            self.__own_file = True
+        else:
+            self.__file = file
+            self.__own_file = False
+        self.__buffer = bytearray()
+        self.__buffer_bytes = buffer_records * RECORD.size
+        self.__players = {}
+        self.__tiles = {}
+        self.__round = 0
+        self.__count = 0
+
+    @property
+    def count(self):
+        '''number of records written
+        '''
+        return self.__count
+
+    def start(self, game):
+        '''write the header and index the players and tiles of the game
+
+        :param game: the game to record
+        '''
+        assert len(game.players_all) < NO_PLAYER, '参赛者数量过多。'
+        assert len(game.map.items) < NO_TILE, '地图过大。'
+        self.__players = {id(player): index for index, player in enumerate(game.players_all)}
+        self.__tiles = {id(item): index for index, item in enumerate(game.map.items)}
+        seed = game.seed
+        has_seed = isinstance(seed, int) and -2**63 <= seed < 2**63
+        self.__file.write(HEADER.pack(MAGIC, VERSION, len(game.players_all),
+                                      len(game.map.items), has_seed,
+                                      seed if has_seed else 0))
+
+    def player_index(self, player)->int:
+        '''
+        :return: index of the player in the game, NO_PLAYER if unknown
+        '''
+        return self.__players.get(id(player), NO_PLAYER)
+
+    def record(self, kind: int, player=None, place=None, value: int = 0, aux: int = 0):
+        '''add a record
+
+        :param kind: kind of the record, ROUND, ROLL ...
+        :param player: the player, None if not needed
+        :param place: the estate or project, None if not needed
+        :param value: money or step, see the kinds
+        :param aux: extra value, see the kinds
+        '''
+        if kind == ROUND:
+            self.__round = value
+        self.__buffer += RECORD.pack(kind,
+                                     self.__players.get(id(player), NO_PLAYER),
+                                     self.__tiles.get(id(place), NO_TILE),
+                                     self.__round, value, aux)
+        self.__count += 1
+        if len(self.__buffer) >= self.__buffer_bytes:
+            self.flush()
+
+    def record_move(self, player, pos: int):
+        '''add a MOVE record, the position is known without the tile object
+
+        :param player: the player
+        :param pos: position moved to
+        '''
+        self.__buffer += RECORD.pack(MOVE, self.__players.get(id(player), NO_PLAYER),
+                                     pos, self.__round, 0, 0)
+        self.__count += 1
+        if len(self.__buffer) >= self.__buffer_bytes:
+            self.flush()
+
+    def flush(self):
+        '''write buffered records into the file
+        '''
+        if self.__buffer:
+            self.__file.write(self.__buffer)
+            self.__buffer = bytearray()
+        self.__file.flush()
+
+    def close(self):
+        self.flush()
+        if self.__own_file:
+            self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def unpack_records(data: bytes)->list:
+    '''parse a whole trace held in memory, e.g. written into io.BytesIO
+
+    :param data: content of a trace
+    :return: list of TraceRecord
+    '''
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('不是比赛记录。')
+    view = memoryview(data)[HEADER.size:]
+    return [TraceRecord._make(fields) for fields in RECORD.iter_unpack(view)]
+
+
+class TraceReader:
+    '''memory-map a trace file and read records without loading the whole file
+    '''
+
+    def __init__(self, file_path: str):
+        '''init
+
+        :param file_path: trace file written by TraceRecorder
+        '''
+        self.__file = open(file_path, 'rb')
+        try:
+            self.__mmap = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self.__file.close()
+            raise ValueError('不是比赛记录文件：{}。'.format(file_path))
+        try:
+            self.__header = self.__read_header(file_path)
+        except ValueError:
+            self.close()
+            raise
+
+    def __read_header(self, file_path: str)->TraceHeader:
+        if len(self.__mmap) < HEADER.size:
+            raise ValueError('不是比赛记录文件：{}。'.format(file_path))
+        magic, version, players, tiles, has_seed, seed = HEADER.unpack_from(self.__mmap, 0)
+        if magic != MAGIC:
+            raise ValueError('不是比赛记录文件：{}。'.format(file_path))
+        if version != VERSION:
+            raise ValueError('不支持的比赛记录版本：{}。'.format(version))
+        if (len(self.__mmap) - HEADER.size) % RECORD.size:
+            raise ValueError('比赛记录文件不完整：{}。'.format(file_path))
+        return TraceHeader(version, players, tiles, seed if has_seed else None)
+
+    @property
+    def header(self):
+        return self.__header
+
+    def __len__(self):
+        return (len(self.__mmap) - HEADER.size) // RECORD.size
+
+    def __getitem__(self, index: int)->TraceRecord:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('记录序号越界：{}。'.format(index))
+        return TraceRecord._make(RECORD.unpack_from(self.__mmap,
+                                                    HEADER.size + index * RECORD.size))
+
+    def __iter__(self):
+        unpack_from = RECORD.unpack_from
+        for offset in range(HEADER.size, len(self.__mmap), RECORD.size):
+            yield TraceRecord._make(unpack_from(self.__mmap, offset))
+
+    def close(self):
+        self.__mmap.close()
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*
+'''锁步向量化模拟，用 numpy 数组同时推进大量独立比赛，规则与 PlayerSimple 一致
+'''
+import numpy as np
+
+from richman.estate import Estate
+from richman.project import ProjectNuclear, ProjectBuilder
+from richman.player import PlayerSimple
+from richman.simulation import SimulationResult
+
+
+# tile kinds
+ESTATE = 0
+NUCLEAR = 1
+BUILDER = 2
+
+NO_OWNER = -1
+MAX_LEVEL = 3
+_NEVER = np.iinfo(np.int64).max  # 未拥有地块的购买顺序，排序时排在最后
+
+
+class VectorizedSimulator:
+    '''advance a batch of independent games together, one round per step,
+    every player follows the rules of PlayerSimple
+
+    :note: supported tiles are Estate, ProjectNuclear and ProjectBuilder
+    '''
+
+    def __init__(self, map, players: list, games: int,
+                 seed: int = None, max_step: int = 1000):
+        '''init
+
+        :param map: map of the games, its items are only read
+        :param players: PlayerSimple players, their names and money are used as
+                        the initial state of every game
+        :param games: number of games
+        :param seed: seed of the batch
+        :param max_step: max rounds of each game, None means no limit
+        '''
+        assert games > 0, '比赛数量必须大于零。'
+        for player in players:
+            if not isinstance(player, PlayerSimple):
+                raise NotImplementedError('只支持 PlayerSimple：{}。'.format(player.name))
+        self.__names = [player.name for player in players]
+        self.__max_step = max_step
+        self.__rng = np.random.default_rng(seed)
+        self.__load_map(map)
+        tiles = len(self.__kind)
+        self.__pos = np.zeros((games, len(players)), dtype=np.int64)
+        self.__money = np.tile(np.array([player.money for player in players],
+                                        dtype=np.int64), (games, 1))
+        self.__bankrupted = np.zeros((games, len(players)), dtype=bool)
+        self.__owner = np.full((games, tiles), NO_OWNER, dtype=np.int64)
+        self.__level = np.zeros((games, tiles), dtype=np.int64)
+        self.__pledged = np.zeros((games, tiles), dtype=bool)
+        self.__bought_at = np.full((games, tiles), _NEVER, dtype=np.int64)
+        self.__purchases = np.zeros(games, dtype=np.int64)
+        self.__step = np.zeros(games, dtype=np.int64)
+        self.__finished = np.zeros(games, dtype=bool)
+
+    def __load_map(self, map):
+        '''build static tables of the tiles
+        '''
+        items = map.items
+        tiles = len(items)
+        self.__kind = np.zeros(tiles, dtype=np.int64)
+        self.__buy_value = np.zeros(tiles, dtype=np.int64)
+        self.__upgrade_value = np.zeros(tiles, dtype=np.int64)
+        self.__pledge_value = np.zeros(tiles, dtype=np.int64)
+        self.__project_sell_value = np.zeros(tiles, dtype=np.int64)
+        self.__fees = np.zeros((tiles, MAX_LEVEL + 1), dtype=np.int64)
+        self.__block = np.full(tiles, -1, dtype=np.int64)
+        blocks = {}
+        for tile, item in enumerate(items):
+            if isinstance(item, Estate):
+                self.__kind[tile] = ESTATE
+                self.__buy_value[tile] = item.buy_value
+                self.__upgrade_value[tile] = item.upgrade_value
+                self.__pledge_value[tile] = item.pledge_value
+                self.__fees[tile] = item.fees
+                self.__block[tile] = blocks.setdefault(id(item.block), len(blocks))
+            elif isinstance(item, (ProjectNuclear, ProjectBuilder)):
+                self.__kind[tile] = NUCLEAR if isinstance(item, ProjectNuclear) else BUILDER
+                self.__buy_value[tile] = item.buy_value
+                self.__project_sell_value[tile] = item.sell_value
+            else:
+                raise NotImplementedError('不支持的地块：{}。'.format(item.name))
+        self.__is_estate = self.__kind == ESTATE
+
+    @property
+    def games(self):
+        return len(self.__step)
+    @property
+    def is_finished(self):
+        return bool(self.__finished.all())
+    @property
+    def steps(self):
+        '''rounds played by each game
+        '''
+        return self.__step
+    @property
+    def money(self):
+        return self.__money
+    @property
+    def pos(self):
+        return self.__pos
+    @property
+    def owner(self):
+        return self.__owner
+    @property
+    def level(self):
+        return self.__level
+    @property
+    def pledged(self):
+        return self.__pledged
+
+    def step(self):
+        '''play one round of every game that is not over
+        '''
+        for seat in range(self.__pos.shape[1]):
+            games = np.flatnonzero(~self.__finished & ~self.__bankrupted[:, seat])
+            if games.size:
+                self.__play(games, seat)
+        active = ~self.__finished
+        self.__step[active] += 1
+        players_left = (~self.__bankrupted).sum(axis=1)
+        over = players_left <= 1
+        if self.__max_step is not None:
+            over |= self.__step >= self.__max_step
+        self.__finished |= active & over
+
+    def run(self)->SimulationResult:
+        '''play all the games until they are over
+
+        :return: SimulationResult, the seed of a game is its index in the batch
+        '''
+        while not self.is_finished:
+            self.step()
+        return self.result()
+
+    def net_worths(self)->np.ndarray:
+        '''
+        :return: money plus sell value of the places of each player, shape (games, players)
+        '''
+        estate_value = np.where(self.__pledged, self.__buy_value - self.__pledge_value,
+                                self.__buy_value)
+        value = np.where(self.__is_estate, estate_value, self.__project_sell_value)
+        worths = self.__money.copy()
+        for seat in range(worths.shape[1]):
+            worths[:, seat] += (value * (self.__owner == seat)).sum(axis=1)
+        return worths
+
+    def winners(self)->np.ndarray:
+        '''
+        :return: seat of the winner of each game, -1 if no winner
+        '''
+        alive = ~self.__bankrupted
+        return np.where(alive.sum(axis=1) == 1, alive.argmax(axis=1), -1)
+
+    def result(self)->SimulationResult:
+        result = SimulationResult(self.__names)
+        for index, (step, winner, worths) in enumerate(zip(self.__step.tolist(),
+                                                           self.winners().tolist(),
+                                                           self.net_worths().tolist())):
+            result.add((index, step, winner, tuple(worths)))
+        return result
+
+    # one turn of a seat in many games
+
+    def __play(self, games: np.ndarray, seat: int):
+        tiles = len(self.__kind)
+        steps = self.__rng.integers(1, 7, size=games.size)
+        pos = (self.__pos[games, seat] + steps) % tiles
+        self.__pos[games, seat] = pos
+        kind = self.__kind[pos]
+        owner = self.__owner[games, pos]
+        # buy estate or project
+        mask = owner == NO_OWNER
+        self.__buy(games[mask], pos[mask], seat)
+        # estate
+        is_estate = kind == ESTATE
+        mask = is_estate & (owner == seat)
+        self.__upgrade(games[mask], pos[mask], seat)
+        mask = is_estate & (owner != NO_OWNER) & (owner != seat)
+        self.__pay_rent(games[mask], pos[mask], owner[mask], seat)
+        # projects
+        mask = (kind == NUCLEAR) & (owner != NO_OWNER)
+        self.__nuclear(games[mask], seat)
+        mask = (kind == BUILDER) & (owner != NO_OWNER)
+        self.__builder(games[mask], seat)
+
+    def __buy(self, games: np.ndarray, pos: np.ndarray, seat: int):
+        mask = self.__money[games, seat] > self.__buy_value[pos]
+        games, pos = games[mask], pos[mask]
+        self.__money[games, seat] -= self.__buy_value[pos]
+        self.__owner[games, pos] = seat
+        self.__bought_at[games, pos] = self.__purchases[games]
+        self.__purchases[games] += 1
+
+    def __upgrade(self, games: np.ndarray, pos: np.ndarray, seat: int):
+        mask = ((self.__money[games, seat] > self.__upgrade_value[pos])
+                & (self.__level[games, pos] < MAX_LEVEL))
+        games, pos = games[mask], pos[mask]
+        self.__level[games, pos] += 1
+        self.__money[games, seat] -= self.__upgrade_value[pos]
+
+    def __pay_rent(self, games: np.ndarray, pos: np.ndarray, owner: np.ndarray, seat: int):
+        if not games.size:
+            return None
+        fees = np.take_along_axis(self.__fees[None, :, :],
+                                  self.__level[games][:, :, None], axis=2)[:, :, 0]
+        same_block = self.__block[None, :] == self.__block[pos][:, None]
+        owned = self.__owner[games] == owner[:, None]
+        rent = (fees * (same_block & owned)).sum(axis=1)
+        self.__money[games, owner] += rent
+        self.__money[games, seat] -= rent
+        self.__make_money(games, seat)
+
+    def __nuclear(self, games: np.ndarray, seat: int):
+        '''ProjectNuclear: 500 plus 500 for each level of the highest estate of the player
+        '''
+        if not games.size:
+            return None
+        owned = (self.__owner[games] == seat) & self.__is_estate[None, :]
+        max_level = np.where(owned, self.__level[games], 0).max(axis=1)
+        self.__money[games, seat] += 500 + 500 * max_level
+
+    def __builder(self, games: np.ndarray, seat: int):
+        '''ProjectBuilder: upgrade the first estate of the player that is not level max
+        '''
+        if not games.size:
+            return None
+        candidates = ((self.__owner[games] == seat) & self.__is_estate[None, :]
+                      & (self.__level[games] < MAX_LEVEL))
+        has_candidate = candidates.any(axis=1)
+        games = games[has_candidate]
+        order = np.where(candidates[has_candidate], self.__bought_at[games], _NEVER)
+        pos = order.argmin(axis=1)
+        self.__level[games, pos] += 1
+        self.__money[games, seat] -= self.__upgrade_value[pos]
+        self.__make_money(games, seat)
+
+    # make money, the same order as PlayerSimple._make_money
+
+    def __make_money(self, games: np.ndarray, seat: int):
+        games = games[self.__money[games, seat] < 0]
+        if not games.size:
+            return None
+        estates = (self.__owner[games] == seat) & self.__is_estate[None, :]
+        # pledge estates
+        values = np.broadcast_to(self.__pledge_value, estates.shape)
+        games = self.__liquidate(games, seat, estates & ~self.__pledged[games], values,
+                                 self.__pledge)
+        # sell estates
+        estates = (self.__owner[games] == seat) & self.__is_estate[None, :]
+        values = np.where(self.__pledged[games], self.__buy_value - self.__pledge_value,
+                          self.__buy_value)
+        games = self.__liquidate(games, seat, estates, values, self.__sell)
+        # sell projects
+        projects = (self.__owner[games] == seat) & ~self.__is_estate[None, :]
+        values = np.broadcast_to(self.__project_sell_value, projects.shape)
+        games = self.__liquidate(games, seat, projects, values, self.__sell)
+        self.__bankrupted[games, seat] = True
+
+    def __liquidate(self, games: np.ndarray, seat: int, candidates: np.ndarray,
+                    values: np.ndarray, apply)->np.ndarray:
+        '''turn the candidate places into money in the order they were bought,
+        stop as soon as the money is above zero
+
+        :param candidates: places that can be used, shape (games, tiles)
+        :param values: money each place gives, shape (games, tiles)
+        :param apply: apply(games, pos) changes the places used
+        :return: games whose money is still not above zero
+        '''
+        if not games.size:
+            return games
+        order = np.argsort(np.where(candidates, self.__bought_at[games], _NEVER),
+                           axis=1, kind='stable')
+        sorted_candidates = np.take_along_axis(candidates, order, axis=1)
+        sorted_values = np.take_along_axis(np.where(candidates, values, 0), order, axis=1)
+        money = self.__money[games, seat][:, None] + np.cumsum(sorted_values, axis=1)
+        enough = (money > 0) & sorted_candidates
+        is_enough = enough.any(axis=1)
+        used = np.where(is_enough, enough.argmax(axis=1) + 1, sorted_candidates.sum(axis=1))
+        rows, columns = np.nonzero(np.arange(order.shape[1])[None, :] < used[:, None])
+        apply(games[rows], order[rows, columns])
+        self.__money[games, seat] = np.where(used > 0,
+                                             money[np.arange(games.size), np.maximum(used - 1, 0)],
+                                             self.__money[games, seat])
+        return games[~is_enough]
+
+    def __pledge(self, games: np.ndarray, pos: np.ndarray):
+        self.__pledged[games, pos] = True
+
+    def __sell(self, games: np.ndarray, pos: np.ndarray):
+        self.__owner[games, pos] = NO_OWNER
+        self.__level[games, pos] = 0
+        self.__bought_at[games, pos] = _NEVER
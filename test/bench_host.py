@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*
+'''measure how many games one process (one core) can host at the same time,
+each game has a PlayerPerson answered by a scripted client with a human-like delay
+'''
+import asyncio
+import sys
+import time
+
+import richman.log as log
+from richman.game import Game
+from richman.maps.map_test import MapTest
+from richman.player import PlayerSimple, PlayerPerson
+from richman.host import GameHost, ScriptedClient
+
+
+def _games(count: int, delay: float)->tuple:
+    clients = [ScriptedClient(delay=delay) for _ in range(count)]
+    games = [Game(MapTest(), [PlayerPerson('邓彦修', 50000, client=client),
+                              PlayerSimple('邓哲', 50000), PlayerSimple('戎萍', 50000)],
+                  seed=seed)
+             for seed, client in enumerate(clients)]
+    return games, clients
+
+
+async def _run(games: list, max_step: int)->tuple:
+    host = GameHost(max_step=max_step)
+    running = []
+
+    async def sample():
+        while True:
+            running.append(host.running)
+            await asyncio.sleep(0.01)
+
+    sampler = asyncio.ensure_future(sample())
+    start = time.perf_counter()
+    await host.play_all(games)
+    elapsed = time.perf_counter() - start
+    sampler.cancel()
+    return elapsed, max(running)
+
+
+def main(delay: float = 0.05, max_step: int = 100):
+    print('answer delay {:.0f} ms, {} rounds at most'.format(delay * 1e3, max_step))
+    for count in (1, 10, 100, 500, 1000):
+        games, clients = _games(count, delay)
+        with log.quiet():
+            cpu = time.process_time()
+            elapsed, running = asyncio.run(_run(games, max_step))
+            cpu = time.process_time() - cpu
+        decisions = sum(client.decisions for client in clients)
+        rounds = sum(game.step for game in games)
+        print('{:>5} games: {:7.2f} s, cpu {:5.0%}, {:>4} running, '
+              '{:8.0f} decisions/s, {:8.0f} rounds/s'.format(
+                  count, elapsed, cpu / elapsed, running,
+                  decisions / elapsed, rounds / elapsed))
+
+
+if __name__ == "__main__":
+    main(*(float(arg) for arg in sys.argv[1:2]))
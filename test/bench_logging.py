@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*
+'''compare the cost per turn with log messages on (but no sink attached) and off
+'''
+import time
+
+import richman.log as log
+from richman.game import Game
+from richman.maps.map_test import MapTest
+from richman.simulation import default_players
+
+
+def _run_games(games: int, enabled: bool)->tuple:
+    '''
+    :return: (turns played, seconds)
+    '''
+    log.set_enabled(enabled)
+    turns = 0
+    elapsed = 0.0
+    for seed in range(games):
+        game = Game(MapTest(), default_players(), seed=seed)
+        start = time.perf_counter()
+        while len(game.players_in_game) > 1 and game.step < 1000:
+            turns += len(game.players_in_game)
+            game._run_one_step()
+        elapsed += time.perf_counter() - start
+    return turns, elapsed
+
+
+def main(games: int = 500):
+    try:
+        for enabled in (True, False):
+            turns, elapsed = _run_games(games, enabled)
+            print('log {:<4} {} turns in {:.3f} s, {:.2f} us/turn'.format(
+                'on' if enabled else 'off', turns, elapsed, elapsed / turns * 1e6))
+    finally:
+        log.set_enabled(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*
+'''compare saving and loading maps with the map file format and with pickle
+'''
+import os
+import pickle
+import tempfile
+import time
+
+from richman.map import BaseMap
+from richman.estate import Estate, EstateBlock
+from richman.project import ProjectNuclear
+from richman.maps.map_test import MapTest
+
+
+class MapLarge(BaseMap):
+    '''many blocks of estates, with a project between blocks
+    '''
+
+    def __init__(self, blocks: int = 500, estates: int = 10):
+        super().__init__(name='map large', items=[])
+        for block_index in range(blocks):
+            block = EstateBlock('block{}'.format(block_index + 1))
+            self._blocks.append(block)
+            self._add_items([Estate('地产{}_{}'.format(block_index, index),
+                                    [100, 200, 400, 800], 1000, 500, 300, block)
+                             for index in range(estates)])
+            self._add_items(ProjectNuclear())
+
+
+def _pickle_save(map: BaseMap, file_path: str):
+    with open(file_path, 'wb') as f:
+        pickle.dump({'items': map.items, 'name': map.name}, f)
+
+
+def _pickle_load(file_path: str):
+    with open(file_path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _timeit(func, repeat: int)->float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        for map, repeat in ((MapTest(), 200), (MapLarge(), 5)):
+            map_path = os.path.join(folder, 'map.rmmap')
+            pickle_path = os.path.join(folder, 'map.pickle')
+            save = _timeit(lambda: map.save(map_path), repeat)
+            load = _timeit(lambda: BaseMap('').load(map_path), repeat)
+            pickle_save = _timeit(lambda: _pickle_save(map, pickle_path), repeat)
+            pickle_load = _timeit(lambda: _pickle_load(pickle_path), repeat)
+            print('{} ({} tiles)'.format(map.name, len(map)))
+            print('  map file {:>8} bytes, save {:8.3f} ms, load {:8.3f} ms'.format(
+                os.path.getsize(map_path), save * 1e3, load * 1e3))
+            print('  pickle   {:>8} bytes, save {:8.3f} ms, load {:8.3f} ms'.format(
+                os.path.getsize(pickle_path), pickle_save * 1e3, pickle_load * 1e3))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*
+'''measure the memory of a game: map, players, state and all the places,
+and compare it with the same objects keeping their attributes in a __dict__
+as they did before __slots__
+'''
+import gc
+import sys
+import tracemalloc
+
+from richman.game import Game
+from richman.maps.map_test import MapTest
+from richman.simulation import default_players
+
+
+class _DictObject:
+    '''object holding the slot values of another object in its __dict__, the baseline;
+    use _dict_copy() so that the objects of a class share the keys of their dicts
+    '''
+
+    def __init__(self, obj):
+        for cls in type(obj).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                if name in ('__dict__', '__weakref__'):
+                    continue
+                if name.startswith('__') and not name.endswith('__'):
+                    name = '_{}{}'.format(cls.__name__.lstrip('_'), name)
+                if hasattr(obj, name):
+                    setattr(self, name, getattr(obj, name))
+
+
+_dict_classes = {}  # struct: {slotted class: _DictObject subclass}
+
+
+def _dict_copy(obj)->_DictObject:
+    cls = type(obj)
+    if cls not in _dict_classes:
+        _dict_classes[cls] = type('Dict' + cls.__name__, (_DictObject,), {})
+    return _dict_classes[cls](obj)
+
+
+def _game_bytes(games: int)->float:
+    '''
+    :return: bytes allocated per game, games are kept alive while measuring
+    '''
+    gc.collect()
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    kept = [Game(MapTest(), default_players(), seed=seed) for seed in range(games)]
+    gc.collect()
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return (end - start) / games
+
+
+def _object_bytes(obj)->int:
+    '''size of the object itself plus its __dict__, if it is used
+    '''
+    size = sys.getsizeof(obj)
+    if getattr(obj, '__dict__', None):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def main(games: int = 1000):
+    game = Game(MapTest(), default_players(), seed=0)
+    objects = game.map.items + game.players_all
+    saved = 0
+    rows = {}
+    for obj in objects:
+        slotted = _object_bytes(obj)
+        baseline = _object_bytes(_dict_copy(obj))
+        saved += baseline - slotted
+        rows.setdefault(type(obj).__bases__[0].__name__, (baseline, slotted))
+    print('{:<12} {:>8} {:>8} {:>8}'.format('class', '__dict__', 'slots', 'saved'))
+    for name, (baseline, slotted) in sorted(rows.items()):
+        print('{:<12} {:>8} {:>8} {:>8}'.format(name, baseline, slotted, baseline - slotted))
+    per_game = _game_bytes(games)
+    print('{:.0f} bytes per game ({} games), {:.0f} bytes with __dict__, {:.0f} bytes saved '
+          '({:.1%})'.format(per_game, games, per_game + saved, saved, saved / (per_game + saved)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*
+'''compare games per second of the vectorized simulator and looping Game.run
+'''
+import time
+
+from richman.maps.map_test import MapTest
+from richman.simulation import default_players, simulate
+from richman.vectorized import VectorizedSimulator
+
+
+def main(games: int = 20000, object_games: int = 1000):
+    start = time.perf_counter()
+    simulate(object_games, processes=1)
+    elapsed = time.perf_counter() - start
+    object_rate = object_games / elapsed
+    print('Game.run       {:>8} games in {:.2f} s, {:.0f} games/s'.format(
+        object_games, elapsed, object_rate))
+    start = time.perf_counter()
+    VectorizedSimulator(MapTest(), default_players(), games, seed=0).run()
+    elapsed = time.perf_counter() - start
+    print('vectorized     {:>8} games in {:.2f} s, {:.0f} games/s, x{:.1f}'.format(
+        games, elapsed, games / elapsed, games / elapsed / object_rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*
+import argparse
+import time
+
+from richman.simulation import simulate
+
+
+def main(games: int = 1000, seed: int = 0, processes: int = None):
+    start = time.perf_counter()
+    result = simulate(games, seed=seed, processes=processes)
+    elapsed = time.perf_counter() - start
+    print(result)
+    print('{} games in {:.2f} s, {:.1f} games/s'.format(games, elapsed, games / elapsed))
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='run richman games in a process pool')
+    parser.add_argument('-n', '--games', type=int, default=1000)
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-p', '--processes', type=int, default=None)
+    args = parser.parse_args()
+    main(args.games, args.seed, args.processes)
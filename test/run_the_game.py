@@ -2,9 +2,11 @@
 import logging
 from logging.handlers import RotatingFileHandler
 
+import richman.log as log
 from richman.game import Game
 from richman.maps.map_test import MapTest
 from richman.player import PlayerSimple
+from richman.trace import TraceRecorder
 
 
 def _set_logger():
@@ -37,9 +39,11 @@ def _set_logger():
     logger.propagate = False
 
 
-def main(log_on:bool = False):
+def main(log_on:bool = False, trace_file:str = None):
     if log_on:
         _set_logger()
+    log.enable_if_sink_attached()
+    trace = TraceRecorder(trace_file) if trace_file else None
     # player
     init_money = 50000
     players = []
@@ -49,10 +53,12 @@ def main(log_on:bool = False):
     # map
     map = MapTest()
     # game
-    game = Game(map, players)
+    game = Game(map, players, trace=trace)
     # start
     game.run()
+    if trace:
+        trace.close()
 
 
 if __name__ == "__main__":
-    main(log_on=True)
\ No newline at end of file
+    main(log_on=True, trace_file=r"trace.bin")
\ No newline at end of file
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+
+import richman.mapfile as mf
+import richman.maps.compiler as compiler
+from richman.maps.map_test import MapTest
+
+
+_DOC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'doc')
+MAP_TEST_XLSX = os.path.join(_DOC, 'test', 'map_test.xlsx')
+MAP_FULL_XLSX = os.path.join(_DOC, '超级地产富翁_地产大亨', 'map_超级电产富翁_地产大亨.xlsx')
+
+
+class TestCompiler(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_compiled_map_should_equal_the_hand_written_map(self):
+        map = compiler.MapCompiled(MAP_TEST_XLSX, cache_dir=self.cache_dir)
+        expected = MapTest()
+        self.assertListEqual([(type(item), item.name, item.buy_value, item.sell_value)
+                              for item in map.items],
+                             [(type(item), item.name, item.buy_value, item.sell_value)
+                              for item in expected.items])
+        self.assertListEqual([getattr(item, 'fees', None) for item in map.items],
+                             [getattr(item, 'fees', None) for item in expected.items])
+        self.assertListEqual([[estate.name for estate in block.estates] for block in map.blocks],
+                             [[estate.name for estate in block.estates] for block in expected.blocks])
+
+    def test_compile_should_load_from_cache_without_parsing(self):
+        definition = compiler.compile_map(MAP_TEST_XLSX, cache_dir=self.cache_dir)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        with patch.object(compiler, 'read_sheet', side_effect=AssertionError('parsed')):
+            self.assertEqual(compiler.compile_map(MAP_TEST_XLSX, cache_dir=self.cache_dir),
+                             definition)
+
+    def test_compile_should_cache_each_name_of_a_file(self):
+        first = compiler.compile_map(MAP_TEST_XLSX, cache_dir=self.cache_dir, name='甲')
+        second = compiler.compile_map(MAP_TEST_XLSX, cache_dir=self.cache_dir, name='乙')
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+        with patch.object(compiler, 'read_sheet', side_effect=AssertionError('parsed')):
+            self.assertEqual(compiler.compile_map(MAP_TEST_XLSX, cache_dir=self.cache_dir,
+                                                  name='甲'), first)
+            self.assertEqual(compiler.compile_map(MAP_TEST_XLSX, cache_dir=self.cache_dir,
+                                                  name='乙'), second)
+
+    def test_compile_should_parse_again_if_cache_is_broken(self):
+        definition = compiler.compile_map(MAP_TEST_XLSX, cache_dir=self.cache_dir)
+        cache_path = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        with open(cache_path, 'wb') as f:
+            f.write(b'broken')
+        self.assertEqual(compiler.compile_map(MAP_TEST_XLSX, cache_dir=self.cache_dir),
+                         definition)
+
+    def test_full_map_should_have_publics_and_all_projects(self):
+        definition = compiler.compile_map(MAP_FULL_XLSX, cache_dir=False)
+        self.assertEqual(len(definition.tiles), 40)
+        self.assertEqual(len(definition.blocks), 6)
+        self.assertEqual(definition.tiles[0].name, '起点')
+        self.assertEqual(definition.tiles[28].name, '公园')
+        self.assertEqual(mf.unpack_definition(mf.pack_definition(definition)), definition)
+
+    def test_parse_map_should_check_the_rows(self):
+        row = {'no': '1', 'item': '沈阳', 'block': '1', 'fee0': '400', 'fee1': '1000',
+               'fee2': '2500', 'fee3': '5500', 'buy_value': '2400', 'sell_value': '2400',
+               'pledge_value': '1200', 'upgrade_value': '600'}
+        compiler.parse_map([row], 'map')
+        for key, value in (('no', '2'), ('fee1', '300'), ('sell_value', '2000'),
+                           ('pledge_value', '3000'), ('buy_value', 'abc'), ('item', '无名地')):
+            bad = dict(row, **{key: value})
+            if key == 'item':
+                del bad['block']
+            with self.assertRaises(ValueError):
+                compiler.parse_map([bad], 'map')
+        with self.assertRaises(ValueError):
+            compiler.parse_map([row, dict(row, no='2')], 'map')
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*
+
+import unittest
+
+from richman.dice import DiceStream
+
+
+class TestDiceStream(unittest.TestCase):
+
+    def test_same_seed_should_give_same_rolls(self):
+        dice1 = DiceStream(seed=5, block_size=7)
+        dice2 = DiceStream(seed=5, block_size=7)
+        self.assertListEqual([dice1.roll() for _ in range(50)],
+                             [dice2.roll() for _ in range(50)])
+
+    def test_rolls_should_be_in_range_across_blocks(self):
+        dice = DiceStream(seed=1, block_size=3)
+        rolls = [dice.roll() for _ in range(600)]
+        self.assertEqual(min(rolls), 1)
+        self.assertEqual(max(rolls), 6)
+
+    def test_multi_dice_should_sum_faces(self):
+        dice = DiceStream(seed=2, dice=2, faces=4)
+        self.assertEqual((dice.low, dice.high), (2, 8))
+        rolls = [dice.roll() for _ in range(1000)]
+        self.assertTrue(all(2 <= roll <= 8 for roll in rolls))
+
+    def test_distribution_should_be_exact(self):
+        distribution = DiceStream(dice=2).distribution()
+        self.assertListEqual(list(distribution), list(range(2, 13)))
+        self.assertAlmostEqual(distribution[7], 6 / 36)
+        self.assertAlmostEqual(sum(distribution.values()), 1.0)
@@ -30,6 +30,11 @@ class TestEstate(unittest.TestCase):
         self.assertEqual(self.estate.buy_value, 2200)
         self.assertEqual(self.estate.pledge_value, 1100)
 
+    def test_estate_should_have_no_instance_dict(self):
+        self.assertFalse(hasattr(self.estate, '__dict__'))
+        with self.assertRaises(AttributeError):
+            self.estate.value = 100
+
     def test_buy_and_rebuy_should_raise_execption(self):
         self.player.add_money = MagicMock()
         self.estate.buy(self.player)
@@ -100,3 +105,38 @@ class TestEstateBlock(unittest.TestCase):
         place3.buy(player)
         self.assertEqual(block.block_fee_calc(player), 400)
 
+
+    def test_block_fee_cache_should_follow_sell_and_degrade(self):
+        block = estate.EstateBlock('block1')
+        place1 = estate.Estate('杭州', [100, 200, 300, 400],
+                               2000, 1000, 300, block)
+        place2 = estate.Estate('厦门', [100, 200, 300, 400],
+                               3000, 2000, 300, block)
+        player1, player2 = MagicMock(), MagicMock()
+        place1.buy(player1)
+        place1.upgrade()
+        place2.buy(player2)
+        self.assertEqual(block.block_fee_calc(player1), 200)
+        self.assertEqual(block.block_fee_calc(player2), 100)
+        place1.degrade()
+        self.assertEqual(block.block_fee_calc(player1), 100)
+        place1.sell()
+        self.assertEqual(block.block_fee_calc(player1), 0)
+        self.assertEqual(block.block_fee_calc(player2), 100)
+        self.assertEqual(block.block_fee_calc(None), 0)
+
+    def test_block_fee_cache_should_match_recalc_after_set_state(self):
+        block = estate.EstateBlock('block1')
+        place1 = estate.Estate('杭州', [100, 200, 300, 400],
+                               2000, 1000, 300, block)
+        place2 = estate.Estate('厦门', [100, 200, 300, 400],
+                               3000, 2000, 300, block)
+        player = MagicMock()
+        block.debug = True
+        place1._set_state(player, 2, False)
+        place2._set_state(player, 1, True)
+        self.assertEqual(block.block_fee_calc(player), 500)
+        place1._set_state(None, 0, False)
+        self.assertEqual(block.block_fee_calc(player), 200)
+        block.rebuild()
+        self.assertEqual(block.block_fee_calc(player), block.block_fee_recalc(player))
@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*
 
+import gc
 import unittest
+import weakref
 from unittest.mock import MagicMock
 
 import richman.event as event
+import richman.log as log
+from richman.game import Game
+from richman.maps.map_test import MapTest
+from richman.player import PlayerSimple
 
 
 class TestEventManaer(unittest.TestCase):
@@ -44,4 +50,174 @@ class TestEventManaer(unittest.TestCase):
         for handler1 in handlers1:
             handler1.assert_not_called()
         for handler2 in handlers2:
-            handler2.assert_called_once()
\ No newline at end of file
+            handler2.assert_called_once()
+
+    def test_handlers_should_be_called_by_priority(self):
+        calls = []
+        low, normal1, normal2, high = (MagicMock(side_effect=lambda e, n=n: calls.append(n))
+                                       for n in ('low', 'normal1', 'normal2', 'high'))
+        event_name = 'Event Test'
+        self.event_manager.add_listeners(event_name, normal1)
+        self.event_manager.add_listeners(event_name, low, priority=-1)
+        self.event_manager.add_listeners(event_name, [high], priority=1)
+        self.event_manager.add_listeners(event_name, [normal2, normal1])
+        self.assertListEqual(self.event_manager.handlers_dict[event_name],
+                             [high, normal1, normal2, low])
+        event1 = MagicMock()
+        event1.event_name = event_name
+        self.event_manager.send(event1)
+        self.assertListEqual(calls, ['high', 'normal1', 'normal2', 'low'])
+        self.event_manager.remove_listeners(event_name, [normal1, high])
+        self.event_manager.add_listeners(event_name, high, priority=-1)
+        self.assertListEqual(self.event_manager.handlers_dict[event_name], [normal2, low, high])
+
+    def test_unhashable_handlers_should_be_added_once(self):
+        class Handler:
+            def __eq__(self, obj):
+                return isinstance(obj, Handler)
+            def __call__(self, event):
+                pass
+        self.event_manager.add_listeners('Event Test', [Handler(), Handler()])
+        self.assertEqual(len(self.event_manager.handlers_dict['Event Test']), 1)
+        self.event_manager.remove_listeners('Event Test', Handler())
+        self.assertFalse(self.event_manager.handlers_dict)
+
+    def test_queued_events_should_be_handled_by_drain(self):
+        manager = event.EventManager(queued=True)
+        handler = MagicMock()
+        manager.add_listeners('upgrade', handler)
+        upgrade1 = event.BaseEvent('upgrade')
+        upgrade2 = event.BaseEvent('upgrade')
+        manager.send(upgrade1)
+        manager.send(upgrade2)
+        manager.send(upgrade1)
+        manager.send(event.BaseEvent('land'))
+        handler.assert_not_called()
+        self.assertEqual(manager.pending, 4)
+        # 同一事件在一次 drain 中只处理一次
+        self.assertEqual(manager.drain(), 3)
+        self.assertListEqual([call.args[0] for call in handler.call_args_list],
+                             [upgrade2, upgrade1])
+        self.assertEqual(manager.pending, 0)
+
+    def test_events_after_a_failed_handler_should_be_kept_for_next_drain(self):
+        manager = event.EventManager(queued=True)
+        upgrade1 = event.BaseEvent('upgrade')
+        upgrade2 = event.BaseEvent('upgrade')
+        land = event.BaseEvent('land')
+        handler = MagicMock(side_effect=[RuntimeError('handler failed'), None, None])
+        manager.add_listeners('upgrade', handler)
+        manager.add_listeners('land', handler)
+        for event1 in (upgrade1, land, upgrade2):
+            manager.send(event1)
+        with self.assertRaises(RuntimeError):
+            manager.drain()
+        self.assertEqual(manager.pending, 2)
+        self.assertEqual(manager.drain(), 2)
+        self.assertListEqual([call.args[0] for call in handler.call_args_list],
+                             [upgrade1, upgrade2, land])
+
+    def test_events_with_the_same_key_should_be_coalesced(self):
+        manager = event.EventManager(queued=True)
+        tiles = []
+        def on_land(land):
+            tiles.append(land.pos)
+            if land.pos == 3:
+                manager.send(event.LandEvent(None, 4))
+        manager.add_listeners(event.EVENT_LAND, on_land)
+        for tile in (1, 3, 1, 2):
+            manager.send(event.LandEvent(None, tile))
+        # 处理中发送的事件在同一次 drain 的下一批处理
+        self.assertEqual(manager.drain(), 4)
+        self.assertListEqual(tiles, [3, 1, 2, 4])
+
+    def test_handler_removed_while_sending_should_not_skip_the_next(self):
+        handler = MagicMock()
+        def once(event1):
+            self.event_manager.remove_listeners('Event Test', once)
+        self.event_manager.add_listeners('Event Test', [once, handler])
+        event1 = MagicMock()
+        event1.event_name = 'Event Test'
+        self.event_manager.send(event1)
+        handler.assert_called_once_with(event1)
+        self.assertListEqual(self.event_manager.handlers_dict['Event Test'], [handler])
+        self.assertRaises(ValueError, self.event_manager.remove_listeners, 'Event Test', once)
+
+    def test_weak_listeners_should_be_removed_with_their_objects(self):
+        class Listener:
+            def __init__(self):
+                self.events = []
+            def on_event(self, event):
+                self.events.append(event)
+        listener = Listener()
+        player = PlayerSimple('邓彦修', 50000)
+        handler = MagicMock()
+        self.event_manager.add_listeners('Event Test', [listener.on_event, player.play], weak=True)
+        self.event_manager.add_listeners('Event Test', handler)
+        self.event_manager.add_listeners('Event Test', listener.on_event, weak=True)
+        self.assertDictEqual(self.event_manager.listener_counts(), {'Event Test': 3})
+        event1 = MagicMock()
+        event1.event_name = 'Event Test'
+        del player
+        gc.collect()
+        self.event_manager.send(event1)
+        self.assertListEqual(listener.events, [event1])
+        handler.assert_called_once_with(event1)
+        self.assertDictEqual(self.event_manager.listener_counts(), {'Event Test': 2})
+        self.event_manager.remove_listeners('Event Test', listener.on_event)
+        self.assertListEqual(self.event_manager.handlers_dict['Event Test'], [handler])
+
+    def test_weak_listeners_should_not_keep_games_alive(self):
+        refs = []
+        for seed in range(100):
+            players = [PlayerSimple('邓彦修', 50000), PlayerSimple('邓哲', 50000)]
+            game = Game(MapTest(), players, seed=seed)
+            for player in players:
+                self.event_manager.add_listeners('land', player.play, weak=True)
+            refs.append(weakref.ref(game))
+        del game, players, player
+        gc.collect()
+        self.assertTrue(all(ref() is None for ref in refs))
+        self.assertDictEqual(self.event_manager.listener_counts(), {})
+        self.assertFalse(self.event_manager.handlers_dict)
+
+
+class TestGameEvents(unittest.TestCase):
+
+    def setUp(self):
+        self.players = [PlayerSimple('邓彦修', 50000), PlayerSimple('邓哲', 50000)]
+        self.game = Game(MapTest(), self.players, seed=1)
+
+    def test_game_should_send_nothing_without_listeners(self):
+        with log.quiet():
+            self.game._run_one_step()
+        self.assertFalse(self.game._wants(event.EVENT_LAND))
+        self.assertEqual(self.game.events.pending, 0)
+
+    def test_events_should_be_handled_at_the_end_of_each_turn(self):
+        lands, upgrades = [], []
+        def on_land(land):
+            self.assertEqual(self.game.events.pending, 0)
+            lands.append((land.player, land.pos))
+        self.game.events.add_listeners(event.EVENT_LAND, on_land)
+        self.game.events.add_listeners(event.EVENT_UPGRADE, upgrades.append)
+        turns = 0
+        with log.quiet():
+            while len(self.game.players_in_game) > 1 and turns < 100:
+                turns += len(self.game.players_in_game)
+                self.game._run_one_step()
+                self.assertEqual(self.game.events.pending, 0)
+        self.assertEqual(len(lands), turns)
+        self.assertListEqual([player for player, _ in lands[:2]], self.players)
+        self.assertTrue(upgrades)
+        for upgrade in upgrades:
+            self.assertIn(upgrade.player, self.players)
+            self.assertGreater(upgrade.level, 0)
+
+    def test_rollouts_should_send_no_events(self):
+        handler = MagicMock()
+        self.game.events.add_listeners(event.EVENT_LAND, handler)
+        with self.game._rollout(self.game.dice):
+            self.players[0].play()
+            self.assertEqual(self.game.events.pending, 0)
+        handler.assert_not_called()
@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*
 
+import random
 import unittest
 from unittest.mock import MagicMock
 
+import richman.log as log
+from richman.dice import DiceStream
 from richman.game import Game
+from richman.maps.map_test import MapTest
+from richman.player import PlayerSimple
+from richman.simulation import default_players
 
 
 class TestBaseGame(unittest.TestCase):
@@ -33,3 +39,78 @@ class TestBaseGame(unittest.TestCase):
         self.game._run_one_step()
         self.assertEqual(len(self.game.players_in_game), 1)
         self.assertEqual(self.game.players_in_game[0].name, '戎萍')
+
+
+class TestGameSeed(unittest.TestCase):
+
+    def _play(self, seed: int)->list:
+        players = [PlayerSimple(name, 50000) for name in ('邓彦修', '邓哲', '戎萍')]
+        game = Game(MapTest(), players, seed=seed)
+        history = []
+        while len(game.players_in_game) > 1 and game.step < 300:
+            game._run_one_step()
+            history.append(tuple((player.pos, player.money) for player in players))
+        return history
+
+    def test_same_seed_should_give_identical_game(self):
+        self.assertListEqual(self._play(3), self._play(3))
+        self.assertNotEqual(self._play(3), self._play(4))
+
+    def test_game_should_keep_the_rng_given_to_a_player(self):
+        rng = random.Random(1)
+        players = [PlayerSimple('邓彦修', 50000, rng=rng), PlayerSimple('邓哲', 50000)]
+        game = Game(MapTest(), players, seed=3)
+        self.assertIs(players[0].rng, rng)
+        self.assertIs(players[1].rng, game.rng)
+
+    def test_game_should_keep_the_dice_given_to_a_player(self):
+        dice = DiceStream(1)
+        players = [PlayerSimple('邓彦修', 50000, dice=dice),
+                   PlayerSimple('邓哲', 50000, rng=random.Random(2)),
+                   PlayerSimple('戎萍', 50000)]
+        own_dice = players[1].dice
+        game = Game(MapTest(), players, seed=3)
+        self.assertIs(players[0].dice, dice)
+        self.assertIs(players[1].dice, own_dice)
+        self.assertIsNot(own_dice, game.dice)
+        self.assertIs(players[2].dice, game.dice)
+        with game._rollout(DiceStream(4)):
+            self.assertTrue(all(player.dice is not dice for player in players))
+        self.assertListEqual([player.dice for player in players], [dice, own_dice, game.dice])
+
+
+class TestGameSnapshot(unittest.TestCase):
+
+    def _new_game(self, seed: int)->Game:
+        return Game(MapTest(), default_players(), seed=seed)
+
+    def _describe(self, game: Game)->tuple:
+        return (game.step,
+                tuple(player.name for player in game.players_in_game),
+                tuple(str(player) for player in game.players_all),
+                tuple(player.estate_level_counts for player in game.players_all),
+                tuple(block.block_fee_calc(player) for block in game.map.blocks
+                      for player in game.players_all))
+
+    def test_restore_should_bring_back_the_snapshot(self):
+        with log.quiet():
+            game = self._new_game(5)
+            for _ in range(15):
+                game._run_one_step()
+            snapshot = game.snapshot()
+            expected = self._describe(game)
+            game.run()
+            self.assertNotEqual(self._describe(game), expected)
+            game.restore(snapshot)
+            self.assertTupleEqual(self._describe(game), expected)
+            game.run(max_step=100)
+
+    def test_snapshot_should_be_restored_into_another_game(self):
+        with log.quiet():
+            game = self._new_game(5)
+            for _ in range(10):
+                game._run_one_step()
+            other = self._new_game(6)
+            other.restore(game.snapshot())
+            self.assertTupleEqual(self._describe(other), self._describe(game))
+            self.assertEqual(other.state, game.state)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*
+
+import unittest
+from unittest.mock import MagicMock
+
+
+from richman.holdings import Holdings
+
+
+class TestHoldings(unittest.TestCase):
+
+    def setUp(self):
+        self.places = [MagicMock() for _ in range(4)]
+        for index, place in enumerate(self.places):
+            place.name = 'place{}'.format(index)
+        self.holdings = Holdings(self.places)
+
+    def tearDown(self):
+        pass
+
+    def test_holdings_should_keep_the_order_of_adding(self):
+        self.assertListEqual(list(self.holdings), self.places)
+        self.holdings.remove(self.places[1])
+        self.holdings.add(self.places[1])
+        self.assertListEqual(list(self.holdings),
+                             [self.places[0], self.places[2], self.places[3], self.places[1]])
+
+    def test_holdings_should_index_places_by_identity(self):
+        other = MagicMock()
+        other.name = 'place0'
+        other.__eq__.return_value = True
+        self.assertIn(self.places[0], self.holdings)
+        self.assertNotIn(other, self.holdings)
+        with self.assertRaises(ValueError):
+            self.holdings.remove(other)
+        self.holdings.add(self.places[0])
+        self.assertEqual(len(self.holdings), 4)
+
+    def test_remove_while_iterating_a_copy_should_remove_all(self):
+        for place in list(self.holdings):
+            self.holdings.remove(place)
+        self.assertEqual(len(self.holdings), 0)
+        self.assertFalse(self.holdings)
+
+    def test_holdings_should_compare_with_sequences_only(self):
+        self.assertEqual(self.holdings, self.places)
+        self.assertEqual(self.holdings, Holdings(self.places))
+        self.assertNotEqual(self.holdings, None)
+        self.assertNotEqual(self.holdings, 0)
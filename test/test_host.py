@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*
+
+import asyncio
+import unittest
+
+import richman.log as log
+from richman.game import Game
+from richman.maps.map_test import MapTest
+from richman.player import PlayerSimple, PlayerPerson, DECISION_BUY
+from richman.host import GameHost, ScriptedClient
+
+
+def _players(first):
+    return [first, PlayerSimple('邓哲', 50000), PlayerSimple('戎萍', 50000)]
+
+
+def _result(game: Game)->tuple:
+    return game.step, tuple(str(player) for player in game.players_all)
+
+
+class TestGameHost(unittest.TestCase):
+
+    def setUp(self):
+        self.quiet = log.quiet()
+        self.quiet.__enter__()
+
+    def tearDown(self):
+        self.quiet.__exit__(None, None, None)
+
+    def _run(self, seed: int, first, max_step: int = 300)->Game:
+        game = Game(MapTest(), _players(first), seed=seed)
+        game.run(max_step=max_step)
+        return game
+
+    def _run_async(self, seed: int, first, max_step: int = 300)->Game:
+        game = Game(MapTest(), _players(first), seed=seed)
+        asyncio.run(game.run_async(max_step=max_step))
+        return game
+
+    def test_run_async_should_play_the_same_game_as_run(self):
+        for seed in range(3):
+            self.assertTupleEqual(_result(self._run_async(seed, PlayerSimple('邓彦修', 50000))),
+                                  _result(self._run(seed, PlayerSimple('邓彦修', 50000))))
+
+    def test_person_answering_defaults_should_play_as_player_simple(self):
+        for seed in range(3):
+            client = ScriptedClient()
+            person = PlayerPerson('邓彦修', 50000, client=client)
+            self.assertTupleEqual(_result(self._run_async(seed, person)),
+                                  _result(self._run(seed, PlayerSimple('邓彦修', 50000))))
+            self.assertGreater(client.decisions, 0)
+
+    def test_person_should_follow_the_answers_of_the_client(self):
+        def never_buy(player, kind, key, default):
+            return False if kind == DECISION_BUY else default
+        person = PlayerPerson('邓彦修', 50000, client=ScriptedClient(script=never_buy))
+        self._run_async(1, person, max_step=20)
+        self.assertEqual(len(person.estates), 0)
+        self.assertEqual(len(person.projects), 0)
+
+    def test_late_answers_should_be_the_defaults(self):
+        person = PlayerPerson('邓彦修', 50000, client=ScriptedClient(delay=10), timeout=0.001)
+        self.assertTupleEqual(_result(self._run_async(2, person, max_step=5)),
+                              _result(self._run(2, PlayerSimple('邓彦修', 50000), max_step=5)))
+
+    def test_answers_should_be_forgotten_after_the_turn(self):
+        asked = []
+        def never_buy(player, kind, key, default):
+            if kind == DECISION_BUY:
+                asked.append(key)
+                return False
+            return default
+        person = PlayerPerson('邓彦修', 50000, client=ScriptedClient(script=never_buy))
+        game = Game(MapTest(), _players(person), seed=1)
+        while not asked:
+            asyncio.run(game._run_one_step_async())
+        place = next(item for item in game.map.items if item.name == asked[0])
+        # 回合外的决定，例如其他玩家推演时，按默认处理
+        self.assertTrue(person._make_decision_buy(place))
+
+    def test_failing_client_should_answer_the_defaults(self):
+        def broken(player, kind, key, default):
+            raise RuntimeError('broken script')
+        client = ScriptedClient(script=broken)
+        person = PlayerPerson('邓彦修', 50000, client=client)
+        self.assertTupleEqual(_result(self._run_async(2, person, max_step=5)),
+                              _result(self._run(2, PlayerSimple('邓彦修', 50000), max_step=5)))
+        self.assertGreater(client.decisions, 0)
+
+    def test_host_should_run_games_together(self):
+        host = GameHost(max_games=8, max_step=30)
+        clients = [ScriptedClient(delay=0.001) for _ in range(20)]
+        games = [Game(MapTest(), _players(PlayerPerson('邓彦修', 50000, client=client)), seed=seed)
+                 for seed, client in enumerate(clients)]
+        running = []
+
+        async def main():
+            task = asyncio.ensure_future(host.play_all(games))
+            while not task.done():
+                running.append(host.running)
+                await asyncio.sleep(0.001)
+            return task.result()
+
+        results = asyncio.run(main())
+        self.assertListEqual(results, games)
+        self.assertEqual(host.finished, 20)
+        self.assertEqual(host.running, 0)
+        self.assertEqual(max(running), 8)
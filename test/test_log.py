@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*
+
+import asyncio
+import logging
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+import richman.log as log
+import richman.estate as estate
+
+
+class TestLog(unittest.TestCase):
+
+    def setUp(self):
+        self.estate = estate.Estate(name='Hangzhou',
+                                    fees=[100, 200, 300, 400],
+                                    buy_value=2200,
+                                    pledge_value=1100,
+                                    upgrade_value=600,
+                                    block=MagicMock())
+        self.player = MagicMock()
+        self.player.name = '邓哲'
+        log.set_enabled(True)
+
+    def tearDown(self):
+        log.enable_if_sink_attached()
+
+    def test_quiet_mode_should_not_build_messages(self):
+        with patch('logging.info') as info:
+            with log.quiet():
+                self.estate.buy(self.player)
+            info.assert_not_called()
+            self.assertTrue(log.enabled)
+            self.estate.upgrade()
+            info.assert_called_once_with('邓哲 升级地产 Hangzhou 到 1 级，花费 600 元。')
+
+    def test_enable_if_sink_attached_should_check_handlers(self):
+        logger = MagicMock()
+        logger.isEnabledFor.return_value = True
+        logger.hasHandlers.return_value = False
+        log.enable_if_sink_attached(logger)
+        self.assertFalse(log.enabled)
+        logger.hasHandlers.return_value = True
+        log.enable_if_sink_attached(logger)
+        self.assertTrue(log.enabled)
+
+    def test_messages_should_follow_the_root_logger_by_default(self):
+        log.set_enabled(None)
+        root = logging.getLogger()
+        with patch.object(root, 'handlers', []):
+            log.refresh()
+            self.assertFalse(log.enabled)
+            with patch.object(root, 'handlers', [logging.NullHandler()]), \
+                    patch.object(root, 'isEnabledFor', return_value=True):
+                log.refresh()
+                self.assertTrue(log.enabled)
+
+    def test_quiet_mode_should_be_local_to_the_thread_and_the_task(self):
+        seen = []
+        with log.quiet():
+            thread = threading.Thread(target=lambda: seen.append(log.enabled))
+            thread.start()
+            thread.join()
+            self.assertFalse(log.enabled)
+        self.assertListEqual(seen, [True])
+        async def rollout(entered, other_checked):
+            with log.quiet():
+                entered.set()
+                await other_checked.wait()
+                return log.enabled
+        async def other(entered, other_checked):
+            await entered.wait()
+            enabled = log.enabled
+            other_checked.set()
+            return enabled
+        async def main():
+            entered, other_checked = asyncio.Event(), asyncio.Event()
+            return await asyncio.gather(rollout(entered, other_checked),
+                                        other(entered, other_checked))
+        self.assertListEqual(asyncio.run(main()), [False, True])
+
+    def test_overlapping_quiet_blocks_should_restore_messages_at_the_last_exit(self):
+        first = log.quiet()
+        second = log.quiet()
+        first.__enter__()
+        second.__enter__()
+        first.__exit__(None, None, None)
+        self.assertFalse(log.enabled)
+        second.__exit__(None, None, None)
+        self.assertTrue(log.enabled)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*
+
+import unittest
+
+import richman.log as log
+from richman.game import Game
+from richman.maps.map_test import MapTest
+from richman.player import PlayerSimple
+from richman.lookahead import Lookahead, Timeout, NOT_OWNED, BANKRUPT
+
+
+class TestLookahead(unittest.TestCase):
+
+    def setUp(self):
+        self.players = [PlayerSimple('邓彦修', 50000), PlayerSimple('邓哲', 50000),
+                        PlayerSimple('戎萍', 50000)]
+        self.game = Game(MapTest(), self.players, seed=3)
+        with log.quiet():
+            for _ in range(20):
+                self.game._run_one_step()
+        self.player = self.game.players_in_game[0]
+
+    def tearDown(self):
+        pass
+
+    def test_block_fee_should_equal_the_rent_of_the_map(self):
+        lookahead = Lookahead(self.player)
+        items = self.player.map.items
+        for tile, level in enumerate(lookahead.levels):
+            if level == NOT_OWNED:
+                self.assertEqual(lookahead.block_fee(lookahead.levels, tile), 0)
+            else:
+                self.assertEqual(lookahead.block_fee(lookahead.levels, tile),
+                                 items[tile].block.block_fee_calc(self.player))
+
+    def test_value_should_be_memoized_and_leave_the_game_unchanged(self):
+        snapshot = self.game.snapshot()
+        lookahead = Lookahead(self.player)
+        args = (self.player.pos, self.player.money, lookahead.levels)
+        value = lookahead.value(2, *args)
+        lookahead.deadline = 0  # 已缓存的结果不再检查时间
+        self.assertEqual(lookahead.value(2, *args), value)
+        with self.assertRaises(Timeout):
+            lookahead.value(3, *args)
+        self.assertEqual(self.game.snapshot(), snapshot)
+
+    def test_leaf_should_be_banckrupt_if_player_can_not_pay(self):
+        lookahead = Lookahead(self.player)
+        self.assertEqual(lookahead.leaf(-10**9, lookahead.levels), BANKRUPT)
+        self.assertEqual(lookahead.leaf(2000, lookahead.levels) - lookahead.leaf(1000, lookahead.levels),
+                         1000)
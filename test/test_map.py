@@ -4,6 +4,8 @@ import unittest
 from unittest.mock import MagicMock
 
 from richman.map import BaseMap
+from richman.estate import Estate
+from richman.maps.map_test import MapTest
 import richman.interface as itf
 
 
@@ -38,3 +40,56 @@ class TestBaseMap(unittest.TestCase):
         # init with duplicated estates
         with self.assertRaises(ValueError):
             map = BaseMap('China', [estate1, estate2, estate3])
+
+    def test_kind_of_should_use_the_tag_and_check_it_in_validation(self):
+        map = MapTest()
+        kinds = [itf.kind_of(item) for item in map.items]
+        self.assertListEqual(kinds, [itf.KIND_ESTATE if isinstance(item, Estate)
+                                     else itf.KIND_PROJECT for item in map.items])
+        # mocks have no tag
+        self.assertEqual(itf.kind_of(self.map.items[0]), itf.KIND_ESTATE)
+        class WrongTag(Estate):
+            __slots__ = ()
+            kind = itf.KIND_PUBLIC
+        place = WrongTag('西安', [100, 200, 300, 400], 2000, 1000, 300, MagicMock())
+        self.assertEqual(itf.kind_of(place), itf.KIND_PUBLIC)
+        itf.set_validation(True)
+        try:
+            with self.assertRaises(RuntimeError):
+                itf.kind_of(place)
+        finally:
+            itf.set_validation(False)
+
+    def test_indexes_should_find_items_without_scanning(self):
+        map = MapTest()
+        estates = map.positions_of_kind(itf.KIND_ESTATE)
+        projects = map.positions_of_kind(itf.KIND_PROJECT)
+        self.assertTupleEqual(projects, (2, 6))
+        self.assertEqual(len(estates) + len(projects), len(map))
+        self.assertTupleEqual(map.positions_of_kind(itf.KIND_PUBLIC), ())
+        self.assertEqual(map.position_of('北京'), 3)
+        self.assertIsNone(map.position_of('香港'))
+        self.assertTupleEqual(map.positions_in_block(map.blocks[0]), (0, 1, 3, 4))
+        self.assertEqual(map.next_position_of_kind(itf.KIND_PROJECT, 2), 6)
+        self.assertEqual(map.next_position_of_kind(itf.KIND_PROJECT, 6), 2)
+        self.assertEqual(map.next_position_of_kind(itf.KIND_ESTATE, 1), 3)
+        self.assertIsNone(map.next_position_of_kind(itf.KIND_PUBLIC, 0))
+
+    def test_indexes_should_be_rebuilt_after_adding_items(self):
+        self.assertEqual(self.map.position_of('p3'), 2)
+        estate4 = MagicMock(spec=itf.IMapForEstate)
+        estate4.name = 'p4'
+        self.map._add_items(estate4)
+        self.assertEqual(self.map.position_of('p4'), 3)
+        self.assertTupleEqual(self.map.positions_of_kind(itf.KIND_ESTATE), (0, 1, 2, 3))
+
+    def test_cached_should_build_once_until_items_change(self):
+        build = MagicMock(side_effect=lambda map: len(map.items))
+        self.assertEqual(self.map.cached('count', build), 3)
+        self.assertEqual(self.map.cached('count', build), 3)
+        self.assertEqual(build.call_count, 1)
+        estate4 = MagicMock(spec=itf.IMapForEstate)
+        estate4.name = 'p4'
+        self.map._add_items(estate4)
+        self.assertEqual(self.map.cached('count', build), 4)
+        self.assertEqual(build.call_count, 2)
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*
+
+import os
+import shutil
+import tempfile
+import unittest
+
+
+import richman.mapfile as mf
+from richman.map import BaseMap
+from richman.game import Game
+from richman.maps.map_test import MapTest
+from richman.simulation import default_players
+
+
+class TestMapFile(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.folder, 'map.rmmap')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_save_and_load_should_rebuild_items_and_blocks(self):
+        map = MapTest()
+        map.save(self.file_path)
+        loaded = BaseMap('')
+        self.assertIsNone(loaded.load(self.file_path))
+        self.assertEqual(loaded.name, map.name)
+        self.assertListEqual([(type(item), item.name) for item in loaded.items],
+                             [(type(item), item.name) for item in map.items])
+        self.assertListEqual([[estate.name for estate in block.estates] for block in loaded.blocks],
+                             [[estate.name for estate in block.estates] for block in map.blocks])
+        for item in loaded.items:
+            if hasattr(item, 'block'):
+                self.assertTrue(any(item.block is block for block in loaded.blocks))
+        self.assertEqual(mf.definition_of(loaded), mf.definition_of(map))
+
+    def test_state_should_be_saved_in_its_own_section(self):
+        game = Game(MapTest(), default_players(), seed=3)
+        for _ in range(20):
+            game._run_one_step()
+        game.map.save(self.file_path, game.state)
+        state = BaseMap('').load(self.file_path)
+        self.assertEqual(state, game.state)
+        self.assertEqual(len(state.players), len(game.players_all))
+        with open(self.file_path, 'rb') as f:
+            data = f.read()
+        self.assertEqual(mf.unpack_definition(data), mf.definition_of(game.map))
+
+    def test_reader_should_read_tiles_one_by_one(self):
+        map = MapTest()
+        map.save(self.file_path)
+        with mf.MapFileReader(self.file_path) as reader:
+            self.assertEqual(len(reader), len(map))
+            self.assertEqual(reader.name, map.name)
+            self.assertEqual(reader[-1].name, map.items[-1].name)
+            self.assertEqual(reader[3].fees, tuple(map.items[3].fees))
+            self.assertFalse(reader.has_state)
+            with self.assertRaises(IndexError):
+                reader[len(map)]
+
+    def test_load_should_refuse_other_files(self):
+        with open(self.file_path, 'wb') as f:
+            f.write(b'\x80\x04not a map')
+        with self.assertRaises(ValueError):
+            BaseMap('').load(self.file_path)
+        data = mf.pack_definition(mf.definition_of(MapTest()))
+        with self.assertRaises(ValueError):
+            mf.unpack_definition(data[:-1])
+        with self.assertRaises(ValueError):
+            mf.unpack_definition(data[:4] + b'\x09\x00' + data[6:])
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*
+
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from richman.dice import DiceStream
+from richman.markov import LandingChain
+
+
+class TestLandingChain(unittest.TestCase):
+
+    def setUp(self):
+        self.map = MagicMock()
+        self.map.items = [None] * 20
+
+    def tearDown(self):
+        pass
+
+    def _simulate(self, turns: int, reverse: float, jumps: dict)->np.ndarray:
+        dice = DiceStream(1)
+        rng = np.random.default_rng(1)
+        counts = np.zeros(20)
+        pos = 0
+        for _ in range(turns):
+            step = dice.roll()
+            pos = (pos - step if rng.random() < reverse else pos + step) % 20
+            counts[pos] += 1
+            pos = jumps.get(pos, pos)
+        return counts / turns
+
+    def test_first_turn_should_land_by_the_dice(self):
+        chain = LandingChain(self.map)
+        landings = chain.landings(2, start=18)
+        np.testing.assert_allclose(landings[0], [1 / 6] * 5 + [0.0] * 14 + [1 / 6])
+        self.assertAlmostEqual(landings[1].sum(), 1.0)
+        np.testing.assert_allclose(chain.expected_landings(2, start=18), landings.sum(axis=0))
+
+    def test_stationary_should_be_uniform_without_jumps(self):
+        np.testing.assert_allclose(LandingChain(self.map).stationary(), [1 / 20] * 20)
+
+    def test_stationary_should_match_the_simulation(self):
+        jumps = {15: 5, 7: 0}
+        chain = LandingChain(self.map, reverse=0.25, jumps=jumps)
+        landings = chain.stationary()
+        self.assertAlmostEqual(landings.sum(), 1.0)
+        np.testing.assert_allclose(landings, self._simulate(200000, 0.25, jumps), atol=0.005)
+        # 跳转终点之后的地块更常被走到
+        self.assertGreater(landings[6], landings[16])
+
+    def test_jumps_should_accept_probabilities(self):
+        chain = LandingChain(self.map, jumps={3: {0: 0.5, 10: 0.5}})
+        np.testing.assert_allclose(chain.transition.sum(axis=1), 1.0)
+        self.assertAlmostEqual(chain.transition[0, 10], 1 / 12)
+        self.assertAlmostEqual(chain.transition[0, 3], 0.0)
+        with self.assertRaises(AssertionError):
+            LandingChain(self.map, jumps={3: {0: 0.5}})
@@ -1,10 +1,28 @@
 # -*- coding: utf-8 -*
 
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 
-from richman.player import BasePlayer
+import richman.interface as itf
+import richman.log as log
+from richman.dice import DiceStream
+from richman.estate import Estate
+from richman.game import Game
+from richman.maps.map_test import MapTest
+from richman.player import BasePlayer, PlayerSimple, PlayerCpu, PlayerExpectimax
+
+
+def _play(seed: int, first)->tuple:
+    '''play a seeded game of the player against two PlayerSimple
+
+    :return: (rounds, description of the players)
+    '''
+    players = [first, PlayerSimple('邓哲', 50000), PlayerSimple('戎萍', 50000)]
+    game = Game(MapTest(), players, seed=seed)
+    with log.quiet():
+        game.run(max_step=300)
+    return game.step, tuple(str(player) for player in players)
 
 
 class TestBasePlayer(unittest.TestCase):
@@ -21,15 +39,44 @@ class TestBasePlayer(unittest.TestCase):
 
     def test_add_money_should_execute_correctlly(self):
         self.player.add_money(-10000)
-        self.player._make_money = MagicMock()
-        self.player.add_money(-1)
-        self.assertTrue(self.player._make_money.called)
+        with patch.object(BasePlayer, '_make_money') as make_money:
+            self.player.add_money(-1)
+        self.assertTrue(make_money.called)
 
     def test_pos_should_set_right_value(self):
         pos_max = len(self.player.map)
         self.player.pos = pos_max + 3
         self.assertEqual(self.player.pos, 3)
 
+    def test_dice_should_use_the_dice_of_player(self):
+        self.player.dice = DiceStream(seed=1)
+        steps = [self.player._dice() for _ in range(20)]
+        self.player.dice = DiceStream(seed=1)
+        self.assertListEqual(steps, [self.player._dice() for _ in range(20)])
+        self.assertTrue(all(1 <= step <= 6 for step in steps))
+
+    def test_estate_levels_should_follow_the_estates(self):
+        block = MagicMock()
+        place1 = Estate('杭州', [100, 200, 300, 400], 2000, 1000, 300, block)
+        place2 = Estate('厦门', [100, 200, 300, 400], 3000, 2000, 300, block)
+        self.assertEqual(self.player.estate_max_level, 0)
+        place1.buy(self.player)
+        place2.buy(self.player)
+        place1.upgrade()
+        place1.upgrade()
+        self.assertEqual(self.player.estate_count, 2)
+        self.assertEqual(self.player.estate_max_level, 2)
+        self.assertEqual(self.player.estate_upgrades, 2)
+        self.assertTupleEqual(self.player.estate_level_counts, (1, 0, 1))
+        place1.degrade()
+        self.assertEqual(self.player.estate_max_level, 1)
+        place1.sell()
+        self.assertEqual(self.player.estate_count, 1)
+        self.assertEqual(self.player.estate_max_level, 0)
+        place2._set_state(None, 0, False)
+        self.assertEqual(self.player.estate_count, 0)
+        self.assertEqual(self.player.estate_upgrades, 0)
+
 
 class TestPlayerSimple(unittest.TestCase):
 
@@ -37,4 +84,43 @@ class TestPlayerSimple(unittest.TestCase):
         pass
     
     def tearDown(self):
-        pass
\ No newline at end of file
+        pass
+
+
+class TestPlayerCpu(unittest.TestCase):
+
+    def test_rollouts_should_leave_the_game_unchanged(self):
+        # 只推演一次时总是选择第一个选项，即 PlayerSimple 的决定
+        for seed in range(3):
+            self.assertTupleEqual(_play(seed, PlayerCpu('邓彦修', 50000, rollouts=1)),
+                                  _play(seed, PlayerSimple('邓彦修', 50000)))
+
+    def test_search_should_be_reproducible_with_seed(self):
+        result = _play(7, PlayerCpu('邓彦修', 50000, rollouts=8, horizon=5))
+        self.assertTupleEqual(_play(7, PlayerCpu('邓彦修', 50000, rollouts=8, horizon=5)),
+                              result)
+
+    def test_time_limit_should_roll_out_every_option_once(self):
+        player = PlayerCpu('邓彦修', 50000, rollouts=1000, time_limit=0, horizon=5)
+        game = Game(MapTest(), [player, PlayerSimple('邓哲', 50000)], seed=1)
+        items = game.map.items
+        positions = [pos for pos in game.map.positions_of_kind(itf.KIND_ESTATE)
+                     if items[pos].pledge_value is not None]
+        with patch.object(PlayerCpu, '_rollout', autospec=True,
+                          side_effect=PlayerCpu._rollout) as rollout, log.quiet():
+            player._make_decision_jump_to_estate()
+        self.assertListEqual([call.args[2] for call in rollout.call_args_list], positions)
+
+
+class TestPlayerExpectimax(unittest.TestCase):
+
+    def test_time_limit_should_keep_the_decision_of_player_simple(self):
+        # 一层搜索都没有完成时，保留排在第一的 PlayerSimple 的决定
+        for seed in range(3):
+            self.assertTupleEqual(_play(seed, PlayerExpectimax('邓彦修', 50000, time_limit=0)),
+                                  _play(seed, PlayerSimple('邓彦修', 50000)))
+
+    def test_search_should_be_reproducible_with_seed(self):
+        # 默认没有时间限制，搜索深度和决定只由种子决定
+        result = _play(7, PlayerExpectimax('邓彦修', 50000))
+        self.assertTupleEqual(_play(7, PlayerExpectimax('邓彦修', 50000)), result)
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*
+
+import asyncio
+import os
+import socket
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+import richman.log as log
+from richman.game import Game
+from richman.maps.map_test import MapTest
+from richman.player import PlayerSimple, PlayerPerson, DECISION_BUY
+from richman.state import GameState
+from richman.remote import (
+    encode_frame,
+    read_frame,
+    state_delta,
+    Connection,
+    ProtocolError,
+    RemoteServer,
+    ScriptedRemoteClient,
+    STATE_FIELDS
+)
+
+
+def _game(first, seed: int)->Game:
+    return Game(MapTest(), [first, PlayerSimple('邓哲', 50000), PlayerSimple('戎萍', 50000)],
+                seed=seed)
+
+
+def _result(game: Game)->tuple:
+    return game.step, tuple(str(player) for player in game.players_all)
+
+
+async def _read(data: bytes, frames: int, max_frame: int = 1024)->list:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return [await read_frame(reader, max_frame) for _ in range(frames)]
+
+
+class TestFrame(unittest.TestCase):
+
+    def test_frames_should_be_read_back(self):
+        data = (encode_frame({'type': 'answer', 'id': 1, 'answer': '北京'})
+                + encode_frame({'type': 'join', 'name': '邓哲'}))
+        self.assertListEqual(asyncio.run(_read(data, 3)),
+                             [{'type': 'answer', 'id': 1, 'answer': '北京'},
+                              {'type': 'join', 'name': '邓哲'}, None])
+
+    def test_bad_frames_should_raise_protocol_error(self):
+        frame = encode_frame({'type': 'join', 'name': '邓哲'})
+        for data, max_frame in ((frame, 8), (frame[:-1], 1024),
+                                (b'\x00\x00\x00\x03abc', 1024), (b'\x00\x00\x00\x03[1]', 1024)):
+            with self.assertRaises(ProtocolError):
+                asyncio.run(_read(data, 1, max_frame))
+
+    def test_state_delta_should_only_have_the_changes(self):
+        state = GameState(4, [None, None])
+        changes, last = state_delta(state, {})
+        self.assertSetEqual(set(changes), set(STATE_FIELDS))
+        state.tile_level[2] = 1
+        state.player_money[1] = 300
+        changes, last = state_delta(state, last)
+        self.assertDictEqual(changes, {'tile_level': [[2, 1]], 'player_money': [[1, 300]]})
+        self.assertDictEqual(state_delta(state, last)[0], {})
+
+
+class TestRemoteServer(unittest.TestCase):
+
+    def setUp(self):
+        self.quiet = log.quiet()
+        self.quiet.__enter__()
+
+    def tearDown(self):
+        self.quiet.__exit__(None, None, None)
+
+    async def _play(self, server: RemoteServer, game: Game, client: ScriptedRemoteClient,
+                    person: PlayerPerson, max_step: int):
+        client_task = asyncio.ensure_future(client.run())
+        while server.connection_of(person) is None:
+            await asyncio.sleep(0.001)
+        await game.run_async(max_step)
+        server.push_end(game)
+        await asyncio.wait_for(client_task, 5)
+        await server.close()
+
+    def _check(self, game: Game, client: ScriptedRemoteClient, seed: int, max_step: int):
+        expected = _game(PlayerSimple('邓彦修', 50000), seed)
+        expected.run(max_step)
+        self.assertTupleEqual(_result(game), _result(expected))
+        self.assertGreater(client.decisions, 0)
+        self.assertListEqual(client.players, ['邓彦修', '邓哲', '戎萍'])
+        for field in STATE_FIELDS:
+            self.assertListEqual(client.state[field], getattr(game.state, field).tolist())
+
+    def test_remote_player_should_play_over_tcp(self):
+        async def main():
+            server = RemoteServer()
+            server.expect(person)
+            host, port = await server.start_tcp()
+            await client.connect_tcp(host, port)
+            await self._play(server, game, client, person, 300)
+        person = PlayerPerson('邓彦修', 50000, timeout=5)
+        game = _game(person, 3)
+        client = ScriptedRemoteClient('邓彦修')
+        asyncio.run(main())
+        self._check(game, client, 3, 300)
+        self.assertEqual(client.winner, game.winner.name if game.winner else None)
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'no unix socket')
+    def test_remote_player_should_play_over_unix_socket(self):
+        def never_buy(client, kind, key, default):
+            return False if kind == DECISION_BUY else default
+        async def main(path):
+            server = RemoteServer()
+            server.expect(person)
+            await server.start_unix(path)
+            await client.connect_unix(path)
+            await self._play(server, game, client, person, 20)
+        person = PlayerPerson('邓彦修', 50000, timeout=5)
+        game = _game(person, 4)
+        client = ScriptedRemoteClient('邓彦修', script=never_buy)
+        with tempfile.TemporaryDirectory() as folder:
+            asyncio.run(main(os.path.join(folder, 'richman.sock')))
+        self.assertEqual(len(person.estates), 0)
+        self.assertGreater(client.decisions, 0)
+
+    def test_unknown_seat_should_be_refused(self):
+        async def main():
+            server = RemoteServer()
+            host, port = await server.start_tcp()
+            client = ScriptedRemoteClient('邓彦修')
+            await client.connect_tcp(host, port)
+            await asyncio.wait_for(client.run(), 5)
+            await server.close()
+            return client
+        self.assertIsNotNone(asyncio.run(main()).error)
+
+    def test_failed_sending_should_close_the_connection(self):
+        async def reset():
+            raise ConnectionResetError()
+        async def closed():
+            pass
+        async def main():
+            reader = asyncio.StreamReader()
+            writer = MagicMock()
+            writer.drain = reset
+            writer.wait_closed = closed
+            writer.close.side_effect = reader.feed_eof  # 如同关闭套接字
+            connection = Connection(reader, writer)
+            serving = asyncio.ensure_future(connection.serve())
+            self.assertTrue(connection.send({'type': 'state', 'step': 0, 'changes': {}}))
+            await asyncio.wait_for(serving, 5)
+            return connection, writer
+        connection, writer = asyncio.run(main())
+        self.assertTrue(connection.is_closed)
+        self.assertFalse(connection.send({'type': 'state', 'step': 1, 'changes': {}}))
+        writer.close.assert_called_once_with()
+
+    def test_slow_client_should_not_stall_the_game(self):
+        async def never():
+            await asyncio.Event().wait()
+        async def closed():
+            pass
+        async def main():
+            reader = asyncio.StreamReader()
+            writer = MagicMock()
+            writer.drain = never
+            writer.wait_closed = closed
+            connection = Connection(reader, writer, max_queue=2)
+            serving = asyncio.ensure_future(connection.serve())
+            person.client = connection
+            await game.run_async(300)
+            reader.feed_eof()
+            await serving
+            return connection
+        person = PlayerPerson('邓彦修', 50000, timeout=0.2)
+        game = _game(person, 5)
+        connection = asyncio.run(main())
+        # 只等待第一次决定超时，之后客户端落后，直接按默认处理
+        self.assertEqual(connection.asked, 1)
+        self.assertGreater(connection.dropped, 0)
+        expected = _game(PlayerSimple('邓彦修', 50000), 5)
+        expected.run(300)
+        self.assertTupleEqual(_result(game), _result(expected))
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*
+
+import unittest
+
+import richman.log as log
+from richman.game import Game
+from richman.maps.map_test import MapTest
+from richman.replay import Replay
+from richman.simulation import default_players
+
+
+def _state(game)->tuple:
+    players = tuple((player.money, player.pos, player.is_banckrupted,
+                     tuple(estate.name for estate in player.estates),
+                     tuple(project.name for project in player.projects))
+                    for player in game.players_all)
+    estates = tuple((estate.current_level, estate.is_pledged)
+                    for estate in game.map.items if hasattr(estate, 'current_level'))
+    in_game = tuple(player.name for player in game.players_in_game)
+    return game.step, players, estates, in_game
+
+
+def _simulate(seed: int, rounds: int = None)->Game:
+    game = Game(MapTest(), default_players(), seed=seed)
+    with log.quiet():
+        while len(game.players_in_game) > 1 and (rounds is None or game.step < rounds):
+            game._run_one_step()
+    return game
+
+
+class TestReplay(unittest.TestCase):
+
+    def test_run_should_reach_the_final_state(self):
+        replay = Replay.from_seed(11)
+        replay.run()
+        self.assertTrue(replay.is_finished)
+        self.assertEqual(_state(replay.game), _state(_simulate(11)))
+
+    def test_seek_should_jump_forward_and_backward(self):
+        replay = Replay.from_seed(12)
+        for round in (20, 5, 5, 30, 0):
+            replay.seek(round)
+            self.assertEqual(_state(replay.game), _state(_simulate(12, round)))
+
+    def test_step_should_replay_one_turn(self):
+        replay = Replay.from_seed(13)
+        replay.seek(3)
+        self.assertTrue(replay.step())  # round record
+        self.assertTrue(replay.step())  # first player's turn
+        self.assertEqual(replay.round, 3)
+        while replay.step():
+            pass
+        self.assertEqual(_state(replay.game), _state(_simulate(13)))
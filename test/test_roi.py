@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*
+
+import unittest
+
+import numpy as np
+
+from richman.game import Game
+from richman.maps.map_test import MapTest
+from richman.player import PlayerSimple
+from richman.roi import EstateTables, PlayerTable, tables_of
+
+
+class TestEstateTables(unittest.TestCase):
+
+    def setUp(self):
+        self.map = MapTest()
+        self.tables = tables_of(self.map)
+
+    def tearDown(self):
+        pass
+
+    def test_tables_should_be_computed_once_per_map(self):
+        self.assertIs(tables_of(self.map), self.tables)
+        self.assertIsNot(tables_of(MapTest()), self.tables)
+
+    def test_payback_should_follow_the_landing_and_the_fees(self):
+        items = self.map.items
+        tables = self.tables
+        self.assertEqual(tables.fees.shape, (len(tables.positions), 4))
+        # 没有跳转时每块地被走到的概率相同
+        np.testing.assert_allclose(tables.landing, 1 / len(items))
+        buy_value = np.array([items[pos].buy_value for pos in tables.positions])
+        np.testing.assert_allclose(tables.payback,
+                                   buy_value / (tables.landing * tables.fees[:, 0]))
+        self.assertEqual(tables.row_of(2), -1)
+        self.assertEqual(tables.positions[tables.row_of(3)], 3)
+        self.assertTrue((tables.upgrade_payback > 0).all())
+
+    def test_block_completion_should_add_the_landing_of_the_block(self):
+        tables = self.tables
+        self.assertTrue((tables.block_rent >= tables.expected_rent).all())
+        block_size = np.array([len(self.map.positions_in_block(self.map.items[pos].block))
+                               for pos in tables.positions])
+        np.testing.assert_allclose(tables.block_completion,
+                                   tables.expected_rent * (block_size - 1)[:, None])
+        np.testing.assert_allclose(tables.block_payback * block_size, tables.payback)
+
+    def test_landing_should_be_given_by_the_caller(self):
+        landing = np.zeros(len(self.map.items))
+        landing[0] = 1.0
+        tables = EstateTables(self.map, landing)
+        self.assertEqual(tables.payback[0], 2400 / 400)
+        self.assertEqual(tables.payback[1], np.inf)
+
+
+class TestPlayerTable(unittest.TestCase):
+
+    def setUp(self):
+        self.player = PlayerTable('邓彦修', 50000, reserve=2000)
+        self.game = Game(MapTest(), [self.player, PlayerSimple('邓哲', 50000)], seed=1)
+        self.items = self.player.map.items
+
+    def tearDown(self):
+        pass
+
+    def test_buy_should_keep_the_reserve_unless_the_block_is_held(self):
+        self.player._set_money(3000)
+        self.assertFalse(self.player._make_decision_buy(self.items[1]))
+        self.player._set_money(50000)
+        self.player.trigger_buy(self.items[0])
+        self.player._set_money(3000)
+        self.assertTrue(self.player._make_decision_buy(self.items[1]))
+        self.player._set_money(2000)
+        self.assertFalse(self.player._make_decision_buy(self.items[1]))
+
+    def test_upgrade_any_estate_should_choose_the_fastest_payback(self):
+        self.player.trigger_buy(self.items[0])
+        self.player.trigger_buy(self.items[8])
+        # 8 号地产升级更快回本
+        self.assertIs(self.player._make_decision_upgrade_any_estate(), self.items[8])
+        self.player._set_money(2000)
+        self.assertIsNone(self.player._make_decision_upgrade_any_estate())
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*
+
+import unittest
+
+from richman.simulation import (
+    simulate,
+    run_one_game,
+    SimulationResult
+)
+
+
+class TestSimulationResult(unittest.TestCase):
+
+    def test_result_should_aggregate_games(self):
+        result = SimulationResult(['a', 'b'])
+        result.add((0, 10, 0, (300, -10)))
+        result.add((1, 20, 0, (100, -20)))
+        result.add((2, 30, -1, (200, 30)))
+        self.assertEqual(result.games, 3)
+        self.assertEqual(result.draws, 1)
+        self.assertEqual(result.mean_step(), 20)
+        self.assertListEqual(result.table(),
+                             [('a', 2, 2 / 3, 200), ('b', 0, 0, 0)])
+        self.assertIn('win rate', str(result))
+
+
+class TestSimulate(unittest.TestCase):
+
+    def test_run_one_game_should_return_compact_result(self):
+        seed, step, winner_index, net_worths = run_one_game(7, max_step=500)
+        self.assertEqual(seed, 7)
+        self.assertGreater(step, 0)
+        self.assertIn(winner_index, (-1, 0, 1, 2))
+        self.assertEqual(len(net_worths), 3)
+
+    def test_simulate_should_run_games_in_process_pool(self):
+        result = simulate(8, seed=100, processes=2)
+        self.assertEqual(result.games, 8)
+        self.assertListEqual(result.seeds, list(range(100, 108)))
+        self.assertEqual(sum(result.wins(index) for index in range(3)) + result.draws, 8)
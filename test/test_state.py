@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*
+
+import unittest
+from unittest.mock import MagicMock
+
+from richman.state import GameState, NO_OWNER, placeholder
+from richman.game import Game
+from richman.maps.map_test import MapTest
+from richman.player import PlayerSimple
+
+
+class TestGameState(unittest.TestCase):
+
+    def test_player_index_should_append_unknown_players(self):
+        player1 = MagicMock()
+        player2 = MagicMock()
+        state = GameState(3, [player1])
+        self.assertEqual(state.player_index(player1), 0)
+        self.assertEqual(state.player_index(player2), 1)
+        self.assertEqual(len(state.player_money), 2)
+        self.assertListEqual(list(state.tile_owner), [NO_OWNER] * 3)
+
+    def test_copy_and_restore_should_not_share_arrays(self):
+        state = GameState(2, [MagicMock()])
+        state.player_money[0] = 100
+        copied = state.copy()
+        self.assertEqual(copied, state)
+        state.player_money[0] = 50
+        state.tile_level[1] = 2
+        self.assertNotEqual(copied, state)
+        tile_level = state.tile_level
+        state.restore(copied)
+        self.assertIs(state.tile_level, tile_level)
+        self.assertEqual(state.player_money[0], 100)
+        self.assertEqual(state.tile_level[1], 0)
+
+
+class TestStateViews(unittest.TestCase):
+
+    def setUp(self):
+        self.players = [PlayerSimple('邓哲', 10000), PlayerSimple('戎萍', 10000)]
+        self.map = MapTest()
+        self.game = Game(self.map, self.players, seed=0)
+        self.state = self.game.state
+
+    def test_views_should_read_and_write_the_game_state(self):
+        player = self.players[1]
+        estate = self.map.items[0]
+        player.pos = 3
+        player.trigger_buy(estate)
+        estate.upgrade()
+        self.assertEqual(estate.tile_id, 0)
+        self.assertEqual(self.state.tile_owner[0], 1)
+        self.assertEqual(self.state.tile_level[0], 1)
+        self.assertEqual(self.state.player_pos[1], 3)
+        self.assertEqual(self.state.player_money[1], player.money)
+        self.assertIs(estate.owner, player)
+
+    def test_restore_should_change_views(self):
+        snapshot = self.state.copy()
+        estate = self.map.items[0]
+        self.players[0].trigger_buy(estate)
+        estate.pledge()
+        self.state.restore(snapshot)
+        self.assertIsNone(estate.owner)
+        self.assertFalse(estate.is_pledged)
+        self.assertEqual(self.players[0].money, 10000)
+
+    def test_estate_state_should_move_into_the_game(self):
+        map = MapTest()
+        player = PlayerSimple('邓哲', 10000)
+        map.items[1].buy(player)
+        game = Game(map, [PlayerSimple('戎萍', 10000), player])
+        self.assertEqual(game.state.tile_owner[1], 1)
+        self.assertIs(map.items[1].owner, player)
+
+    def test_places_should_share_the_placeholder_until_changed(self):
+        map = MapTest()
+        estate1, project, estate2 = map.items[1], map.items[2], map.items[3]
+        player = PlayerSimple('邓哲', 10000)
+        estate1.buy(player)
+        project.buy(player)
+        self.assertIs(estate1.owner, player)
+        self.assertIs(project.owner, player)
+        self.assertIsNone(estate2.owner)
+        self.assertListEqual(list(placeholder().tile_owner), [NO_OWNER])
+        self.assertListEqual(placeholder().players, [])
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*
+
+import os
+import tempfile
+import unittest
+
+import richman.trace as trc
+from richman.game import Game
+from richman.maps.map_test import MapTest
+from richman.player import PlayerSimple
+
+
+class TestTrace(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.file_path = tempfile.mkstemp(suffix='.trace')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.file_path)
+
+    def _record_game(self, seed: int):
+        players = [PlayerSimple(name, 50000) for name in ('邓彦修', '邓哲', '戎萍')]
+        with trc.TraceRecorder(self.file_path, buffer_records=16) as recorder:
+            game = Game(MapTest(), players, seed=seed, trace=recorder)
+            game.run(max_step=500)
+        return game, recorder
+
+    def test_reader_should_read_what_recorder_writes(self):
+        game, recorder = self._record_game(seed=1)
+        with trc.TraceReader(self.file_path) as reader:
+            self.assertEqual(reader.header.players, 3)
+            self.assertEqual(reader.header.tiles, len(game.map))
+            self.assertEqual(reader.header.seed, 1)
+            self.assertEqual(len(reader), recorder.count)
+            records = list(reader)
+            self.assertEqual(records[0], reader[0])
+            self.assertEqual(records[-1], reader[-1])
+        self.assertEqual(records[0].kind, trc.ROUND)
+        self.assertEqual(records[-1].round, game.step - 1)
+        bankrupts = [record.player for record in records if record.kind == trc.BANKRUPT]
+        self.assertEqual(len(bankrupts), len(game.players_all) - len(game.players_in_game))
+
+    def test_records_should_cover_all_money_changes(self):
+        game, _ = self._record_game(seed=2)
+        money = [50000] * len(game.players_all)
+        gain_kinds = (trc.SELL, trc.PLEDGE, trc.FEE)
+        pay_kinds = (trc.BUY, trc.UPGRADE, trc.REBUY, trc.RENT)
+        with trc.TraceReader(self.file_path) as reader:
+            for record in reader:
+                if record.kind in gain_kinds:
+                    money[record.player] += record.value
+                elif record.kind in pay_kinds:
+                    money[record.player] -= record.value
+                if record.kind == trc.RENT:
+                    money[record.aux] += record.value
+        self.assertListEqual(money, [player.money for player in game.players_all])
+
+    def test_reader_should_reject_other_files(self):
+        with open(self.file_path, 'wb') as f:
+            f.write(b'\0' * trc.HEADER.size)
+        with self.assertRaises(ValueError):
+            trc.TraceReader(self.file_path)
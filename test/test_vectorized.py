@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*
+
+import importlib.util
+import unittest
+
+from richman.maps.map_test import MapTest
+from richman.simulation import default_players, simulate
+
+if importlib.util.find_spec('numpy'):
+    from richman.vectorized import VectorizedSimulator, NO_OWNER
+
+
+@unittest.skipUnless(importlib.util.find_spec('numpy'), 'numpy is needed')
+class TestVectorizedSimulator(unittest.TestCase):
+
+    def test_same_seed_should_give_same_games(self):
+        result1 = VectorizedSimulator(MapTest(), default_players(), 50, seed=3).run()
+        result2 = VectorizedSimulator(MapTest(), default_players(), 50, seed=3).run()
+        self.assertListEqual(result1.steps, result2.steps)
+        self.assertListEqual(result1.net_worths, result2.net_worths)
+
+    def test_bankrupted_players_should_own_nothing(self):
+        simulator = VectorizedSimulator(MapTest(), default_players(), 200, seed=4)
+        result = simulator.run()
+        self.assertEqual(result.games, 200)
+        for game, winner in enumerate(simulator.winners().tolist()):
+            owners = set(simulator.owner[game].tolist()) - {NO_OWNER}
+            if winner >= 0:
+                self.assertTrue(owners <= {winner})
+                self.assertGreater(simulator.money[game, winner], 0)
+
+    def test_max_step_should_stop_games(self):
+        result = VectorizedSimulator(MapTest(), default_players(), 20,
+                                     seed=5, max_step=10).run()
+        self.assertEqual(max(result.steps), 10)
+
+    def test_statistics_should_match_the_object_engine(self):
+        expected = simulate(600, seed=1000, processes=1)
+        result = VectorizedSimulator(MapTest(), default_players(), 4000, seed=6).run()
+        for index in range(len(result.player_names)):
+            self.assertAlmostEqual(result.win_rate(index), expected.win_rate(index), delta=0.08)
+        self.assertAlmostEqual(result.mean_step(), expected.mean_step(), delta=6)
+        for index in range(len(result.player_names)):
+            self.assertAlmostEqual(result.mean_net_worth(index),
+                                   expected.mean_net_worth(index),
+                                   delta=0.2 * expected.mean_net_worth(0))